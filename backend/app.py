@@ -16,10 +16,29 @@ Response contract required from the model:
 }
 """
 import argparse
+import json
 import logging
-from src.constants import DEFAULT_TEMPLATE_REACT_APP_DIR, DEFAULT_GENERATED_APP_DIR, DEFAULT_MODEL
-from src.logger import setup_logging
-from flask import Flask, request, jsonify
+import time
+import uuid
+from src.constants import (
+    DEFAULT_TEMPLATE_REACT_APP_DIR,
+    DEFAULT_GENERATED_APP_DIR,
+    DEFAULT_MODEL,
+    DEFAULT_JOB_WORKERS,
+    DEFAULT_JOB_WORKER_TYPE,
+    DEFAULT_JOB_MAX_QUEUE,
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_BATCH_DIR,
+    DEFAULT_SERVE_DRAIN_SECONDS,
+    DEFAULT_SERVE_MAX_GENERATIONS,
+    DEFAULT_SERVE_SLOT_WAIT_SECONDS,
+)
+from src.gemini_client import RateLimitTimeout
+from src.jobs import JobQueue, QueueFullError
+from src.logger import reset_log_context, set_log_context, setup_logging
+from src.metrics import HTTP_DURATION, HTTP_REQUESTS, HTTP_REJECTED, registry
+from src.serving import serving_state
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from pathlib import Path
 
@@ -27,6 +46,127 @@ from pathlib import Path
 app = Flask("lovable-p1-mini")
 CORS(app)
 
+# Background generation jobs; configured from the CLI in __main__ or by create_app
+job_queue = JobQueue()
+
+PROCESS_PREVIEW_ERROR = "'preview' is not supported for jobs run in worker processes; use /api/generate"
+
+# Endpoints that run a generation in the request; capped per worker (see src/serving.py)
+GENERATION_ENDPOINTS = {
+    "handle_generate_request",
+    "handle_generate_stream_request",
+    "handle_plan_request",
+    "handle_edit_request",
+    "handle_batch_request",
+}
+
+
+def collect_runtime_metrics():
+    """
+    Samples job queue, response cache and model limiter state at scrape time.
+    """
+    from src.gemini_client import limiter_stats
+    from src.response_cache import response_cache
+    from src.single_flight import single_flight
+
+    jobs = job_queue.stats()
+    cache = response_cache.stats()
+    limiters = limiter_stats()
+    flights = single_flight.stats()
+    slots = serving_state.slots.stats()
+    return [
+        ("lovable_jobs", "gauge", "Background jobs by status", [({"status": k}, v) for k, v in jobs["counts"].items()]),
+        ("lovable_response_cache_hits_total", "counter", "Response cache hits", [({}, cache["hits"])]),
+        ("lovable_response_cache_misses_total", "counter", "Response cache misses", [({}, cache["misses"])]),
+        ("lovable_response_cache_bytes", "gauge", "Bytes stored in the response cache", [({}, cache["bytes"])]),
+        (
+            "lovable_gemini_in_flight",
+            "gauge",
+            "Gemini calls currently running per model",
+            [({"model": m}, s["in_flight"]) for m, s in limiters.items()],
+        ),
+        (
+            "lovable_gemini_waiting",
+            "gauge",
+            "Gemini calls waiting for quota per model",
+            [({"model": m}, s["waiting"]) for m, s in limiters.items()],
+        ),
+        ("lovable_single_flight_in_flight", "gauge", "Distinct generations in flight", [({}, flights["in_flight"])]),
+        (
+            "lovable_single_flight_waiters",
+            "gauge",
+            "Requests waiting on an identical generation already in flight",
+            [({}, flights["waiters"])],
+        ),
+        (
+            "lovable_generation_slots_in_use",
+            "gauge",
+            "Generation requests running in this worker",
+            [({}, slots["in_use"])],
+        ),
+        (
+            "lovable_ready",
+            "gauge",
+            "1 once this worker has warmed up and is not draining",
+            [({}, int(serving_state.ready))],
+        ),
+    ]
+
+
+registry.register_collector(collect_runtime_metrics)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Honour an upstream id so proxy and app logs can be joined; otherwise mint one
+    g.request_id = request.headers.get("X-Request-Id") or uuid.uuid4().hex
+    g.log_context_tokens = set_log_context(request_id=g.request_id)
+    serving_state.request_started()
+    g.request_tracked = True
+
+
+@app.before_request
+def limit_generations():
+    if request.endpoint not in GENERATION_ENDPOINTS:
+        return None
+    if serving_state.draining:
+        HTTP_REJECTED.inc(reason="draining")
+        return jsonify({"error": "Server is shutting down"}), 503, {"Retry-After": "1"}
+    if request.endpoint == "handle_batch_request":
+        # Every batch item takes a slot of its own as it starts (see run_batch)
+        return None
+    if not serving_state.slots.acquire():
+        HTTP_REJECTED.inc(reason="busy")
+        return jsonify({"error": "Too many generations in progress"}), 503, {"Retry-After": "10"}
+    g.generation_slot = True
+    return None
+
+
+@app.teardown_request
+def clear_log_context(exc):
+    tokens = g.pop("log_context_tokens", None)
+    if tokens:
+        reset_log_context(tokens)
+    # Streamed responses keep the request context, so this runs once the stream has ended
+    if g.pop("generation_slot", False):
+        serving_state.slots.release()
+    if g.pop("request_tracked", False):
+        serving_state.request_finished()
+
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by route rule rather than raw path to keep the label set bounded
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    started = getattr(g, "request_started", None)
+    if started is not None:
+        HTTP_DURATION.observe(time.perf_counter() - started, endpoint=endpoint)
+    if "request_id" in g:
+        response.headers["X-Request-Id"] = g.request_id
+    return response
+
 
 # Define the generate_app function as provided by the user
 def generate_app(
@@ -35,6 +175,13 @@ def generate_app(
     app_dir: Path,
     out_root: Path,
     raw_response_file: str,
+    use_cache: bool = True,
+    profile: bool = False,
+    include_content: bool = True,
+    preview: bool = False,
+    plan: dict = None,
+    strategy: str = "single",
+    validate: bool = True,
 ) -> None:
     """
     This is a placeholder function for your application generation logic.
@@ -55,9 +202,57 @@ def generate_app(
         app_dir=app_dir,
         out_root=out_root,
         raw_response_file=raw_response_file,
+        use_cache=use_cache,
+        profile=profile,
+        include_content=include_content,
+        preview=preview,
+        plan=plan,
+        strategy=strategy,
+        validate=validate,
     )
 
 
+def parse_generate_params(data: dict) -> dict:
+    """
+    Extracts the generate_app parameters from a request body, applying defaults.
+    Raises ValueError if a required parameter is missing.
+    """
+    from src.constants import DEFAULT_PARALLEL_MAX_FILES
+    from src.generate_app import GENERATION_STRATEGIES
+    from src.plan_app import normalize_plan
+
+    prompt = data.get("prompt")
+    if prompt is None:
+        raise ValueError("Missing 'prompt' or 'model' in request")
+    plan = data.get("plan")
+    if plan is not None and not isinstance(plan, dict):
+        raise ValueError("'plan' must be an object returned by /api/plan")
+    strategy = data.get("strategy", "single")
+    if strategy not in GENERATION_STRATEGIES:
+        raise ValueError(f"'strategy' must be one of {', '.join(GENERATION_STRATEGIES)}")
+    return {
+        "prompt": prompt,
+        "model": data.get("model", DEFAULT_MODEL),
+        "app_dir": Path(data.get("app_dir", DEFAULT_TEMPLATE_REACT_APP_DIR)),
+        "out_root": Path(data.get("out_root", DEFAULT_GENERATED_APP_DIR)),
+        "raw_response_file": data.get("raw_response_file", None),
+        # Set "cache": false to force a fresh model call
+        "use_cache": str(data.get("cache", True)).lower() not in ("false", "0", "no"),
+        # Set "profile": true to attach a cProfile/tracemalloc summary to the response
+        "profile": str(data.get("profile", False)).lower() in ("true", "1", "yes"),
+        # Set "include_content": false to get only the file listing; contents come from /api/apps/<uid>/files/
+        "include_content": str(data.get("include_content", True)).lower() not in ("false", "0", "no"),
+        # Set "preview": true to keep the files in memory until POST /api/previews/<uid>/commit
+        "preview": str(data.get("preview", False)).lower() in ("true", "1", "yes"),
+        # A plan from /api/plan makes the full generation build what was previewed
+        "plan": normalize_plan(plan, max_files=DEFAULT_PARALLEL_MAX_FILES) if plan else None,
+        # "parallel" plans the files first and generates them concurrently
+        "strategy": strategy,
+        # Set "validate": false to skip the offline import check (see src/validate_app.py)
+        "validate": str(data.get("validate", True)).lower() not in ("false", "0", "no"),
+    }
+
+
 @app.route("/api/generate", methods=["POST"])
 def handle_generate_request():
     """
@@ -70,49 +265,541 @@ def handle_generate_request():
 
     data = request.get_json()
 
-    # Extract parameters from the JSON data
-    # Use .get() to safely retrieve values, providing a default or handling missing ones
     try:
-        prompt = data.get("prompt")
-        model = data.get("model", DEFAULT_MODEL)
-        # Path objects need to be created from strings
-        app_dir = Path(
-            data.get("app_dir", DEFAULT_TEMPLATE_REACT_APP_DIR)
-        )  # Default to current directory if not provided
-        out_root = Path(data.get("out_root", DEFAULT_GENERATED_APP_DIR))  # Default to current directory if not provided
-        raw_response_file = data.get("raw_response_file", None)
-        # Basic validation for essential parameters
-        if prompt is None:
-            return jsonify({"error": "Missing 'prompt' or 'model' in request"}), 400
+        params = parse_generate_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
         # Call the generate_app function with the extracted parameters
-        response = generate_app(
-            prompt=prompt,
-            model=model,
-            app_dir=app_dir,
-            out_root=out_root,
-            raw_response_file=raw_response_file,
-        )
+        response = generate_app(**params)
 
         return jsonify(response), 200
 
-    except Exception as e:
+    except RateLimitTimeout as e:
+        logging.warning(e)
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "10"
+        return response, 503
+    except (Exception, SystemExit) as e:
+        # SystemExit is how the pipeline reports bad model output, unknown strategies and failed plans
+        logging.exception(e)
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
+@app.route("/api/plan", methods=["POST"])
+def handle_plan_request():
+    """
+    Fast preview: returns a plan (file list, component tree, theme, per-file summaries)
+    from a fast model. Unless "speculative" is false, the full generation of that plan
+    is queued right away as a background job; DELETE /api/jobs/<job_id> drops it if the
+    plan is rejected. Takes the /api/generate body plus an optional "plan_model".
+    "preview": true is rejected with process-pool jobs, as for /api/jobs.
+    """
+    from src.constants import DEFAULT_PLAN_MODEL
+    from src.plan_app import plan_app
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+    data = request.get_json()
+    try:
+        params = parse_generate_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if params["preview"] and job_queue.worker_type == "process":
+        return jsonify({"error": PROCESS_PREVIEW_ERROR}), 400
+
+    try:
+        result = plan_app(params["prompt"], data.get("plan_model", DEFAULT_PLAN_MODEL), use_cache=params["use_cache"])
+    except RateLimitTimeout as e:
+        logging.warning(e)
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "10"
+        return response, 503
+    except (Exception, SystemExit) as e:
+        # SystemExit is how the pipeline reports bad model output
+        logging.exception(e)
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+    result["job_id"] = None
+    if str(data.get("speculative", True)).lower() not in ("false", "0", "no"):
+        params["plan"] = result["plan"]
+        try:
+            result["job_id"] = job_queue.submit(params).id
+        except QueueFullError as e:
+            # Speculation is best effort; the client can still submit the plan to /api/jobs
+            logging.info(f"Not starting speculative generation: {e}")
+    return jsonify(result), 200
+
+
+@app.route("/api/apps/<uid>/edit", methods=["POST"])
+def handle_edit_request(uid: str):
+    """
+    Applies a follow-up prompt to an existing generated app in place.
+    Only the manifest and the relevant files are sent to the model, and only the
+    added/modified files and deleted paths come back.
+    """
+    from src.edit_app import edit_app
+    from src.utils import generated_app_dir
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json()
+    if not data.get("prompt"):
+        return jsonify({"error": "Missing 'prompt' in request"}), 400
+    out_root = Path(data.get("out_root", DEFAULT_GENERATED_APP_DIR))
+    if generated_app_dir(out_root, uid) is None:
+        return jsonify({"error": f"Unknown app: {uid}"}), 404
+
+    try:
+        response = edit_app(
+            uid,
+            data["prompt"],
+            model=data.get("model", DEFAULT_MODEL),
+            out_root=out_root,
+            raw_response_file=data.get("raw_response_file", None),
+        )
+        return jsonify(response), 200
+    except RateLimitTimeout as e:
+        logging.warning(e)
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "10"
+        return response, 503
+    except (Exception, SystemExit) as e:
+        # SystemExit is how the pipeline reports bad model output
         logging.exception(e)
-        # Catch any errors during parameter extraction or function call
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 
+@app.route("/api/apps/<uid>/diagnostics", methods=["GET"])
+def handle_diagnostics_request(uid: str):
+    """
+    Checks the imports of a generated app offline and returns the problems found,
+    with a ready-made prompt for /api/apps/<uid>/edit that asks for them to be fixed.
+    """
+    from src.utils import generated_app_dir
+    from src.validate_app import repair_prompt, validate_app_dir
+
+    app_root = generated_app_dir(DEFAULT_GENERATED_APP_DIR, uid)
+    if app_root is None:
+        return jsonify({"error": f"Unknown app: {uid}"}), 404
+    diagnostics = validate_app_dir(app_root)
+    prompt = repair_prompt(diagnostics) if diagnostics else None
+    return jsonify({"uid": uid, "diagnostics": diagnostics, "repair_prompt": prompt}), 200
+
+
+def file_content_response(name: str, digest: str, read):
+    """
+    Builds the response for one file given its name, sha256 and a callable returning its bytes.
+    Supports ETag/If-None-Match, gzip (or br when brotli is installed) and single byte ranges.
+    """
+    from src.file_content import MIN_COMPRESS_BYTES, choose_encoding, compress, content_type, etag_matches, parse_range
+
+    headers = {
+        "Content-Type": content_type(Path(name)),
+        "Cache-Control": "no-cache",
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("If-None-Match"), digest):
+        return Response(status=304, headers={**headers, "ETag": f'"{digest}"'})
+
+    data = read()
+    try:
+        byte_range = parse_range(request.headers.get("Range"), len(data))
+    except ValueError:
+        return Response(status=416, headers={"Content-Range": f"bytes */{len(data)}"})
+    if byte_range is not None and request.headers.get("If-Range", f'"{digest}"').strip('"') == digest:
+        # Ranges address the identity encoding, so partial responses are never compressed
+        start, end = byte_range
+        headers.update({"ETag": f'"{digest}"', "Content-Range": f"bytes {start}-{end}/{len(data)}"})
+        return Response(data[start : end + 1], status=206, headers=headers)
+
+    encoding = choose_encoding(request.headers.get("Accept-Encoding")) if len(data) >= MIN_COMPRESS_BYTES else None
+    headers["ETag"] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+    if encoding:
+        data = compress(data, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(data, status=200, headers=headers)
+
+
+@app.route("/api/apps/<uid>/files/<path:rel_path>", methods=["GET"])
+def handle_file_content(uid: str, rel_path: str):
+    """
+    Serves one file of a generated app, or of an uncommitted preview straight from memory.
+    """
+    import posixpath
+
+    from src.file_content import file_hash
+    from src.overlay import overlay_store
+    from src.utils import generated_app_dir, is_within
+
+    overlay = overlay_store.get(uid)
+    if overlay is not None:
+        rel = posixpath.normpath(rel_path)
+        if not overlay.exists(rel):
+            return jsonify({"error": f"Unknown file: {rel_path}"}), 404
+        return file_content_response(rel, overlay.sha256(rel), lambda: overlay.read(rel))
+
+    app_root = generated_app_dir(DEFAULT_GENERATED_APP_DIR, uid)
+    if app_root is None:
+        return jsonify({"error": f"Unknown app: {uid}"}), 404
+    path = app_root / rel_path
+    if not is_within(app_root, path) or not path.is_file() or "node_modules" in Path(rel_path).parts:
+        return jsonify({"error": f"Unknown file: {rel_path}"}), 404
+    return file_content_response(path.name, file_hash(path), path.read_bytes)
+
+
+@app.route("/api/previews", methods=["GET"])
+def handle_preview_stats():
+    """
+    Returns how many previews are held in memory and their total size.
+    """
+    from src.overlay import overlay_store
+
+    return jsonify(overlay_store.stats()), 200
+
+
+@app.route("/api/previews/<uid>/commit", methods=["POST"])
+def handle_preview_commit(uid: str):
+    """
+    Writes an in-memory preview to generated-app/<uid> and releases it from memory.
+    """
+    from src.overlay import overlay_store
+
+    target_dir = overlay_store.commit(uid, DEFAULT_GENERATED_APP_DIR)
+    if target_dir is None:
+        return jsonify({"error": f"Unknown or evicted preview: {uid}"}), 404
+    return jsonify({"uid": uid, "target_dir": str(target_dir)}), 200
+
+
+@app.route("/api/previews/<uid>", methods=["DELETE"])
+def handle_preview_discard(uid: str):
+    """
+    Drops an uncommitted preview.
+    """
+    from src.overlay import overlay_store
+
+    if overlay_store.pop(uid) is None:
+        return jsonify({"error": f"Unknown or evicted preview: {uid}"}), 404
+    return jsonify({"uid": uid, "discarded": True}), 200
+
+
+@app.route("/api/apps/<uid>/export", methods=["GET"])
+def handle_export_request(uid: str):
+    """
+    Streams a generated app as ?format=zip (default) or ?format=tar.gz.
+    The archive is produced chunk by chunk, so nothing is buffered on disk or in memory.
+    """
+    from src.export_app import EXPORT_FORMATS, export_app
+    from src.utils import generated_app_dir
+
+    fmt = request.args.get("format", "zip")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    if generated_app_dir(DEFAULT_GENERATED_APP_DIR, uid) is None:
+        return jsonify({"error": f"Unknown app: {uid}"}), 404
+
+    mimetype = "application/zip" if fmt == "zip" else "application/gzip"
+    headers = {"Content-Disposition": f'attachment; filename="{uid}.{fmt}"', "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(export_app(uid, fmt)), mimetype=mimetype, headers=headers)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/api/generate/stream", methods=["GET", "POST"])
+def handle_generate_stream_request():
+    """
+    Streams generation progress as Server-Sent Events.
+    Each file is written and pushed as a `file` event as soon as the model has emitted it,
+    followed by a final `done` event with the full file list (or an `error` event).
+    Accepts a JSON body (POST) or query parameters (GET, for EventSource clients).
+    """
+    if request.method == "POST":
+        if not request.is_json:
+            return jsonify({"error": "Request must be JSON"}), 400
+        data = request.get_json()
+    else:
+        data = request.args.to_dict()
+
+    try:
+        params = parse_generate_params(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    from src.generate_app import generate_app_stream
+
+    # Profiling a long-lived stream is not supported, and file events always carry content
+    params.pop("profile", None)
+    params.pop("include_content", None)
+    params.pop("preview", None)
+    params.pop("strategy", None)
+    params.pop("validate", None)
+
+    def events():
+        try:
+            for item in generate_app_stream(**params):
+                yield sse_event(item.pop("event"), item)
+        except (Exception, SystemExit) as e:
+            # SystemExit is how generate_app reports failures; never let it escape the stream.
+            # GeneratorExit (client disconnected) must propagate so the generator can close.
+            logging.exception(e)
+            yield sse_event("error", {"error": f"An error occurred: {str(e)}"})
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+
+@app.route("/api/batch", methods=["POST"])
+def handle_batch_request():
+    """
+    Runs many generations and streams one JSON result line per item as it completes.
+    Accepts JSONL (one {"prompt": ...} per line, options as query parameters) or a JSON
+    body {"items": [...], "batch_id": ..., "concurrency": ...}. Sending the same
+    batch_id again resumes the batch, skipping items that already succeeded.
+    """
+    from src.batch import parse_batch, run_batch
+    from src.generate_app import new_uid
+    from src.utils import UID_PATTERN
+
+    if request.is_json:
+        data = request.get_json()
+        lines = [json.dumps(item) for item in data.get("items", [])]
+    else:
+        data = request.args.to_dict()
+        lines = request.get_data(as_text=True).splitlines()
+    try:
+        items = parse_batch(lines)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not items:
+        return jsonify({"error": "Batch has no items"}), 400
+
+    batch_id = str(data.get("batch_id") or new_uid())
+    if not UID_PATTERN.match(batch_id):
+        return jsonify({"error": f"Invalid batch_id: {batch_id}"}), 400
+    # Requests can lower the concurrency but not exceed the server default
+    try:
+        concurrency = min(int(data.get("concurrency", DEFAULT_BATCH_CONCURRENCY)), DEFAULT_BATCH_CONCURRENCY)
+    except ValueError:
+        return jsonify({"error": "concurrency must be an integer"}), 400
+
+    results_path = DEFAULT_BATCH_DIR / f"{batch_id}.jsonl"
+
+    def rows():
+        # Items share the per-worker generation cap with every other generation request
+        for row in run_batch(items, results_path, max(1, concurrency), slots=serving_state.slots):
+            yield json.dumps(row) + "\n"
+
+    headers = {"X-Batch-Id": batch_id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(rows()), mimetype="application/x-ndjson", headers=headers)
+
+
+@app.route("/api/jobs", methods=["POST"])
+def handle_submit_job():
+    """
+    Queues a generation job and returns its id immediately.
+    Responds with 429 when the queue is full so clients can back off and retry.
+    With --job-worker-type process, "preview": true is rejected with 400: previews are kept
+    in the memory of the process that built them, which would be a pool worker the
+    server can't read from.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    try:
+        params = parse_generate_params(request.get_json())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if params["preview"] and job_queue.worker_type == "process":
+        return jsonify({"error": PROCESS_PREVIEW_ERROR}), 400
+
+    try:
+        job = job_queue.submit(params)
+    except QueueFullError as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+    return jsonify(job_queue.get(job.id)), 202
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def handle_job_status(job_id: str):
+    """
+    Returns the status and per-stage progress of a job.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job), 200
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def handle_job_result(job_id: str):
+    """
+    Returns the generate_app response of a finished job (409 while it is still pending).
+    """
+    job = job_queue.get(job_id, include_result=True)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if job["status"] == "failed":
+        return jsonify(job), 500
+    if job["status"] != "succeeded":
+        return jsonify(job), 409
+    return jsonify(job["result"]), 200
+
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def handle_cancel_job(job_id: str):
+    """
+    Cancels a job. A running job stops at its next stage and writes nothing afterwards.
+    """
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if not job_queue.cancel(job_id):
+        return jsonify({"error": "Job has already finished"}), 409
+    return jsonify(job_queue.get(job_id)), 200
+
+
+@app.route("/api/jobs", methods=["GET"])
+def handle_job_stats():
+    """
+    Returns worker pool configuration and job counts by status.
+    """
+    return jsonify(job_queue.stats()), 200
+
+
+@app.route("/api/generate/inflight", methods=["GET"])
+def handle_inflight_stats():
+    """
+    Lists the generations in flight with how many identical requests wait on each,
+    plus totals of model calls run and requests coalesced since startup.
+    """
+    from src.single_flight import single_flight
+
+    return jsonify(single_flight.stats()), 200
+
+
+@app.route("/api/cache", methods=["GET"])
+def handle_cache_stats():
+    """
+    Returns response cache size and hit/miss statistics.
+    """
+    from src.response_cache import response_cache
+
+    return jsonify(response_cache.stats()), 200
+
+
+@app.route("/api/cache", methods=["DELETE"])
+def handle_cache_clear():
+    """
+    Drops every cached model response.
+    """
+    from src.response_cache import response_cache
+
+    return jsonify({"removed": response_cache.clear()}), 200
+
+
+@app.route("/healthz", methods=["GET"])
+def handle_health():
+    """
+    Liveness: the worker is up and answering, whether or not it has warmed up yet.
+    """
+    return jsonify({"status": "ok", "uptime_seconds": serving_state.status()["uptime_seconds"]}), 200
+
+
+@app.route("/readyz", methods=["GET"])
+def handle_readiness():
+    """
+    Readiness: 200 once warm-up has succeeded, 503 while warming up, after a failed step or while draining.
+    """
+    status = serving_state.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+
+@app.route("/metrics", methods=["GET"])
+def handle_metrics():
+    """
+    Exposes counters and histograms in the Prometheus text format.
+    """
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Backend for Gemini-powered generator for the Vite + React + Material UI template."
     )
     parser.add_argument("--port", type=int, default=5000, help="Port to run the server on")
     parser.add_argument("--verbose", action="store_true", help="Verbose logging")
+    parser.add_argument(
+        "--log-format", choices=["json", "text"], default="json", help="Format of logs/app.log (default: json)"
+    )
+    parser.add_argument(
+        "--job-workers", type=int, default=DEFAULT_JOB_WORKERS, help="Number of background generation workers"
+    )
+    parser.add_argument(
+        "--job-worker-type",
+        choices=["thread", "process"],
+        default=DEFAULT_JOB_WORKER_TYPE,
+        help="Run background jobs in threads or processes",
+    )
+    parser.add_argument(
+        "--job-max-queue",
+        type=int,
+        default=DEFAULT_JOB_MAX_QUEUE,
+        help="Max jobs waiting for a worker before /api/jobs returns 429",
+    )
+    parser.add_argument(
+        "--max-generations",
+        type=int,
+        default=DEFAULT_SERVE_MAX_GENERATIONS,
+        help="Generation requests handled at once before others wait, then get a 503",
+    )
+    parser.add_argument("--no-warm-up", action="store_true", help="Skip warm-up; /readyz reports ready at once")
     return parser.parse_args()
 
 
+def create_app(
+    job_workers: int = DEFAULT_JOB_WORKERS,
+    job_worker_type: str = DEFAULT_JOB_WORKER_TYPE,
+    job_max_queue: int = DEFAULT_JOB_MAX_QUEUE,
+    max_generations: int = DEFAULT_SERVE_MAX_GENERATIONS,
+    slot_wait: float = DEFAULT_SERVE_SLOT_WAIT_SECONDS,
+    drain_seconds: float = DEFAULT_SERVE_DRAIN_SECONDS,
+    log_file: str = "app.log",
+    verbose: bool = False,
+    log_format: str = "json",
+    warm_up: bool = True,
+) -> Flask:
+    """
+    Configures logging, the job queue and serving limits for this process and returns the app.
+    Used by gunicorn (see gunicorn.conf.py) once per worker; log_file=None logs to stderr.
+    """
+    setup_logging(filename=log_file, verbose=verbose, json_format=log_format == "json")
+    job_queue.configure(workers=job_workers, worker_type=job_worker_type, max_queue=job_max_queue)
+    serving_state.configure(max_generations=max_generations, slot_wait=slot_wait)
+    serving_state.install_drain_handler(job_queue, drain_seconds)
+    if warm_up:
+        serving_state.start_warm_up(DEFAULT_TEMPLATE_REACT_APP_DIR)
+    else:
+        serving_state.warmed = True
+    return app
+
+
 # Run the Flask application
 if __name__ == "__main__":
     args = parse_args()
-    setup_logging(filename="app.log", verbose=args.verbose)
+    create_app(
+        job_workers=args.job_workers,
+        job_worker_type=args.job_worker_type,
+        job_max_queue=args.job_max_queue,
+        max_generations=args.max_generations,
+        verbose=args.verbose,
+        log_format=args.log_format,
+        warm_up=not args.no_warm_up,
+    )
+    # Development server; for production use gunicorn with gunicorn.conf.py
     app.run(port=args.port)
@@ -0,0 +1,76 @@
+"""
+Offline throughput benchmark for the shared Gemini client pool and per-model limiter.
+
+Runs `call_gemini` against FakeGeminiClient under a simulated quota and reports how
+many calls per second get through, how long callers queue and how many time out.
+
+Usage:
+  cd backend && python3 -m benchmarks.bench_gemini_limiter --calls 200 --concurrency 32 --rpm 600
+"""
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.fake_gemini import FakeGeminiClient
+from src.gemini_client import RateLimitTimeout, configure_gemini, get_limiter
+from src.gemini_handler import call_gemini
+
+
+def run(calls: int, concurrency: int, latency: float, max_concurrency: int, rpm: float, tpm: float, max_wait: float):
+    model = "fake-model"
+    configure_gemini(
+        factory=lambda: FakeGeminiClient(latency=latency),
+        limits={model: {"max_concurrency": max_concurrency, "rpm": rpm, "tpm": tpm, "max_wait": max_wait}},
+    )
+    latencies = []
+    timeouts = 0
+
+    def one(i: int) -> None:
+        nonlocal timeouts
+        started = time.perf_counter()
+        try:
+            call_gemini(f"prompt {i}", model)
+        except RateLimitTimeout:
+            timeouts += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+    return {
+        "calls": calls,
+        "completed": len(latencies),
+        "timeouts": timeouts,
+        "elapsed_seconds": round(elapsed, 3),
+        "calls_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50": round(pct(0.50), 4),
+        "latency_p95": round(pct(0.95), 4),
+        "latency_max": round(latencies[-1], 4) if latencies else 0.0,
+        "limiter": get_limiter(model).stats(),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the Gemini limiter against a fake client.")
+    parser.add_argument("--calls", type=int, default=200, help="Total number of calls")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent callers")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated model latency in seconds")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Limiter concurrency cap")
+    parser.add_argument("--rpm", type=float, default=6000, help="Simulated requests-per-minute quota")
+    parser.add_argument("--tpm", type=float, default=10_000_000, help="Simulated tokens-per-minute quota")
+    parser.add_argument("--max-wait", type=float, default=30.0, help="Max seconds a call may queue")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = run(args.calls, args.concurrency, args.latency, args.max_concurrency, args.rpm, args.tpm, args.max_wait)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,135 @@
+"""
+Benchmark the single-pass extractor (src.json_extract) against the previous
+extract_json_block -> json.loads -> sanitize_backtick_json chain.
+
+The corpus covers clean JSON, fenced responses, backtick content, content_lines and
+adversarial inputs that make the old regexes backtrack or rescan. Pass --corpus-dir to
+add real responses (e.g. gemini-responses/ or benchmarks/corpus/).
+
+Usage:
+  cd backend && python3 -m benchmarks.bench_json_extract --repeat 5
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.json_extract import extract_payload
+from src.utils import extract_json_block, sanitize_backtick_json
+
+
+def legacy_parse(raw: str) -> Dict[str, Any]:
+    json_text = extract_json_block(raw)
+    try:
+        return json.loads(json_text)
+    except Exception:
+        return sanitize_backtick_json(json_text)
+
+
+def _component(i: int, lines: int) -> str:
+    body = "\n".join(f"      <Typography key={{{n}}}>Row {n} of `item-${{id}}`</Typography>" for n in range(lines))
+    return (
+        "import Typography from '@mui/material/Typography';\n"
+        f"export default function Widget{i}({{ id }}: {{ id: string }}) {{\n  return (\n    <>\n{body}\n    </>\n  );\n}}\n"
+    )
+
+
+def _files(count: int, lines: int) -> List[Dict[str, str]]:
+    return [{"path": f"src/components/Widget{i}.tsx", "content": _component(i, lines)} for i in range(count)]
+
+
+def _backtick_response(count: int, lines: int) -> str:
+    parts = []
+    for f in _files(count, lines):
+        body = f["content"].replace("\\", "\\\\").replace("`", "\\`")
+        parts.append(f'{{"path": "{f["path"]}", "content": `{body}`}}')
+    return '{"files": [' + ",\n".join(parts) + "]}"
+
+
+def build_corpus() -> List[Tuple[str, str]]:
+    small = json.dumps({"files": _files(3, 20)})
+    large = json.dumps({"files": _files(60, 120)})
+    corpus = [
+        ("small", small),
+        ("large", large),
+        ("fenced_large", "Here is your app:\n```json\n" + json.dumps({"files": _files(60, 120)}, indent=2) + "\n```\n"),
+        (
+            "content_lines",
+            json.dumps({"files": [{"path": f["path"], "content_lines": f["content"].split("\n")} for f in _files(60, 120)]}),
+        ),
+        ("backtick_large", _backtick_response(60, 120)),
+        # Stray fences before the payload: the lazy fence regex rescans the text for each one
+        # and then captures the wrong block
+        ("adversarial_fences", "```json " * 2000 + json.dumps({"files": _files(10, 50)})),
+        # Long runs of escaped backticks stress the backtick alternation in sanitize_backtick_json
+        ("adversarial_backslashes", '{"files": [{"path": "src/a.ts", "content": `' + "\\`" * 50000 + "`}]}"),
+        # A non-standard value deep inside nested containers after a long strict prefix: retrying
+        # the C scanner at every nesting level would rescan the prefix once per level
+        (
+            "adversarial_nesting",
+            '{"files": [], "meta": ' + '{"x": ' * 400 + '{"pad": "' + "a" * 2_000_000 + '", "c": `b`}' + "}" * 401,
+        ),
+    ]
+    return corpus
+
+
+def load_corpus_dir(path: Path) -> List[Tuple[str, str]]:
+    return [(p.name, p.read_text(encoding="utf-8")) for p in sorted(path.iterdir()) if p.is_file()]
+
+
+def time_call(fn: Callable[[str], Any], raw: str, repeat: int) -> Dict[str, Any]:
+    timings = []
+    error = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            fn(raw)
+        except BaseException as exc:  # SystemExit is how both implementations fail
+            error = str(exc)[:80]
+        timings.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(timings) * 1000, 3), "error": error}
+
+
+def run(corpus: List[Tuple[str, str]], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for name, raw in corpus:
+        legacy = time_call(legacy_parse, raw, repeat)
+        single = time_call(extract_payload, raw, repeat)
+        comparable = not legacy["error"] and not single["error"] and single["median_ms"]
+        speedup = legacy["median_ms"] / single["median_ms"] if comparable else None
+        results.append(
+            {
+                "name": name,
+                "bytes": len(raw.encode("utf-8")),
+                "legacy": legacy,
+                "single_pass": single,
+                "speedup": round(speedup, 2) if speedup else None,
+            }
+        )
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark JSON extraction from model responses.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per input (median is reported)")
+    parser.add_argument("--corpus-dir", help="Directory of additional raw responses to include")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON instead of a table")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    corpus = build_corpus()
+    if args.corpus_dir:
+        corpus += load_corpus_dir(Path(args.corpus_dir))
+    results = run(corpus, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'input':<28}{'bytes':>10}{'legacy ms':>12}{'single ms':>12}{'speedup':>9}")
+        for r in results:
+            legacy = "error" if r["legacy"]["error"] else r["legacy"]["median_ms"]
+            single = "error" if r["single_pass"]["error"] else r["single_pass"]["median_ms"]
+            print(f"{r['name']:<28}{r['bytes']:>10}{legacy:>12}{single:>12}{str(r['speedup']):>9}")
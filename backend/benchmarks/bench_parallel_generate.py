@@ -0,0 +1,111 @@
+"""
+Offline comparison of the single-call and parallel generation strategies.
+
+FakeGeminiClient answers the contract, per-file and whole-app prompts with a synthetic
+app of `--files` components and takes time proportional to the length of its answer
+(`--chars-per-second`), which is how output-bound model calls behave. Optionally fails
+a fraction of calls to show that only those are retried.
+
+Usage:
+  cd backend && python3 -m benchmarks.bench_parallel_generate --files 24 --chars-per-second 20000
+"""
+import argparse
+import json
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import src.generate_app as generate_app_module
+import src.storage as storage_module
+from src.constants import DEFAULT_TEMPLATE_REACT_APP_DIR, FILE_PLAN_INSTRUCTIONS
+from src.fake_gemini import FakeGeminiClient
+from src.gemini_client import configure_gemini
+
+FAKE_MODEL = "fake-model"
+UNLIMITED = {"max_concurrency": 64, "rpm": 1_000_000, "tpm": 1_000_000_000}
+WRITE_ONLY = re.compile(r"Write ONLY these files.*?: (.+)$", re.S)
+
+
+def _component(path: str, lines: int) -> Dict[str, str]:
+    name = Path(path).stem
+    body = "\n".join(f"      <Typography>{name} line {n}</Typography>" for n in range(lines))
+    content = (
+        "import Typography from '@mui/material/Typography';\n"
+        "import type { Item } from '../types';\n\n"
+        f"export default function {name}(props: {{ items: Item[] }}) {{\n"
+        f"  return (\n    <>\n{body}\n    </>\n  );\n}}\n"
+    )
+    return {"path": path, "content": content}
+
+
+def make_responder(files: int, lines: int, chars_per_second: float, failure_rate: float):
+    paths = [f"src/components/Section{i}.tsx" for i in range(files)] + ["src/App.tsx"]
+    contract = {
+        "summary": "Synthetic dashboard",
+        "theme": {"mode": "light"},
+        "components": [{"name": "App", "children": [Path(p).stem for p in paths[:-1]]}],
+        "files": [
+            {"path": p, "summary": "A section", "exports": f"export default function {Path(p).stem}()"} for p in paths
+        ],
+        "shared_types": "export interface Item {\n  id: string;\n  label: string;\n}\n",
+    }
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    def respond(model: str, contents: Any, config: Any) -> str:
+        if config.get("system_instruction") == FILE_PLAN_INSTRUCTIONS:
+            text = json.dumps(contract)
+        else:
+            match = WRITE_ONLY.search(str(contents))
+            wanted = [p.strip() for p in match.group(1).split(",")] if match else paths
+            text = json.dumps({"files": [_component(p, lines) for p in wanted]})
+            with lock:
+                failed = match is not None and rng.random() < failure_rate
+            if failed:
+                # Simulate an output cut off mid-way
+                text = text[: len(text) // 2]
+        time.sleep(len(text) / chars_per_second)
+        return text
+
+    return respond
+
+
+def run(strategy: str, work: Path, responder) -> Dict[str, Any]:
+    configure_gemini(factory=lambda: FakeGeminiClient(responder=responder), limits={FAKE_MODEL: UNLIMITED})
+    started = time.perf_counter()
+    response = generate_app_module.generate_app(
+        "A dashboard", FAKE_MODEL, DEFAULT_TEMPLATE_REACT_APP_DIR, work / strategy, strategy=strategy, use_cache=False
+    )
+    return {
+        "strategy": strategy,
+        "seconds": round(time.perf_counter() - started, 3),
+        "files": len(response["files"]),
+        "timings": response["timings"],
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare single-call and parallel generation against a fake model.")
+    parser.add_argument("--files", type=int, default=24, help="Components in the synthetic app")
+    parser.add_argument("--lines", type=int, default=40, help="Lines per component")
+    parser.add_argument("--chars-per-second", type=float, default=20000, help="Simulated output speed of the model")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of per-file calls that get truncated")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    work = Path(tempfile.mkdtemp(prefix="bench-parallel-"))
+    generate_app_module.RESPONSES_DIR = work / "responses"
+    storage_module.blob_store.root = work / "blob-store"
+    try:
+        responder = make_responder(args.files, args.lines, args.chars_per_second, args.failure_rate)
+        results = [run(strategy, work, responder) for strategy in ("single", "parallel")]
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,295 @@
+"""
+Offline benchmark suite for the end-to-end generation pipeline.
+
+Measures each stage (legacy and single-pass parsing, template copy, write_files,
+generate_app via --raw-response-file and via a fake Gemini with configurable latency)
+over the corpus in benchmarks/corpus/, plus /api/generate throughput at several
+concurrency levels. Reports latency percentiles, files/sec, bytes/sec and peak
+memory, and writes machine-readable JSON so runs can be compared over time.
+
+Usage:
+  cd backend && python3 -m benchmarks.bench_pipeline --output bench-results.json
+  cd backend && python3 -m benchmarks.bench_pipeline --compare old.json --output new.json
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import src.generate_app as generate_app_module
+import src.storage as storage_module
+from src.constants import DEFAULT_TEMPLATE_REACT_APP_DIR
+from src.fake_gemini import FakeGeminiClient
+from src.gemini_client import configure_gemini
+from src.json_extract import extract_payload
+from src.utils import copy_template_to_uid, extract_json_block, write_files
+
+from .bench_json_extract import legacy_parse
+from .make_corpus import CORPUS_DIR, make_response
+
+FAKE_MODEL = "fake-model"
+# Quota high enough that the limiter never throttles the pipeline under test
+UNLIMITED = {FAKE_MODEL: {"max_concurrency": 1024, "rpm": 1e9, "tpm": 1e12}}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    repeat: int,
+    files: int = 0,
+    nbytes: int = 0,
+    setup: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """Time `fn` `repeat` times (after `setup`, untimed), then once more under tracemalloc."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    timings.sort()
+    mean = statistics.fmean(timings)
+    return {
+        "stage": name,
+        "runs": repeat,
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(timings, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+        "mean_ms": round(mean * 1000, 3),
+        "files_per_sec": round(files / mean, 1) if files and mean else None,
+        "bytes_per_sec": round(nbytes / mean) if nbytes and mean else None,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def bench_corpus_file(path: Path, work: Path, repeat: int) -> List[Dict[str, Any]]:
+    raw = path.read_text(encoding="utf-8")
+    nbytes = len(raw.encode("utf-8"))
+    data = extract_payload(raw)
+    nfiles = len(data.get("files", []))
+    content_bytes = sum(len(str(f.get("content", "")).encode("utf-8")) for f in data["files"])
+    label = path.stem
+    results = []
+
+    def legacy_extract() -> None:
+        try:
+            extract_json_block(raw)
+        except SystemExit:
+            pass
+
+    results.append(measure(f"{label}/extract_json_block", legacy_extract, repeat, nfiles, nbytes))
+    results.append(measure(f"{label}/legacy_parse", lambda: legacy_parse(raw), repeat, nfiles, nbytes))
+    results.append(measure(f"{label}/extract_payload", lambda: extract_payload(raw), repeat, nfiles, nbytes))
+
+    target = work / "write-target"
+
+    def fresh_target() -> None:
+        copy_template_to_uid(DEFAULT_TEMPLATE_REACT_APP_DIR, target)
+
+    results.append(
+        measure(
+            f"{label}/write_files",
+            lambda: write_files(target, data),
+            repeat,
+            nfiles,
+            content_bytes,
+            setup=fresh_target,
+        )
+    )
+    out_root = work / "out"
+    results.append(
+        measure(
+            f"{label}/generate_app(raw_response_file)",
+            lambda: generate_app_module.generate_app(
+                "benchmark",
+                FAKE_MODEL,
+                DEFAULT_TEMPLATE_REACT_APP_DIR,
+                out_root,
+                raw_response_file=str(path),
+                use_cache=False,
+            ),
+            repeat,
+            nfiles,
+            nbytes,
+        )
+    )
+    shutil.rmtree(out_root, ignore_errors=True)
+    return results
+
+
+def bench_fake_gemini(path: Path, work: Path, repeat: int, latency: float) -> Dict[str, Any]:
+    raw = path.read_text(encoding="utf-8")
+    configure_gemini(factory=lambda: FakeGeminiClient(response=raw, latency=latency), limits=UNLIMITED)
+    out_root = work / "out-fake"
+    result = measure(
+        f"{path.stem}/generate_app(fake_gemini latency={latency}s)",
+        lambda: generate_app_module.generate_app(
+            "benchmark", FAKE_MODEL, DEFAULT_TEMPLATE_REACT_APP_DIR, out_root, use_cache=False
+        ),
+        repeat,
+        len(extract_payload(raw)["files"]),
+        len(raw.encode("utf-8")),
+    )
+    shutil.rmtree(out_root, ignore_errors=True)
+    return result
+
+
+def bench_endpoint(path: Path, work: Path, requests: int, levels: List[int], latency: float) -> List[Dict[str, Any]]:
+    try:
+        from app import app
+    except ImportError as exc:
+        print(f"Skipping endpoint benchmark: {exc}")
+        return []
+
+    raw = path.read_text(encoding="utf-8")
+    configure_gemini(factory=lambda: FakeGeminiClient(response=raw, latency=latency), limits=UNLIMITED)
+    body = {"model": FAKE_MODEL, "out_root": str(work / "out-endpoint"), "cache": False}
+    results = []
+    for level in levels:
+        timings: List[float] = []
+        errors = 0
+
+        def one(i: int) -> None:
+            nonlocal errors
+            client = app.test_client()
+            started = time.perf_counter()
+            # A distinct prompt per request: identical in-flight prompts would share one model call
+            response = client.post("/api/generate", json={**body, "prompt": f"benchmark {level}-{i}"})
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+        timings.sort()
+        results.append(
+            {
+                "stage": f"/api/generate concurrency={level}",
+                "runs": requests,
+                "errors": errors,
+                "requests_per_sec": round(requests / elapsed, 2),
+                "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+                "p90_ms": round(percentile(timings, 0.90) * 1000, 3),
+                "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+            }
+        )
+    shutil.rmtree(work / "out-endpoint", ignore_errors=True)
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    before = {r["stage"]: r for r in baseline.get("results", [])}
+    print(f"{'stage':<60}{'before p50':>12}{'after p50':>12}{'change':>9}")
+    for r in current["results"]:
+        old = before.get(r["stage"])
+        if not old or not old.get("p50_ms"):
+            continue
+        change = (r["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+        print(f"{r['stage']:<60}{old['p50_ms']:>12}{r['p50_ms']:>12}{change:>+8.1f}%")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the generation pipeline offline.")
+    parser.add_argument("--corpus-dir", default=str(CORPUS_DIR), help="Directory of raw responses")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per stage")
+    parser.add_argument("--xlarge", action="store_true", help="Also benchmark a generated extra-large response")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake Gemini latency in seconds")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per endpoint concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Endpoint concurrency levels")
+    parser.add_argument("--skip-endpoint", action="store_true", help="Skip the /api/generate throughput benchmark")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="lovable-bench-") as tmp:
+        work = Path(tmp)
+        # Keep audit copies of responses out of the real gemini-responses/ dir
+        generate_app_module.RESPONSES_DIR = work / "gemini-responses"
+        storage_module.blob_store.root = work / "blob-store"
+        corpus = sorted(Path(args.corpus_dir).glob("*.txt"))
+        if args.xlarge:
+            xlarge = work / "xlarge-json.txt"
+            xlarge.write_text(make_response("xlarge"), encoding="utf-8")
+            corpus.append(xlarge)
+
+        results: List[Dict[str, Any]] = []
+        copy_target = work / "copy-target"
+        results.append(
+            measure(
+                "template/copy_template_to_uid",
+                lambda: copy_template_to_uid(DEFAULT_TEMPLATE_REACT_APP_DIR, copy_target),
+                args.repeat,
+                setup=lambda: shutil.rmtree(copy_target, ignore_errors=True),
+            )
+        )
+        for path in corpus:
+            results.extend(bench_corpus_file(path, work, args.repeat))
+            print(f"Benchmarked {path.name}")
+        largest = max(corpus, key=lambda p: p.stat().st_size)
+        results.append(bench_fake_gemini(largest, work, max(3, args.repeat // 3), args.latency))
+        if not args.skip_endpoint:
+            results.extend(bench_endpoint(largest, work, args.requests, args.concurrency, args.latency))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "latency": args.latency,
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Wrote {args.output}")
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), report)
+    else:
+        print(f"{'stage':<60}{'p50 ms':>10}{'p99 ms':>10}{'files/s':>10}{'peak KB':>10}")
+        for r in results:
+            print(
+                f"{r['stage']:<60}{r['p50_ms']:>10}{r['p99_ms']:>10}"
+                f"{str(r.get('files_per_sec', '')):>10}{str(r.get('peak_memory_kb', '')):>10}"
+            )
@@ -0,0 +1,111 @@
+"""
+Generate the synthetic model-response corpus used by the benchmarks.
+
+Output is deterministic, so the checked-in files in benchmarks/corpus/ can be
+regenerated at any time. Sizes larger than `large` are not checked in; the pipeline
+benchmark creates them in a temp dir on demand.
+
+Usage:
+  cd backend && python3 -m benchmarks.make_corpus --out benchmarks/corpus
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+CORPUS_DIR = BENCHMARK_DIR / "corpus"
+
+# name -> (files, lines per file)
+SIZES = {
+    "small": (3, 30),
+    "medium": (15, 80),
+    "large": (30, 100),
+    "xlarge": (120, 250),
+}
+CHECKED_IN = ("small", "medium", "large")
+
+ICONS = ["Home", "Search", "Delete", "Add", "Edit", "Settings", "Favorite", "ShoppingCart"]
+COMPONENTS = ["Box", "Button", "Card", "CardContent", "Typography", "Stack", "TextField", "Chip"]
+
+
+def _component(rng: random.Random, name: str, lines: int) -> str:
+    icons = rng.sample(ICONS, 2)
+    mui = rng.sample(COMPONENTS, 3)
+    body = "\n".join(
+        f"        <{mui[n % 3]} key=\"{n}\">{{`Row {n}: ${{items[{n} % items.length]}}`}}</{mui[n % 3]}>"
+        for n in range(lines)
+    )
+    return (
+        f"import {{ {', '.join(mui)} }} from '@mui/material';\n"
+        f"import {{ {', '.join(icons)} }} from '@mui/icons-material';\n"
+        "import { useState } from 'react';\n\n"
+        f"export default function {name}() {{\n"
+        "  const [items] = useState<string[]>(['alpha', 'beta', 'gamma']);\n"
+        "  return (\n"
+        "    <>\n"
+        f"      <{icons[0]} />\n"
+        f"{body}\n"
+        "    </>\n"
+        "  );\n"
+        "}\n"
+    )
+
+
+def make_files(files: int, lines: int, seed: int = 0) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    entries = [
+        {
+            "path": "src/App.tsx",
+            "content": (
+                "import Dashboard from './pages/Dashboard';\n\n"
+                "export default function App() {\n  return <Dashboard />;\n}\n"
+            ),
+        },
+        {"path": "src/pages/Dashboard.tsx", "content": _component(rng, "Dashboard", lines)},
+    ]
+    for i in range(max(0, files - len(entries))):
+        folder = ("components", "features", "widgets")[i % 3]
+        entries.append({"path": f"src/{folder}/Widget{i}.tsx", "content": _component(rng, f"Widget{i}", lines)})
+    return entries[:files]
+
+
+def make_response(size: str, variant: str = "json") -> str:
+    files, lines = SIZES[size]
+    entries = make_files(files, lines)
+    if variant == "fenced":
+        return "Here is the app you asked for:\n```json\n" + json.dumps({"files": entries}, indent=2) + "\n```\n"
+    if variant == "content_lines":
+        return json.dumps({"files": [{"path": e["path"], "content_lines": e["content"].split("\n")} for e in entries]})
+    if variant == "backtick":
+        parts = []
+        for e in entries:
+            body = e["content"].replace("\\", "\\\\").replace("`", "\\`")
+            parts.append(f'{{"path": "{e["path"]}", "content": `{body}`}}')
+        return '{"files": [\n' + ",\n".join(parts) + "\n]}"
+    return json.dumps({"files": entries})
+
+
+def write_corpus(out_dir: Path, sizes=CHECKED_IN) -> List[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for size in sizes:
+        for variant in ("json", "fenced", "backtick"):
+            path = out_dir / f"{size}-{variant}.txt"
+            path.write_text(make_response(size, variant), encoding="utf-8")
+            written.append(path)
+    return written
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus.")
+    parser.add_argument("--out", default=str(CORPUS_DIR), help=f"Output directory (default: {CORPUS_DIR})")
+    parser.add_argument("--sizes", nargs="+", default=list(CHECKED_IN), choices=list(SIZES), help="Sizes to write")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for path in write_corpus(Path(args.out), args.sizes):
+        print(f"{path} ({path.stat().st_size} bytes)")
@@ -0,0 +1,39 @@
+"""
+Production server configuration.
+
+Usage:
+  cd backend && gunicorn -c gunicorn.conf.py
+
+Each worker process builds its own app through create_app() and warms up in the
+background (see src/serving.py); /readyz turns 200 once it is done. The app is not
+preloaded in the master: the log listener, model clients and job pool are threads,
+which do not survive a fork. Generation requests are long and mostly wait on the
+model, so each worker serves them from a thread pool.
+
+Jobs, previews, speculative plan jobs and in-flight generation coalescing are kept in
+the worker's memory, so the default is a single worker scaled with threads. Running
+more workers (or instances) needs sticky routing per client, otherwise requests for a
+job or preview created on another worker get a 404.
+"""
+from src.constants import DEFAULT_SERVE_DRAIN_SECONDS, DEFAULT_SERVE_THREADS, DEFAULT_SERVE_WORKERS
+
+# Logs go to stderr: one rotating file can't be shared by several workers
+wsgi_app = "app:create_app(log_file=None)"
+bind = "0.0.0.0:5000"
+workers = DEFAULT_SERVE_WORKERS
+worker_class = "gthread"
+threads = DEFAULT_SERVE_THREADS
+# Model calls can take minutes; the worker heartbeat is separate from request time
+timeout = 300
+# Requests and jobs share one drain deadline counted from SIGTERM (see ServingState.drain);
+# the margin lets the worker exit on its own before the master kills it
+graceful_timeout = int(DEFAULT_SERVE_DRAIN_SECONDS) + 5
+keepalive = 5
+
+
+def worker_exit(server, worker):
+    # In-flight requests are done by now; background jobs get what is left of the deadline set at SIGTERM
+    from app import job_queue
+    from src.serving import serving_state
+
+    serving_state.drain(job_queue, DEFAULT_SERVE_DRAIN_SECONDS)
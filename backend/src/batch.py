@@ -0,0 +1,199 @@
+"""
+Batch generation: many prompts in, one JSONL result line per prompt out.
+
+Each input line is a JSON object with a `prompt` and optionally `id`, `model`,
+`app_dir`, `out_root`, `raw_response_file` and `cache`. Items run concurrently up
+to a limit, all sharing one template manifest, and every result is appended to the
+results file as soon as it completes. Re-running with the same results file skips
+the items that already succeeded, so an interrupted batch resumes where it stopped.
+
+Usage:
+  cd backend && python3 -m src.batch prompts.jsonl --output results.jsonl --concurrency 4
+"""
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from .constants import (
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_GENERATED_APP_DIR,
+    DEFAULT_MODEL,
+    DEFAULT_TEMPLATE_REACT_APP_DIR,
+)
+from .generate_app import generate_app
+from .logger import log_context, setup_logging
+from .template_manifest import get_manifest
+
+
+def _item_id(index: int, item: Dict[str, Any]) -> str:
+    # Stable across runs of the same input, so finished items can be recognised on resume
+    digest = hashlib.sha256(json.dumps(item, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+    return f"{index}-{digest}"
+
+
+def parse_batch(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Parse JSONL batch input; every item gets an `id` (given or derived)."""
+    items = []
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Line {index + 1}: invalid JSON ({exc})") from None
+        if not isinstance(item, dict) or not item.get("prompt"):
+            raise ValueError(f"Line {index + 1}: each item needs a 'prompt'")
+        item.setdefault("id", _item_id(index, item))
+        items.append(item)
+    ids = [item["id"] for item in items]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Batch item ids must be unique")
+    return items
+
+
+def finished_ids(results_path: Path) -> Set[str]:
+    """Ids that already succeeded according to an existing results file."""
+    done: Set[str] = set()
+    if not results_path.exists():
+        return done
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run; that item simply runs again
+                continue
+            if row.get("status") == "succeeded":
+                done.add(row.get("id"))
+    return done
+
+
+def _run_item(item: Dict[str, Any], manifests: Dict[Path, Any], slots: Optional[Any] = None) -> Dict[str, Any]:
+    app_dir = Path(item.get("app_dir", DEFAULT_TEMPLATE_REACT_APP_DIR)).resolve()
+    if slots is not None:
+        # Each item counts against the server's generation cap like a single request would
+        slots.acquire(blocking=True)
+    started = time.perf_counter()
+    row: Dict[str, Any] = {"id": item["id"], "prompt": item["prompt"]}
+    try:
+        with log_context(job_id=f"batch-{item['id']}"):
+            response = generate_app(
+                item["prompt"],
+                item.get("model", DEFAULT_MODEL),
+                app_dir,
+                Path(item.get("out_root", DEFAULT_GENERATED_APP_DIR)),
+                raw_response_file=item.get("raw_response_file"),
+                use_cache=str(item.get("cache", True)).lower() not in ("false", "0", "no"),
+                template_manifest=manifests.get(app_dir),
+            )
+        row.update(
+            status="succeeded",
+            uid=response["uid"],
+            target_dir=response["target_dir"],
+            files=[f["path"] for f in response["files"]],
+            cache_hit=response["cache_hit"],
+            timings=response["timings"],
+        )
+    except (Exception, SystemExit) as exc:
+        logging.exception(f"Batch item {item['id']} failed")
+        row.update(status="failed", error=str(exc))
+    finally:
+        if slots is not None:
+            slots.release()
+    row["seconds"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+def run_batch(
+    items: List[Dict[str, Any]],
+    results_path: Optional[Path] = None,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    slots: Optional[Any] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Run the items concurrently, yielding each result row as it completes.
+
+    Rows are also appended to `results_path` (if given) as they complete; items that
+    already succeeded there are skipped. Items are submitted lazily so at most
+    `concurrency` are in flight and a large batch does not pile up in the executor.
+    With `slots` (the server's GenerationSlots), every item waits for a slot of its own.
+    """
+    skip = finished_ids(results_path) if results_path else set()
+    pending = [item for item in items if item["id"] not in skip]
+    if skip:
+        logging.info(f"Resuming batch: {len(items) - len(pending)} of {len(items)} items already done")
+
+    # Scan each template once for the whole batch instead of once per generation
+    manifests = {}
+    for item in pending:
+        app_dir = Path(item.get("app_dir", DEFAULT_TEMPLATE_REACT_APP_DIR)).resolve()
+        if app_dir not in manifests and app_dir.exists():
+            manifests[app_dir] = get_manifest(app_dir)
+
+    out = None
+    if results_path:
+        results_path.parent.mkdir(parents=True, exist_ok=True)
+        out = open(results_path, "a", encoding="utf-8")
+    write_lock = threading.Lock()
+    queue = iter(pending)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+            in_flight = set()
+            for item in queue:
+                in_flight.add(pool.submit(_run_item, item, manifests, slots))
+                if len(in_flight) >= concurrency:
+                    break
+            while in_flight:
+                completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    row = future.result()
+                    if out is not None:
+                        with write_lock:
+                            out.write(json.dumps(row) + "\n")
+                            out.flush()
+                    yield row
+                    next_item = next(queue, None)
+                    if next_item is not None:
+                        in_flight.add(pool.submit(_run_item, next_item, manifests, slots))
+    finally:
+        if out is not None:
+            out.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate many apps from a JSONL file of prompts.")
+    parser.add_argument("input", help="JSONL file, one {\"prompt\": ...} object per line")
+    parser.add_argument("--output", help="Results JSONL file, also used to resume (default: <input>.results.jsonl)")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help=f"Generations to run at once (default: {DEFAULT_BATCH_CONCURRENCY})",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(filename="batch.log", verbose=args.verbose)
+    input_path = Path(args.input)
+    output_path = Path(args.output) if args.output else input_path.with_suffix(".results.jsonl")
+    try:
+        batch = parse_batch(input_path.read_text(encoding="utf-8").splitlines())
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    failed = 0
+    for result in run_batch(batch, output_path, args.concurrency):
+        failed += result["status"] != "succeeded"
+        print(json.dumps(result), flush=True)
+    print(f"Results: {output_path}", file=sys.stderr)
+    if failed:
+        raise SystemExit(f"{failed} batch items failed")
@@ -7,6 +7,96 @@ DEFAULT_MODEL = "gemini-2.5-flash"
 DEFAULT_TEMPLATE_REACT_APP_DIR = PROJECT_ROOT / "template-react-ts"
 DEFAULT_GENERATED_APP_DIR = PROJECT_ROOT / "generated-app"
 
+# Build artifacts and package manager directories never copied out of the template
+TEMPLATE_IGNORE_PATTERNS = ("node_modules", "dist", ".next", ".turbo", ".parcel-cache", ".vite", "build")
+# How unchanged template files are materialised: "reflink" (falls back to a copy where the
+# filesystem can't clone), "copy" or "hardlink". Hardlinks share inodes with the template, so an
+# in-place write in an app would change the template too: only use them for read-only apps.
+DEFAULT_TEMPLATE_LINK_MODE = "reflink"
+# Template files that npm, editors and tooling rewrite in place; always materialised as real copies
+TEMPLATE_COPY_PATTERNS = ("package.json", "package-lock.json", "*.config.*", "tsconfig*.json", "index.html", ".*")
+
+# Shared node_modules store for --auto-install, keyed by lockfile hash
+DEFAULT_DEP_STORE_DIR = PROJECT_ROOT / "dep-store"
+DEFAULT_DEP_STORE_MAX_AGE_DAYS = 30
+
+# write_files: thread pool size, and the file count below which files are written serially
+DEFAULT_WRITE_WORKERS = 8
+PARALLEL_WRITE_THRESHOLD = 8
+# Offline import checks of generated files (src/validate_app.py)
+DEFAULT_VALIDATE_WORKERS = 4
+PARALLEL_VALIDATE_THRESHOLD = 8
+# Package export index per lockfile, built from node_modules type declarations
+DEFAULT_VALIDATION_INDEX_DIR = PROJECT_ROOT / "validation-index"
+VALIDATE_GENERATED_FILES = True
+
+# Background job queue for /api/jobs
+DEFAULT_JOB_WORKERS = 4
+DEFAULT_JOB_WORKER_TYPE = "thread"  # "thread" or "process"
+DEFAULT_JOB_MAX_QUEUE = 16
+DEFAULT_JOB_RETENTION_SECONDS = 60 * 60
+
+# Production serving (gunicorn.conf.py / create_app in app.py). Jobs, previews and in-flight
+# generations live in process memory, so one worker process scales with threads
+DEFAULT_SERVE_WORKERS = 1
+DEFAULT_SERVE_THREADS = 32
+# Per worker: generation requests handled at once, and how long another may wait for a slot before a 503
+DEFAULT_SERVE_MAX_GENERATIONS = 4
+DEFAULT_SERVE_SLOT_WAIT_SECONDS = 5.0
+# On shutdown: how long in-flight requests and background jobs get to finish, together, from SIGTERM
+DEFAULT_SERVE_DRAIN_SECONDS = 30.0
+
+# On-disk cache of raw model responses, keyed by prompt/model/instructions
+DEFAULT_RESPONSE_CACHE_DIR = PROJECT_ROOT / "response-cache"
+DEFAULT_RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Shared Gemini clients and per-model limits (requests/tokens per minute)
+DEFAULT_GEMINI_CLIENT_POOL_SIZE = 4
+DEFAULT_MODEL_LIMITS = {"max_concurrency": 8, "rpm": 60, "tpm": 1_000_000}
+MODEL_LIMITS = {
+    "gemini-2.5-flash": {"max_concurrency": 8, "rpm": 1000, "tpm": 1_000_000},
+    "gemini-2.5-pro": {"max_concurrency": 4, "rpm": 150, "tpm": 2_000_000},
+    "gemini-2.5-flash-lite": {"max_concurrency": 16, "rpm": 4000, "tpm": 4_000_000},
+}
+DEFAULT_RATE_LIMIT_MAX_WAIT_SECONDS = 30.0
+
+# Server-side context caching of system instructions. Gemini refuses caches below a
+# per-model minimum size; shorter instructions are sent as a plain system instruction.
+ENABLE_CONTEXT_CACHE = True
+DEFAULT_CONTEXT_CACHE_TTL_SECONDS = 60 * 60
+DEFAULT_CONTEXT_CACHE_REFRESH_SECONDS = 5 * 60
+DEFAULT_CONTEXT_CACHE_RETRY_SECONDS = 10 * 60
+DEFAULT_CONTEXT_CACHE_MIN_TOKENS = 4096
+CONTEXT_CACHE_MIN_TOKENS = {"gemini-2.5-flash": 1024, "gemini-2.5-pro": 4096}
+
+# Logging: rotation, payload shortening ("truncate" keeps the head, "hash" keeps only a digest)
+# and the fraction of verbose records kept outside --verbose runs
+DEFAULT_LOG_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 5
+DEFAULT_LOG_PAYLOAD_LIMIT = 2048
+DEFAULT_LOG_PAYLOAD_MODE = "truncate"
+DEFAULT_LOG_SAMPLE_RATE = 0.1
+DEFAULT_LOG_QUEUE_SIZE = 10000
+
+# Content-addressed store for generated files, reflinked into each generated app (see src/storage.py)
+DEFAULT_BLOB_STORE_DIR = PROJECT_ROOT / "blob-store"
+DEDUPE_GENERATED_FILES = True
+# Blobs used this recently are never collected, so gc can't remove one between put() and its link
+DEFAULT_BLOB_GC_GRACE_SECONDS = 60 * 60
+DEFAULT_RESPONSES_DIR = PROJECT_ROOT / "gemini-responses"
+
+# Retention for generated-app/, gemini-responses/ and the blob store (python -m src.storage gc)
+DEFAULT_RETENTION_MAX_AGE_DAYS = 30
+DEFAULT_RETENTION_MAX_BYTES = 10 * 1024 * 1024 * 1024
+
+# In-memory preview overlays: total bytes of generated files kept before LRU eviction
+DEFAULT_PREVIEW_MAX_BYTES = 64 * 1024 * 1024
+
+# Batch generation: concurrent generations per batch, and where /api/batch keeps results for resuming
+DEFAULT_BATCH_CONCURRENCY = 4
+DEFAULT_BATCH_DIR = PROJECT_ROOT / "batches"
+
 SYSTEM_INSTRUCTIONS = (
     "You are a senior Vite + React + TypeScript developer. Use Material UI (MUI) components imported from @mui/material:^7.3.1 and @mui/icons-material:^7.3.1 only. "
     "For all designs I ask you to make, have them be beautiful, not cookie cutter. Make webpages that are fully featured and worthy for production."
@@ -17,3 +107,52 @@ SYSTEM_INSTRUCTIONS = (
     "Rules: 1) Do not include markdown fences or backticks anywhere. 2) Keep dependencies to those already available (react, @mui/material, @mui/icons-material). "
     "3) Provide complete file contents. 4) Use functional React components and TypeScript. 5) Keep to client-side only."
 )
+
+EDIT_INSTRUCTIONS = (
+    "You are a senior Vite + React + TypeScript developer editing an existing app built with Material UI (MUI) v7 "
+    "(@mui/material and @mui/icons-material). You receive a manifest of every file in the app (path, sha256, size, summary) "
+    "and the full contents of the files most relevant to the change. "
+    "Use import type for all TypeScript type imports. "
+    'Return ONLY valid JSON with this exact schema: {\n  "files": [\n    { "path": "src/...", "content": "..." }\n  ],\n  "deleted": ["src/..."]\n}. '
+    "Include ONLY files you add or modify, each with its complete new content, and list removed files in deleted. "
+    "Do not repeat unchanged files. Keep to existing paths and conventions; only write under src/ or public/. "
+    "Rules: 1) Do not include markdown fences or backticks anywhere. 2) Keep dependencies to those already available. "
+    "3) If you need a file that was not included, you may rewrite it completely based on its summary."
+)
+
+PLAN_INSTRUCTIONS = (
+    "You are a senior Vite + React + TypeScript developer planning an app built with Material UI (MUI) v7. "
+    "Do not write any code. Describe the app you would build as a compact plan. "
+    'Return ONLY valid JSON with this exact schema: {\n  "summary": "...",\n  "theme": {"mode": "light|dark", "primary": "#hex", '
+    '"secondary": "#hex", "font": "..."},\n  "components": [{"name": "App", "children": ["Header", "..."]}],\n  '
+    '"files": [{"path": "src/...", "summary": "..."}]\n}. '
+    "Keep every summary to one short sentence and list at most 20 files, all under src/. "
+    "Rules: 1) Do not include markdown fences or backticks anywhere. 2) Only plan for react, @mui/material and @mui/icons-material."
+)
+
+# Two-tier preview: a fast model returns a plan first, the full generation follows it
+DEFAULT_PLAN_MODEL = "gemini-2.5-flash-lite"
+DEFAULT_PLAN_MAX_FILES = 20
+
+FILE_PLAN_INSTRUCTIONS = (
+    "You are a senior Vite + React + TypeScript developer planning an app built with Material UI (MUI) v7 that several "
+    "developers will implement in parallel, one file each, without seeing each other's code. Do not write components yet. "
+    'Return ONLY valid JSON with this exact schema: {\n  "summary": "...",\n  "theme": {"mode": "light|dark", "primary": "#hex"},\n  '
+    '"components": [{"name": "App", "children": ["Header", "..."]}],\n  '
+    '"files": [{"path": "src/...", "summary": "...", "exports": "export default function Header(props: HeaderProps): JSX.Element"}],\n  '
+    '"shared_types": "complete TypeScript source of src/types.ts"\n}. '
+    "exports must give the exact exported names and signatures (including props types) of every file, so files can be written "
+    "independently. Put every type used by more than one file in shared_types. Include src/App.tsx; do not list src/types.ts. "
+    "Rules: 1) Do not include markdown fences or backticks anywhere. 2) Only plan for react, @mui/material and @mui/icons-material."
+)
+
+# Parallel generation strategy: one contract plan, then file bodies generated concurrently
+SHARED_TYPES_PATH = "src/types.ts"
+DEFAULT_PARALLEL_FILES_PER_CALL = 1
+DEFAULT_PARALLEL_WORKERS = 8
+DEFAULT_PARALLEL_RETRIES = 2
+DEFAULT_PARALLEL_MAX_FILES = 40
+
+# Follow-up edits: how much existing code is sent along with the manifest
+DEFAULT_EDIT_MAX_CONTEXT_FILES = 6
+DEFAULT_EDIT_MAX_CONTEXT_BYTES = 60 * 1024
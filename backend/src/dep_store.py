@@ -0,0 +1,248 @@
+"""
+Shared dependency store for --auto-install.
+
+Generated apps almost always share the template's package.json/package-lock.json, so
+dependencies are installed once per lockfile hash under dep-store/<hash>/node_modules and
+linked into each generated app instead of running a cold `npm install` per app.
+
+Usage:
+  python3 -m src.dep_store list
+  python3 -m src.dep_store gc --max-age-days 30
+  python3 -m src.dep_store invalidate --key <hash> | --all
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from .constants import DEFAULT_DEP_STORE_DIR, DEFAULT_DEP_STORE_MAX_AGE_DAYS
+from .template_manifest import link_or_copy
+
+COMPLETE_MARKER = ".complete"
+LAST_USED_MARKER = ".last_used"
+_key_locks: Dict[str, threading.Lock] = {}
+_key_locks_guard = threading.Lock()
+
+
+def lockfile_key(app_dir: Path) -> str:
+    h = hashlib.sha256()
+    for name in ("package.json", "package-lock.json"):
+        path = Path(app_dir) / name
+        h.update(name.encode("utf-8"))
+        h.update(path.read_bytes() if path.exists() else b"")
+    return h.hexdigest()[:32]
+
+
+@contextmanager
+def _store_lock(store_dir: Path, key: str) -> Iterator[None]:
+    # One installer per key, across threads and (where flock exists) processes; other keys install in parallel
+    store_dir.mkdir(parents=True, exist_ok=True)
+    with _key_locks_guard:
+        thread_lock = _key_locks.setdefault(key, threading.Lock())
+    lock_path = store_dir / f"{key}.lock"
+    with thread_lock:
+        while True:
+            with open(lock_path, "w") as lock_file:
+                try:
+                    import fcntl
+
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                except ImportError:  # pragma: no cover
+                    pass
+                # gc/invalidate unlink the lock file while holding it; a process that was waiting on
+                # the unlinked file must lock the new one, or it would run alongside its holder
+                try:
+                    current = os.stat(lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    yield
+                    return
+
+
+def _remove_entry(store_dir: Path, name: str) -> None:
+    # Under the key's lock, so an install of the same key is never removed half-way
+    key = name[: -len(".tmp")] if name.endswith(".tmp") else name
+    with _store_lock(store_dir, key):
+        shutil.rmtree(store_dir / name, ignore_errors=True)
+        (store_dir / f"{key}.lock").unlink(missing_ok=True)
+
+
+def _install(app_dir: Path, entry: Path) -> None:
+    tmp = entry.with_name(f"{entry.name}.tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+    for name in ("package.json", "package-lock.json"):
+        if (app_dir / name).exists():
+            shutil.copy2(app_dir / name, tmp / name)
+    cmd = ["npm", "ci" if (tmp / "package-lock.json").exists() else "install", "--no-audit", "--no-fund"]
+    logging.info(f"Installing dependencies into store: {' '.join(cmd)} in {tmp}")
+    started = time.time()
+    subprocess.run(cmd, cwd=str(tmp), check=True)
+    (tmp / COMPLETE_MARKER).write_text(json.dumps({"installed_at": time.time()}))
+    if entry.exists():
+        shutil.rmtree(entry)
+    os.replace(tmp, entry)
+    logging.info(f"Dependency store entry {entry.name} installed in {time.time() - started:.1f}s")
+
+
+def ensure_store_entry(app_dir: Path, store_dir: Path = DEFAULT_DEP_STORE_DIR) -> Path:
+    """Return the store entry for app_dir's lockfile, installing it on first use."""
+    key = lockfile_key(app_dir)
+    entry = Path(store_dir) / key
+    if not (entry / COMPLETE_MARKER).exists():
+        with _store_lock(Path(store_dir), key):
+            # Another worker may have finished the install while we waited
+            if not (entry / COMPLETE_MARKER).exists():
+                _install(Path(app_dir), entry)
+    (entry / LAST_USED_MARKER).touch()
+    return entry
+
+
+def _link_tree(src: Path, dst: Path) -> None:
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel = Path(dirpath).relative_to(src)
+        (dst / rel).mkdir(parents=True, exist_ok=True)
+        for name in filenames:
+            s = Path(dirpath) / name
+            d = dst / rel / name
+            if s.is_symlink():
+                os.symlink(os.readlink(s), d)
+            else:
+                link_or_copy(s, d, "hardlink")
+        # os.walk does not descend into symlinked dirs (npm's .bin entries); recreate them
+        for name in list(dirnames):
+            s = Path(dirpath) / name
+            if s.is_symlink():
+                os.symlink(os.readlink(s), dst / rel / name)
+                dirnames.remove(name)
+
+
+def install_dependencies(target_dir: Path, mode: str = "hardlink", store_dir: Path = DEFAULT_DEP_STORE_DIR) -> Path:
+    """Link node_modules for target_dir from the shared store.
+
+    mode "hardlink" (default) builds a private directory tree of hardlinks: files an
+    app's tools add, such as vite's node_modules/.vite optimizer cache, stay in that
+    app. "symlink" points node_modules at the store entry itself (instant), so such
+    writes land in the shared entry; only use it for apps that are not run concurrently.
+    """
+    entry = ensure_store_entry(target_dir, store_dir)
+    node_modules = Path(target_dir) / "node_modules"
+    if node_modules.is_symlink() or node_modules.is_file():
+        node_modules.unlink()
+    elif node_modules.exists():
+        shutil.rmtree(node_modules)
+    started = time.time()
+    if mode == "symlink":
+        node_modules.symlink_to((entry / "node_modules").resolve(), target_is_directory=True)
+    elif mode == "hardlink":
+        _link_tree(entry / "node_modules", node_modules)
+    else:
+        raise ValueError(f"Unknown dependency link mode: {mode}")
+    logging.info(f"Linked node_modules from store {entry.name} ({mode}) in {time.time() - started:.3f}s")
+    return entry
+
+
+def list_entries(store_dir: Path = DEFAULT_DEP_STORE_DIR) -> List[Dict[str, Any]]:
+    rows = []
+    if not Path(store_dir).exists():
+        return rows
+    for entry in sorted(Path(store_dir).iterdir()):
+        if not entry.is_dir():
+            continue
+        last_used = entry / LAST_USED_MARKER
+        rows.append(
+            {
+                "key": entry.name,
+                "complete": (entry / COMPLETE_MARKER).exists(),
+                "last_used": last_used.stat().st_mtime if last_used.exists() else entry.stat().st_mtime,
+            }
+        )
+    return rows
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def invalidate(key: str = None, store_dir: Path = DEFAULT_DEP_STORE_DIR) -> List[str]:
+    """Remove one store entry (or all of them when key is None) together with its lock file."""
+    removed = []
+    for row in list_entries(store_dir):
+        if key is None or row["key"] == key:
+            _remove_entry(Path(store_dir), row["key"])
+            removed.append(row["key"])
+    return removed
+
+
+def gc(max_age_days: float = DEFAULT_DEP_STORE_MAX_AGE_DAYS, store_dir: Path = DEFAULT_DEP_STORE_DIR) -> Dict[str, Any]:
+    """Remove entries unused for max_age_days and leftovers of interrupted installs.
+
+    Apps whose node_modules is a symlink into a removed entry must be re-linked
+    (generate with --auto-install again or call install_dependencies).
+    """
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    removed, reclaimed = [], 0
+    for row in list_entries(store_dir):
+        path = Path(store_dir) / row["key"]
+        # Incomplete entries get an hour's grace in case an install is still running
+        abandoned = (row["key"].endswith(".tmp") or not row["complete"]) and row["last_used"] < time.time() - 3600
+        if abandoned or row["last_used"] < cutoff:
+            reclaimed += _dir_size(path)
+            _remove_entry(Path(store_dir), row["key"])
+            removed.append(row["key"])
+    # Lock files left behind by entries removed before gc cleaned them up
+    for lock_path in Path(store_dir).glob("*.lock") if Path(store_dir).exists() else []:
+        key = lock_path.name[: -len(".lock")]
+        with _store_lock(Path(store_dir), key):
+            # Checked under the lock: an install holds it before it creates <key>.tmp
+            if not lock_path.with_name(key).exists() and not lock_path.with_name(f"{key}.tmp").exists():
+                lock_path.unlink(missing_ok=True)
+    logging.info(f"Dependency store GC removed {len(removed)} entries, reclaimed {reclaimed} bytes")
+    return {"removed": removed, "reclaimed_bytes": reclaimed}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Manage the shared node_modules store used by --auto-install.")
+    parser.add_argument("--store-dir", default=str(DEFAULT_DEP_STORE_DIR), help="Dependency store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List store entries")
+    gc_parser = sub.add_parser("gc", help="Remove stale and incomplete entries")
+    gc_parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=DEFAULT_DEP_STORE_MAX_AGE_DAYS,
+        help=f"Remove entries not used for this many days (default: {DEFAULT_DEP_STORE_MAX_AGE_DAYS})",
+    )
+    inv_parser = sub.add_parser("invalidate", help="Remove a specific entry or all entries")
+    group = inv_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--key", help="Lockfile hash of the entry to remove")
+    group.add_argument("--all", action="store_true", help="Remove every entry")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    store = Path(args.store_dir)
+    if args.command == "list":
+        print(json.dumps(list_entries(store), indent=2))
+    elif args.command == "gc":
+        print(json.dumps(gc(args.max_age_days, store), indent=2))
+    elif args.command == "invalidate":
+        print(json.dumps({"removed": invalidate(None if args.all else args.key, store)}, indent=2))
@@ -0,0 +1,300 @@
+"""
+Incremental follow-up edits to an already generated app.
+
+Instead of regenerating the whole app, the model receives a compact manifest of the
+app (path, sha256, size and a one-line summary per file) plus the full text of only
+the files that look relevant to the follow-up prompt. It answers with just the files
+it adds or modifies and the paths it deletes, which are applied in place.
+
+Usage:
+  cd backend && python3 -m src.edit_app --uid 20250101-120000-abcd1234 --prompt "Make the header dark"
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .constants import (
+    DEFAULT_EDIT_MAX_CONTEXT_BYTES,
+    DEFAULT_EDIT_MAX_CONTEXT_FILES,
+    DEFAULT_GENERATED_APP_DIR,
+    DEFAULT_MODEL,
+    EDIT_INSTRUCTIONS,
+)
+from .gemini_handler import call_gemini
+from .generate_app import StageTimer, build_file_rows, new_uid, parse_response, save_parsed_response
+from .logger import setup_logging
+from .metrics import FILES_WRITTEN, GENERATIONS
+from .storage import generated_files_store
+from .utils import generated_app_dir, is_within, write_files
+
+EDITABLE_DIRS = ("src", "public")
+# The entry component is almost always involved in layout/routing changes
+ALWAYS_RELEVANT = ("src/App.tsx",)
+
+EXPORT_PATTERN = re.compile(
+    r"export\s+(?:default\s+)?(?:async\s+)?(?:function|class|const|let|interface|type|enum)\s+([A-Za-z_$][\w$]*)"
+)
+LOCAL_IMPORT_PATTERN = re.compile(r"""^\s*import\s[^'"]*?['"](\.{1,2}/[^'"]+)['"]""", re.MULTILINE)
+WORD_PATTERN = re.compile(r"[A-Za-z][a-z0-9]+|[A-Z]+(?![a-z])")
+STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "add", "make", "change", "use",
+    "should", "please", "page", "app", "component", "file", "new", "all", "when", "also",
+}
+
+# One edit at a time per app, so concurrent edits can't interleave their writes and deletes
+_app_locks: Dict[str, threading.Lock] = {}
+_app_locks_guard = threading.Lock()
+
+
+def summarize_file(rel_path: str, text: str) -> str:
+    """One-line summary of a source file: its exports and local imports."""
+    if rel_path.endswith((".ts", ".tsx", ".js", ".jsx")):
+        parts = []
+        exports = list(dict.fromkeys(EXPORT_PATTERN.findall(text)))
+        if exports:
+            parts.append("exports " + ", ".join(exports[:6]))
+        imports = LOCAL_IMPORT_PATTERN.findall(text)
+        if imports:
+            parts.append("imports " + ", ".join(imports[:6]))
+        if parts:
+            return "; ".join(parts)
+    elif rel_path.endswith(".css"):
+        return f"{text.count('{')} rules"
+    return f"{text.count(chr(10)) + 1} lines"
+
+
+def build_manifest(app_root: Path) -> Dict[str, Dict[str, Any]]:
+    """Manifest of the editable files of a generated app, keyed by relative path.
+
+    Each entry carries size, sha256, summary and the decoded text (None for binary files).
+    """
+    app_root = Path(app_root)
+    manifest: Dict[str, Dict[str, Any]] = {}
+    for top in EDITABLE_DIRS:
+        for dirpath, dirnames, filenames in os.walk(app_root / top):
+            dirnames[:] = sorted(d for d in dirnames if d != "node_modules" and not d.startswith("."))
+            for name in sorted(filenames):
+                path = Path(dirpath) / name
+                rel = path.relative_to(app_root).as_posix()
+                data = path.read_bytes()
+                try:
+                    text: Optional[str] = data.decode("utf-8")
+                except UnicodeDecodeError:
+                    text = None
+                manifest[rel] = {
+                    "path": rel,
+                    "size": len(data),
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                    "summary": summarize_file(rel, text) if text is not None else "binary",
+                    "text": text,
+                }
+    return manifest
+
+
+def _words(text: str) -> set:
+    # CamelCase and path segments split into lowercase words: "TodoList.tsx" -> {"todo", "list", "tsx"}
+    return {w.lower() for w in WORD_PATTERN.findall(text) if len(w) > 2} - STOP_WORDS
+
+
+def select_context_files(
+    manifest: Dict[str, Dict[str, Any]],
+    prompt: str,
+    max_files: int = DEFAULT_EDIT_MAX_CONTEXT_FILES,
+    max_bytes: int = DEFAULT_EDIT_MAX_CONTEXT_BYTES,
+) -> List[str]:
+    """Pick the files whose full text is sent along with the manifest.
+
+    Files are scored by how many prompt words appear in their path, summary and
+    identifiers; files they import locally come along when the budget allows.
+    """
+    wanted = _words(prompt)
+    scores: Dict[str, float] = {}
+    for rel, entry in manifest.items():
+        if entry["text"] is None:
+            continue
+        score = 3 * len(wanted & _words(rel)) + len(wanted & _words(entry["summary"]))
+        if score:
+            # Mentions in the body count, but less than in the name or exports
+            score += 0.1 * len(wanted & _words(entry["text"][:20000]))
+        if rel in ALWAYS_RELEVANT:
+            score += 0.5
+        if score:
+            scores[rel] = score
+
+    ranked = sorted(scores, key=lambda rel: (-scores[rel], rel))
+    selected: List[str] = []
+    total = 0
+
+    def take(rel: str) -> None:
+        nonlocal total
+        size = manifest[rel]["size"]
+        if rel in selected or len(selected) >= max_files or total + size > max_bytes:
+            return
+        selected.append(rel)
+        total += size
+
+    for rel in ranked:
+        take(rel)
+    # Direct local imports of what was picked, so the model sees the props it has to honour
+    for rel in list(selected):
+        base = os.path.dirname(rel)
+        for spec in LOCAL_IMPORT_PATTERN.findall(manifest[rel]["text"]):
+            stem = os.path.normpath(os.path.join(base, spec))
+            for candidate in (stem, *(stem + ext for ext in (".tsx", ".ts", ".jsx", ".js"))):
+                if candidate in manifest and manifest[candidate]["text"] is not None:
+                    take(candidate)
+                    break
+    return selected
+
+
+def build_edit_prompt(prompt: str, manifest: Dict[str, Dict[str, Any]], context_files: List[str]) -> str:
+    lines = ["Change request:", prompt, "", "Manifest (one JSON object per file):"]
+    for entry in manifest.values():
+        lines.append(json.dumps({k: entry[k] for k in ("path", "sha256", "size", "summary")}))
+    lines.append("")
+    lines.append("Relevant files (full content):")
+    for rel in context_files:
+        lines.append(f"--- {rel} ---")
+        lines.append(manifest[rel]["text"])
+    return "\n".join(lines)
+
+
+def _delete_files(target_dir: Path, paths: List[Any], allow_public: bool) -> List[str]:
+    deleted = []
+    for rel in paths:
+        rel = str(rel).strip()
+        allowed = rel.startswith("src/") or (allow_public and rel.startswith("public/"))
+        abs_path = Path(os.path.normpath(target_dir / rel))
+        # Resolve the parent as write_files does: a symlinked directory under src/ must not lead outside
+        if not allowed or not is_within(target_dir, abs_path.parent):
+            logging.warning(f"Skipping disallowed delete: {rel}")
+            continue
+        if not abs_path.is_file():
+            logging.warning(f"Delete of missing file ignored: {rel}")
+            continue
+        abs_path.unlink()
+        deleted.append(rel)
+        logging.info(f"Deleted: {rel}")
+    return deleted
+
+
+def edit_app(
+    uid: str,
+    prompt: str,
+    model: str = DEFAULT_MODEL,
+    out_root: Path = DEFAULT_GENERATED_APP_DIR,
+    allow_public: bool = True,
+    raw_response_file: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
+    max_context_files: int = DEFAULT_EDIT_MAX_CONTEXT_FILES,
+    max_context_bytes: int = DEFAULT_EDIT_MAX_CONTEXT_BYTES,
+) -> Dict[str, Any]:
+    """Apply a follow-up prompt to the generated app `uid` in place.
+
+    Returns the changed files (same rows as generate_app), the deleted paths and the
+    files that were sent as context.
+    """
+    if not prompt:
+        raise SystemExit("An edit needs a prompt")
+    target_dir = generated_app_dir(out_root, uid)
+    if target_dir is None:
+        raise SystemExit(f"Generated app not found: {uid}")
+
+    with _app_locks_guard:
+        app_lock = _app_locks.setdefault(str(target_dir), threading.Lock())
+    report = StageTimer(progress)
+    succeeded = False
+    # Held from the manifest on, so an edit always sees the result of the one before it
+    app_lock.acquire()
+    try:
+        report("manifest")
+        manifest = build_manifest(target_dir)
+        context_files = select_context_files(manifest, prompt, max_context_files, max_context_bytes)
+        edit_prompt = build_edit_prompt(prompt, manifest, context_files)
+        logging.info(
+            f"Edit {uid}: {len(manifest)} files in manifest, context {context_files}, prompt {len(edit_prompt)} chars"
+        )
+
+        report("calling_model")
+        if raw_response_file:
+            logging.info(f"Using raw response file: {raw_response_file}")
+            raw = Path(raw_response_file).read_text(encoding="utf-8")
+        else:
+            raw = call_gemini(edit_prompt, model, instructions=EDIT_INSTRUCTIONS)
+
+        report("parsing")
+        data = parse_response(raw)
+        files = data.get("files") or []
+        deletions = data.get("deleted") or []
+        if not isinstance(files, list) or not isinstance(deletions, list):
+            raise SystemExit("Invalid JSON: 'files' and 'deleted' must be lists")
+        edit_id = new_uid()
+        save_parsed_response(f"{uid}.edit-{edit_id}", data)
+
+        report("writing_files")
+        write_timings: Dict[str, Any] = {}
+        written = write_files(
+            target_dir,
+            {"files": files},
+            allow_public=allow_public,
+            overwrite=True,
+            timings=write_timings,
+            blob_store=generated_files_store(),
+        )
+        # Rows for the files actually in place, as written; paths write_files skipped are left out
+        rows = build_file_rows(
+            [{"path": p.relative_to(target_dir).as_posix(), "content": p.read_text(encoding="utf-8")} for p in written]
+        )
+        deleted = _delete_files(target_dir, deletions, allow_public)
+        FILES_WRITTEN.inc(write_timings.get("written", 0), result="written")
+        FILES_WRITTEN.inc(write_timings.get("unchanged", 0), result="unchanged")
+        logging.info(
+            f"Edit {uid}: {write_timings.get('written', 0)} written, {write_timings.get('unchanged', 0)} unchanged, "
+            f"{len(deleted)} deleted"
+        )
+        report("done")
+        succeeded = True
+    finally:
+        app_lock.release()
+        report.finish()
+        GENERATIONS.inc(outcome="edit_success" if succeeded else "edit_error")
+
+    return {
+        "uid": uid,
+        "edit_id": edit_id,
+        "target_dir": str(target_dir),
+        "files": rows,
+        "deleted": deleted,
+        "context_files": context_files,
+        "timings": report.timings,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Apply a follow-up prompt to an already generated app.")
+    parser.add_argument("--uid", required=True, help="uid of the generated app to edit")
+    parser.add_argument("--prompt", required=True, help="Follow-up change request")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Gemini model name (default: {DEFAULT_MODEL})")
+    parser.add_argument(
+        "--out-root", default=str(DEFAULT_GENERATED_APP_DIR), help="Base dir the app was generated under"
+    )
+    parser.add_argument("--raw-response-file", help="Debug: apply a saved model response instead of calling the API")
+    parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(filename="edit_app.log", verbose=args.verbose)
+    response = edit_app(
+        args.uid, args.prompt, args.model, Path(args.out_root), raw_response_file=args.raw_response_file
+    )
+    print(f"uid: {response['uid']}")
+    print(f"Changed: {', '.join(f['path'] for f in response['files']) or '-'}")
+    print(f"Deleted: {', '.join(response['deleted']) or '-'}")
@@ -0,0 +1,159 @@
+"""
+Stream a generated app as a zip or tar.gz archive without building it in memory.
+
+Files that are still linked to the template are read straight from the template,
+everything else (generated or edited files) from the app directory. Archives are
+produced chunk by chunk, so memory stays flat and the first bytes go out at once.
+
+Usage:
+  cd backend && python3 -m src.export_app --uid 20250101-120000-abcd1234 --format zip --output app.zip
+"""
+import argparse
+import os
+import stat
+import sys
+import tarfile
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .constants import DEFAULT_GENERATED_APP_DIR, DEFAULT_TEMPLATE_REACT_APP_DIR, TEMPLATE_IGNORE_PATTERNS
+from .template_manifest import get_manifest, scan_files
+from .utils import generated_app_dir
+
+EXPORT_FORMATS = ("zip", "tar.gz")
+CHUNK_SIZE = 64 * 1024
+
+
+def export_entries(
+    app_root: Path, template_root: Optional[Path] = DEFAULT_TEMPLATE_REACT_APP_DIR
+) -> List[Tuple[str, Path]]:
+    """(archive path, source file) pairs for an app, skipping node_modules and other ignored dirs."""
+    app_root = Path(app_root)
+    manifest = get_manifest(template_root) if template_root and Path(template_root).exists() else None
+    entries = []
+    for rel, st in sorted(scan_files(app_root, TEMPLATE_IGNORE_PATTERNS).items()):
+        source = app_root / rel
+        template_entry = manifest.entries.get(rel) if manifest else None
+        if template_entry is not None:
+            template_path = manifest.root / rel
+            # Hardlinked template files are read from the template itself
+            if os.path.samestat(st, template_path.stat()):
+                source = template_path
+        entries.append((rel, source))
+    return entries
+
+
+def _member_mode(st_mode: int) -> int:
+    """0755 for executables, 0644 otherwise: archives never carry the store's read-only modes."""
+    return 0o755 if st_mode & 0o111 else 0o644
+
+
+class _ChunkSink:
+    """Write-only file object that collects output until the generator hands it out."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: List[Tuple[str, Path]], prefix: str = "") -> Iterator[bytes]:
+    sink = _ChunkSink()
+    # A sink without seek/tell makes zipfile write data descriptors instead of seeking back
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for rel, source in entries:
+            info = zipfile.ZipInfo.from_file(source, arcname=prefix + rel)
+            info.external_attr = (stat.S_IFREG | _member_mode(source.stat().st_mode)) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(source, "rb") as src, zf.open(info, mode="w") as dst:
+                for block in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    dst.write(block)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def stream_tar_gz(entries: List[Tuple[str, Path]], prefix: str = "") -> Iterator[bytes]:
+    # tarfile's stream mode reads each member in one go, so headers and blocks are
+    # produced here and fed through a gzip-framed zlib compressor instead
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for rel, source in entries:
+        st = source.stat()
+        info = tarfile.TarInfo(prefix + rel)
+        info.size = st.st_size
+        info.mtime = int(st.st_mtime)
+        info.mode = _member_mode(st.st_mode)
+        yield compressor.compress(info.tobuf(format=tarfile.PAX_FORMAT))
+        with open(source, "rb") as src:
+            for block in iter(lambda: src.read(CHUNK_SIZE), b""):
+                out = compressor.compress(block)
+                if out:
+                    yield out
+        padding = -st.st_size % tarfile.BLOCKSIZE
+        if padding:
+            yield compressor.compress(b"\0" * padding)
+    yield compressor.compress(b"\0" * (2 * tarfile.BLOCKSIZE))
+    yield compressor.flush()
+
+
+def export_app(
+    uid: str,
+    fmt: str = "zip",
+    out_root: Path = DEFAULT_GENERATED_APP_DIR,
+    template_root: Optional[Path] = DEFAULT_TEMPLATE_REACT_APP_DIR,
+) -> Iterator[bytes]:
+    """Archive chunks for the generated app `uid`; members live under a `<uid>/` folder."""
+    if fmt not in EXPORT_FORMATS:
+        raise SystemExit(f"Unknown export format: {fmt} (expected one of {', '.join(EXPORT_FORMATS)})")
+    app_root = generated_app_dir(out_root, uid)
+    if app_root is None:
+        raise SystemExit(f"Generated app not found: {uid}")
+    entries = export_entries(app_root, template_root)
+    stream = stream_zip if fmt == "zip" else stream_tar_gz
+    return stream(entries, prefix=f"{uid}/")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export a generated app as a zip or tar.gz archive.")
+    parser.add_argument("--uid", required=True, help="uid of the generated app")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="zip", help="Archive format (default: zip)")
+    parser.add_argument("--output", help="Archive path; '-' writes to stdout (default: <uid>.<format>)")
+    parser.add_argument(
+        "--out-root", default=str(DEFAULT_GENERATED_APP_DIR), help="Base dir the app was generated under"
+    )
+    parser.add_argument(
+        "--app-dir", default=str(DEFAULT_TEMPLATE_REACT_APP_DIR), help="Template the app was generated from"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    chunks = export_app(args.uid, args.format, Path(args.out_root), Path(args.app_dir))
+    output = args.output or f"{args.uid}.{args.format}"
+    started = time.perf_counter()
+    written = 0
+    with (open(sys.stdout.fileno(), "wb", closefd=False) if output == "-" else open(output, "wb")) as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    if output != "-":
+        print(f"Wrote {output} ({written} bytes) in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Cached contents are per project on the real API, so every fake client sees the same ones
+_shared_caches: Dict[str, Dict[str, Any]] = {}
+
+
+class FakeAPIError(Exception):
+    """Mirrors the `code` attribute of the SDK's API errors."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def _config_get(config: Any, key: str) -> Any:
+    if isinstance(config, dict):
+        return config.get(key)
+    return getattr(config, key, None)
+
+
+def _ttl_seconds(ttl: Any) -> float:
+    return float(str(ttl).rstrip("s"))
+
+
+def sample_response(files: int = 3, lines_per_file: int = 20) -> str:
+    """A syntactically valid model response with `files` small React components."""
+    entries = []
+    for i in range(files):
+        body = "\n".join(f"  // line {n}" for n in range(lines_per_file))
+        content = (
+            "import Button from '@mui/material/Button';\n\n"
+            f"export default function Component{i}() {{\n{body}\n"
+            f"  return <Button variant=\"contained\">Component {i}</Button>;\n}}\n"
+        )
+        entries.append({"path": f"src/components/Component{i}.tsx", "content": content})
+    return json.dumps({"files": entries})
+
+
+class _FakeCaches:
+    """`client.caches`: create/update/delete of cached contents, recorded in the owner's cache_calls."""
+
+    def __init__(self, owner: "FakeGeminiClient") -> None:
+        self._owner = owner
+
+    def create(self, model: str, config: Any = None) -> Any:
+        instructions = str(_config_get(config, "system_instruction") or "")
+        self._owner._record_cache("create", model=model, tokens=len(instructions) // 4)
+        if not self._owner.supports_caching:
+            raise FakeAPIError(400, f"Model {model} does not support cached content")
+        if len(instructions) // 4 < self._owner.min_cache_tokens:
+            raise FakeAPIError(400, f"Cached content is too small, minimum {self._owner.min_cache_tokens} tokens")
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        self._owner.cache_store[name] = {
+            "model": model,
+            "instructions": instructions,
+            "expires_at": time.time() + _ttl_seconds(_config_get(config, "ttl") or "3600s"),
+        }
+        return SimpleNamespace(name=name, model=model)
+
+    def update(self, name: str, config: Any = None) -> Any:
+        self._owner._record_cache("update", name=name)
+        entry = self._owner._live_cache(name)
+        entry["expires_at"] = time.time() + _ttl_seconds(_config_get(config, "ttl"))
+        return SimpleNamespace(name=name, model=entry["model"])
+
+    def delete(self, name: str) -> None:
+        self._owner._record_cache("delete", name=name)
+        self._owner.cache_store.pop(name, None)
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGeminiClient") -> None:
+        self._owner = owner
+
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> Any:
+        cached_tokens = self._owner._cached_tokens(config)
+        text = self._owner._respond(model, contents, config)
+        time.sleep(self._owner.latency)
+        response = self._owner._wrap(text, contents, config, cached_tokens)
+        with self._owner._lock:
+            self._owner.usages.append(response.usage_metadata)
+        return response
+
+    def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> Iterator[Any]:
+        self._owner._cached_tokens(config)
+        text = self._owner._respond(model, contents, config)
+        chunk_size = self._owner.stream_chunk_size
+        chunks = [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)] or [""]
+        delay = self._owner.latency / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield SimpleNamespace(text=chunk, usage_metadata=None)
+
+
+class FakeGeminiClient:
+    """Offline stand-in for `genai.Client` with configurable latency and canned responses.
+
+    Every call is recorded in `calls` (model, contents, config), its usage metadata in
+    `usages` and every cache operation in `cache_calls`, so tests and benchmarks can inspect
+    what would have been sent to the API. Usage metadata counts system and cached
+    instructions the way the API bills them.
+    """
+
+    def __init__(
+        self,
+        response: Optional[str] = None,
+        response_file: Optional[Path] = None,
+        responder: Optional[Callable[[str, Any, Any], str]] = None,
+        latency: float = 0.0,
+        stream_chunk_size: int = 1024,
+        supports_caching: bool = True,
+        min_cache_tokens: int = 0,
+        cache_store: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        if response_file is not None:
+            response = Path(response_file).read_text(encoding="utf-8")
+        self.response = response if response is not None else sample_response()
+        self.responder = responder
+        self.latency = latency
+        self.stream_chunk_size = stream_chunk_size
+        self.supports_caching = supports_caching
+        self.min_cache_tokens = min_cache_tokens
+        self.cache_store = _shared_caches if cache_store is None else cache_store
+        self.calls: List[dict] = []
+        self.cache_calls: List[dict] = []
+        self.usages: List[Any] = []
+        self._lock = threading.Lock()
+        self.models = _FakeModels(self)
+        self.caches = _FakeCaches(self)
+
+    def _record_cache(self, op: str, **details: Any) -> None:
+        with self._lock:
+            self.cache_calls.append({"op": op, **details})
+
+    def _live_cache(self, name: str) -> Dict[str, Any]:
+        entry = self.cache_store.get(name)
+        if entry is None or entry["expires_at"] <= time.time():
+            raise FakeAPIError(404, f"Cached content {name} not found")
+        return entry
+
+    def _cached_tokens(self, config: Any) -> int:
+        name = _config_get(config, "cached_content")
+        return len(self._live_cache(name)["instructions"]) // 4 if name else 0
+
+    def _respond(self, model: str, contents: Any, config: Any) -> str:
+        with self._lock:
+            self.calls.append({"model": model, "contents": contents, "config": config})
+        if self.responder is not None:
+            return self.responder(model, contents, config)
+        return self.response
+
+    @staticmethod
+    def _wrap(text: str, contents: Any, config: Any = None, cached_tokens: int = 0) -> Any:
+        # Like the API, prompt_token_count includes cached tokens; cached_content_token_count breaks them out
+        system = str(_config_get(config, "system_instruction") or "")
+        prompt_tokens = max(1, len(str(contents)) // 4) + len(system) // 4 + cached_tokens
+        candidates_tokens = max(1, len(text) // 4)
+        usage = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=candidates_tokens,
+            cached_content_token_count=cached_tokens,
+            total_token_count=prompt_tokens + candidates_tokens,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
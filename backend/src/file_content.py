@@ -0,0 +1,129 @@
+"""
+Helpers for serving individual generated files: ETags, content negotiation and ranges.
+"""
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # optional: gzip is always available
+    brotli = None
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_BYTES = 1024
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+# mimetypes maps .ts to video/mp2t; generated sources are served as text
+TEXT_TYPES = {
+    ".ts": "text/plain",
+    ".tsx": "text/plain",
+    ".jsx": "text/plain",
+    ".mjs": "text/javascript",
+}
+
+_hashes: Dict[Tuple[str, int, int], str] = {}
+_hashes_lock = threading.Lock()
+
+
+def file_hash(path: Path) -> str:
+    """sha256 of a file, memoised on (path, size, mtime) since edits rewrite files in place."""
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _hashes_lock:
+        cached = _hashes.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    with _hashes_lock:
+        if len(_hashes) > 10000:
+            _hashes.clear()
+        _hashes[key] = digest
+    return digest
+
+
+def listing_row(rel_path: str, file_type: str, size: int, sha256: str) -> Dict[str, object]:
+    return {"name": rel_path.split("/")[-1], "path": rel_path, "type": file_type, "size": size, "sha256": sha256}
+
+
+def file_listing_row(app_root: Path, rel_path: str, file_type: str) -> Dict[str, object]:
+    """Listing entry for a generated file as written on disk, without its content."""
+    path = Path(app_root) / rel_path
+    return listing_row(rel_path, file_type, path.stat().st_size, file_hash(path))
+
+
+def content_type(path: Path) -> str:
+    mime = TEXT_TYPES.get(path.suffix) or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if mime.startswith("text/") or mime in ("application/json", "image/svg+xml"):
+        mime += "; charset=utf-8"
+    return mime
+
+
+def etag_matches(if_none_match: Optional[str], digest: str) -> bool:
+    # Compressed variants carry a suffix ("<sha>-gzip") but describe the same content
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        tag = tag.removeprefix("W/").strip('"')
+        if tag.split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick br (when the brotli package is installed) or gzip from an Accept-Encoding header."""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            offered[name.lower()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive (start, end).
+
+    Returns None when there is no usable Range header; raises ValueError for a range
+    that cannot be satisfied. Multi-range requests are served as the full file.
+    """
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    return start, end
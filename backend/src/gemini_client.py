@@ -0,0 +1,330 @@
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .constants import (
+    CONTEXT_CACHE_MIN_TOKENS,
+    DEFAULT_CONTEXT_CACHE_MIN_TOKENS,
+    DEFAULT_CONTEXT_CACHE_REFRESH_SECONDS,
+    DEFAULT_CONTEXT_CACHE_RETRY_SECONDS,
+    DEFAULT_CONTEXT_CACHE_TTL_SECONDS,
+    DEFAULT_GEMINI_CLIENT_POOL_SIZE,
+    DEFAULT_MODEL_LIMITS,
+    ENABLE_CONTEXT_CACHE,
+    MODEL_LIMITS,
+    DEFAULT_RATE_LIMIT_MAX_WAIT_SECONDS,
+)
+from .metrics import CONTEXT_CACHE_EVENTS
+from .utils import load_api_key
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call could not get through the model limiter in time."""
+
+
+def default_client_factory() -> Any:
+    try:
+        # Import here to allow --raw-response-file mode without the SDK installed
+        from google import genai  # type: ignore
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit("google-genai is not installed. Run: pip install -r requirements.txt") from exc
+
+    return genai.Client(api_key=load_api_key())
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic (~4 characters per token), refined from usage metadata after the call
+    return max(1, len(text) // 4)
+
+
+class ClientPool:
+    """A small set of long-lived clients handed out round-robin.
+
+    Clients are created on first use and reused across requests, so the API key is
+    loaded and connections are set up once rather than per call.
+    """
+
+    def __init__(self, size: int = DEFAULT_GEMINI_CLIENT_POOL_SIZE, factory: Callable[[], Any] = None) -> None:
+        self.size = max(1, size)
+        self.factory = factory or default_client_factory
+        self._clients: list = []
+        self._cycle: Optional[Iterator[Any]] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        with self._lock:
+            if self._cycle is None:
+                self._clients = [self.factory() for _ in range(self.size)]
+                self._cycle = itertools.cycle(self._clients)
+                logging.info(f"Created {self.size} Gemini clients")
+            return next(self._cycle)
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float, deadline: float) -> bool:
+        """Block until `amount` is available or `deadline` (monotonic) passes."""
+        # Requests bigger than the bucket go through once it is full rather than never
+        amount = min(float(amount), self.capacity)
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, (amount - self.tokens) / self.rate))
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) units after the fact; may go into debt."""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+            self._cond.notify_all()
+
+
+class ModelLimiter:
+    """Concurrency semaphore combined with requests- and tokens-per-minute buckets."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        rpm: float,
+        tpm: float,
+        max_wait: float = DEFAULT_RATE_LIMIT_MAX_WAIT_SECONDS,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.calls = 0
+
+    @contextmanager
+    def acquire(self, estimated_tokens: int) -> Iterator[Callable[[int], None]]:
+        """Wait (at most `max_wait`) for a slot and quota, then run the body.
+
+        Yields a callback that reports the actual token usage once it is known, so the
+        token bucket is corrected for the difference from the estimate.
+        """
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        with self._lock:
+            self.waiting += 1
+        try:
+            if not self._requests.take(1, deadline):
+                raise RateLimitTimeout(f"Request rate limit wait exceeded {self.max_wait:.0f}s")
+            if not self._tokens.take(estimated_tokens, deadline):
+                self._requests.adjust(-1)
+                raise RateLimitTimeout(f"Token rate limit wait exceeded {self.max_wait:.0f}s")
+            if not self._semaphore.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                self._requests.adjust(-1)
+                self._tokens.adjust(-estimated_tokens)
+                raise RateLimitTimeout(f"No free model slot within {self.max_wait:.0f}s")
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        waited = time.monotonic() - started
+        with self._lock:
+            self.in_flight += 1
+            self.calls += 1
+            self.total_wait += waited
+        if waited > 1:
+            logging.info(f"Waited {waited:.2f}s for model quota")
+
+        def report_usage(actual_tokens: int) -> None:
+            if actual_tokens:
+                self._tokens.adjust(actual_tokens - estimated_tokens)
+
+        try:
+            yield report_usage
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "calls": self.calls,
+                "avg_wait_seconds": self.total_wait / self.calls if self.calls else 0.0,
+            }
+
+
+class ContextCache:
+    """Server-side cached-content handles for system instructions, one per (model, instructions).
+
+    A handle is created on first use, reused until it is close to expiry, then its TTL is
+    extended (or a new one is created if that fails). When the API refuses to cache, e.g.
+    for models without caching or instructions under the model's minimum size, lookups
+    return None for a while and callers send the instructions as a system instruction.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = ENABLE_CONTEXT_CACHE,
+        ttl: float = DEFAULT_CONTEXT_CACHE_TTL_SECONDS,
+        refresh_before: float = DEFAULT_CONTEXT_CACHE_REFRESH_SECONDS,
+        retry_after: float = DEFAULT_CONTEXT_CACHE_RETRY_SECONDS,
+        min_tokens: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self.refresh_before = refresh_before
+        self.retry_after = retry_after
+        self.min_tokens = dict(CONTEXT_CACHE_MIN_TOKENS if min_tokens is None else min_tokens)
+        # key -> (cached content name, expiry as time.time())
+        self._handles: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._unavailable: Dict[Tuple[str, str], float] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, instructions: str) -> Tuple[str, str]:
+        return model, hashlib.sha256(instructions.encode("utf-8")).hexdigest()
+
+    def lookup(self, client: Any, model: str, instructions: str) -> Optional[str]:
+        """Name of a live cached content holding `instructions`, or None to send them inline."""
+        if not self.enabled:
+            return None
+        if estimate_tokens(instructions) < self.min_tokens.get(model, DEFAULT_CONTEXT_CACHE_MIN_TOKENS):
+            return None
+        key = self._key(model, instructions)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Per-key lock: concurrent first calls create a single cache, other models don't wait
+        with key_lock:
+            now = time.time()
+            if self._unavailable.get(key, 0) > now:
+                CONTEXT_CACHE_EVENTS.inc(model=model, event="fallback")
+                return None
+            handle = self._handles.get(key)
+            if handle is not None and handle[1] - now > self.refresh_before:
+                CONTEXT_CACHE_EVENTS.inc(model=model, event="hit")
+                return handle[0]
+            if handle is not None and handle[1] > now:
+                try:
+                    client.caches.update(name=handle[0], config={"ttl": f"{int(self.ttl)}s"})
+                except Exception as exc:
+                    logging.warning(f"Could not extend context cache {handle[0]}: {exc}")
+                else:
+                    self._handles[key] = (handle[0], now + self.ttl)
+                    CONTEXT_CACHE_EVENTS.inc(model=model, event="refreshed")
+                    return handle[0]
+            self._handles.pop(key, None)
+            try:
+                cached = client.caches.create(
+                    model=model,
+                    config={
+                        "system_instruction": instructions,
+                        "display_name": f"instructions-{key[1][:12]}",
+                        "ttl": f"{int(self.ttl)}s",
+                    },
+                )
+            except Exception as exc:
+                logging.warning(f"Context caching unavailable for {model}, sending instructions inline: {exc}")
+                self._unavailable[key] = now + self.retry_after
+                CONTEXT_CACHE_EVENTS.inc(model=model, event="fallback")
+                return None
+            self._handles[key] = (cached.name, now + self.ttl)
+            self._unavailable.pop(key, None)
+            CONTEXT_CACHE_EVENTS.inc(model=model, event="created")
+            logging.info(f"Created context cache {cached.name} for {model}")
+            return cached.name
+
+    def invalidate(self, model: str, instructions: str) -> None:
+        """Forget a handle the API no longer accepts (expired or deleted server-side)."""
+        with self._lock:
+            self._handles.pop(self._key(model, instructions), None)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            handles = dict(self._handles)
+        return {
+            "enabled": self.enabled,
+            "caches": [
+                {"model": model, "name": name, "ttl_remaining": round(max(0.0, expires - now), 1)}
+                for (model, _), (name, expires) in handles.items()
+            ],
+        }
+
+
+_pool = ClientPool()
+_limiters: Dict[str, ModelLimiter] = {}
+_limits: Dict[str, Dict[str, Any]] = dict(MODEL_LIMITS)
+_context_cache = ContextCache()
+_lock = threading.Lock()
+
+
+def configure_gemini(
+    factory: Callable[[], Any] = None,
+    pool_size: int = DEFAULT_GEMINI_CLIENT_POOL_SIZE,
+    limits: Dict[str, Dict[str, Any]] = None,
+    context_cache: Optional[ContextCache] = None,
+) -> None:
+    """Replace the shared client pool, limits and context cache, e.g. with a fake client for benchmarks."""
+    global _pool, _limits, _context_cache
+    with _lock:
+        _pool = ClientPool(size=pool_size, factory=factory)
+        _limits = dict(MODEL_LIMITS)
+        _limits.update(limits or {})
+        _limiters.clear()
+        # Handles belong to whatever backend created them, so never carry them over
+        _context_cache = context_cache or ContextCache()
+
+
+def get_client() -> Any:
+    return _pool.get()
+
+
+def get_context_cache() -> ContextCache:
+    return _context_cache
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    with _lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            config = {**DEFAULT_MODEL_LIMITS, **_limits.get(model, {})}
+            limiter = ModelLimiter(**config)
+            _limiters[model] = limiter
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Any]:
+    with _lock:
+        limiters = dict(_limiters)
+    return {model: limiter.stats() for model, limiter in limiters.items()}
+
+
+def usage_tokens(response: Any) -> int:
+    # usage_metadata is absent on some SDK versions and on fakes
+    usage = getattr(response, "usage_metadata", None)
+    return int(getattr(usage, "total_token_count", 0) or 0)
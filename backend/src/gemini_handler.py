@@ -1,27 +1,100 @@
+import itertools
 import logging
-from .utils import load_api_key
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 from .constants import SYSTEM_INSTRUCTIONS
+from .gemini_client import estimate_tokens, get_client, get_context_cache, get_limiter, usage_tokens
+from .metrics import record_usage
 
+# Errors the API returns for a cached content that expired or was deleted server-side
+STALE_CACHE_CODES = (400, 403, 404)
 
-def call_gemini(prompt: str, model: str) -> str:
+
+def _request(client: Any, prompt: str, model: str, instructions: str) -> Tuple[str, Dict[str, Any], Optional[str]]:
+    """contents and config for a call: instructions via a cached content when possible, else as system instruction."""
+    contents = f"User requirements:\n{prompt}"
+    config: Dict[str, Any] = {"response_mime_type": "application/json"}
+    cache_name = get_context_cache().lookup(client, model, instructions)
+    if cache_name:
+        config["cached_content"] = cache_name
+    else:
+        config["system_instruction"] = instructions
+    return contents, config, cache_name
+
+
+def _is_stale_cache(exc: Exception, cache_name: Optional[str]) -> bool:
+    return bool(cache_name) and getattr(exc, "code", None) in STALE_CACHE_CODES
+
+
+def _with_cache_fallback(
+    call: Callable[[Dict[str, Any]], Any],
+    model: str,
+    instructions: str,
+    config: Dict[str, Any],
+    cache_name: Optional[str],
+) -> Any:
+    """Run `call(config)`; if the API rejects the cached content, retry once with the instructions inline."""
     try:
-        # Import here to allow --raw-response-file mode without the SDK installed
-        from google import genai  # type: ignore
-    except Exception as exc:  # pragma: no cover
-        raise SystemExit("google-genai is not installed. Run: pip install -r requirements.txt") from exc
-
-    client = genai.Client(api_key=load_api_key())
-    response = client.models.generate_content(
-        model=model,
-        contents=f"{SYSTEM_INSTRUCTIONS}\n\nUser requirements:\n{prompt}",
-        config={
-            "response_mime_type": "application/json",
-        },
-    )
+        return call(config)
+    except Exception as exc:
+        if not _is_stale_cache(exc, cache_name):
+            raise
+        logging.warning(f"Context cache {cache_name} rejected ({exc}); retrying with inline instructions")
+        get_context_cache().invalidate(model, instructions)
+        config = {k: v for k, v in config.items() if k != "cached_content"}
+        config["system_instruction"] = instructions
+        return call(config)
+
+
+def call_gemini(prompt: str, model: str, instructions: str = SYSTEM_INSTRUCTIONS) -> str:
+    client = get_client()
+    contents, config, cache_name = _request(client, prompt, model, instructions)
+    # Cached instructions are billed at a discount but still count towards the token quota
+    with get_limiter(model).acquire(estimate_tokens(instructions + contents)) as report_usage:
+        response = _with_cache_fallback(
+            lambda cfg: client.models.generate_content(model=model, contents=contents, config=cfg),
+            model,
+            instructions,
+            config,
+            cache_name,
+        )
+        report_usage(usage_tokens(response))
+    usage = record_usage(model, response)
+    logging.info(f"Gemini usage: {usage}")
     text = getattr(response, "text", None)
     if not text:
         logging.error("Empty response from Gemini.")
         raise SystemExit("Empty response from Gemini.")
-    logging.info(f"Gemini response: {text}")
-    logging.info(f"Gemini response type: {type(text)}")
+    logging.debug(f"Gemini response: {text}")
     return text
+
+
+def call_gemini_stream(prompt: str, model: str, instructions: str = SYSTEM_INSTRUCTIONS) -> Iterator[str]:
+    """Stream the model response, yielding text chunks as they arrive."""
+    client = get_client()
+    contents, config, cache_name = _request(client, prompt, model, instructions)
+    received = 0
+
+    def open_stream(cfg: Dict[str, Any]) -> Iterator[Any]:
+        # Pull the first chunk here so a rejected cache is retried before anything is yielded
+        stream = iter(client.models.generate_content_stream(model=model, contents=contents, config=cfg))
+        first = next(stream, None)
+        return itertools.chain([first] if first is not None else [], stream)
+
+    with get_limiter(model).acquire(estimate_tokens(instructions + contents)) as report_usage:
+        stream = _with_cache_fallback(open_stream, model, instructions, config, cache_name)
+        usage_chunk = None
+        for chunk in stream:
+            # The final chunk carries the usage totals for the whole response
+            if usage_tokens(chunk):
+                usage_chunk = chunk
+            text = getattr(chunk, "text", None)
+            if not text:
+                continue
+            received += len(text)
+            yield text
+        report_usage(usage_tokens(usage_chunk))
+    logging.info(f"Gemini usage: {record_usage(model, usage_chunk)}")
+    if not received:
+        logging.error("Empty response from Gemini.")
+        raise SystemExit("Empty response from Gemini.")
+    logging.info(f"Gemini streamed {received} characters")
@@ -5,11 +5,136 @@ from pathlib import Path
 from datetime import datetime
 import logging
 import argparse
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from .constants import DEFAULT_TEMPLATE_REACT_APP_DIR, DEFAULT_GENERATED_APP_DIR, DEFAULT_MODEL
-from .utils import extract_json_block, sanitize_backtick_json, copy_template_to_uid, write_files
-from .gemini_handler import call_gemini
+from .constants import (
+    DEFAULT_TEMPLATE_REACT_APP_DIR,
+    DEFAULT_GENERATED_APP_DIR,
+    DEFAULT_MODEL,
+    DEFAULT_RESPONSES_DIR,
+    VALIDATE_GENERATED_FILES,
+)
+from .utils import copy_template_to_uid, write_files
+from .json_extract import extract_payload
+from .gemini_handler import call_gemini, call_gemini_stream
 from .logger import setup_logging
+from .stream_parser import IncrementalFilesParser
+from .response_cache import response_cache
+from .dep_store import install_dependencies
+from .metrics import FILES_WRITTEN, GENERATIONS, STAGE_DURATION, VALIDATION_DIAGNOSTICS
+from .profiling import RequestProfiler
+from .template_manifest import TemplateManifest
+from .file_content import file_listing_row, listing_row
+from .overlay import build_overlay, overlay_store
+from .parallel_generate import generate_files_parallel
+from .plan_app import prompt_with_plan
+from .single_flight import flight_key, single_flight
+from .storage import generated_files_store, save_response
+from .validate_app import validate_payload
+
+RESPONSES_DIR = DEFAULT_RESPONSES_DIR
+
+# new_uid, parse_response, save_parsed_response, build_file_rows and StageTimer are shared
+# with the edit pipeline (src/edit_app.py)
+GENERATION_STRATEGIES = ("single", "parallel")
+
+
+def new_uid() -> str:
+    # Unique output dir name with timestamp and short uid
+    uid_short = uuid.uuid4().hex[:8]
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return f"{timestamp}-{uid_short}"
+
+
+def parse_response(raw: str) -> Dict[str, Any]:
+    """extract_payload, logging the raw response when it can't be parsed."""
+    try:
+        return extract_payload(raw)
+    except SystemExit:
+        logging.error(f"Model response (raw):\n{raw}")
+        raise
+
+
+def save_parsed_response(uid: str, data: Dict[str, Any]) -> Path:
+    # Always save the parsed response for auditing (compact and compressed, see src/storage.py)
+    response_path = save_response(RESPONSES_DIR, uid, data)
+    logging.info(f"Saved raw response: {response_path}")
+    return response_path
+
+
+def _file_type(file_name: str) -> str:
+    file_type = "component"
+    if "pages" in file_name:
+        file_type = "page"
+    elif ".css" in file_name:
+        file_type = "style"
+    elif ".json" in file_name:
+        file_type = "config"
+    return file_type
+
+
+def _file_row(file: Dict[str, Any]) -> Dict[str, Any]:
+    file_name = file["path"].split("/")[-1]
+    file_type = _file_type(file_name)
+    content = file.get("content", "")
+    if not content:
+        content = file.get("content_lines", [])
+        content = "\n".join(str(line) for line in content)
+
+    return {
+        "name": file_name,
+        "path": file["path"],
+        "type": file_type,
+        "content": content,
+    }
+
+
+def build_file_rows(files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Response rows (name, path, type, content) for payload file entries."""
+    return [_file_row(file) for file in files]
+
+
+def _build_file_listing(target_dir: Path, written: List[Path]) -> List[Dict[str, Any]]:
+    # Slim rows: size and hash of each file as written, content is fetched separately
+    rows = []
+    for path in written:
+        rel = path.relative_to(target_dir).as_posix()
+        rows.append(file_listing_row(target_dir, rel, _file_type(path.name)))
+    return rows
+
+
+class StageTimer:
+    """Reports stage transitions to the optional progress hook and times each stage.
+
+    Calling it with a stage name ends the previous stage; durations go to the stage
+    histogram on /metrics and are kept in `timings` for the response.
+    """
+
+    def __init__(self, progress: Optional[Callable[[str], None]] = None) -> None:
+        self.progress = progress
+        self.timings: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._started = 0.0
+
+    def _close(self) -> None:
+        if self._stage is not None:
+            elapsed = time.perf_counter() - self._started
+            self.timings[self._stage] = round(elapsed, 6)
+            STAGE_DURATION.observe(elapsed, stage=self._stage)
+            self._stage = None
+
+    def __call__(self, stage: str) -> None:
+        self._close()
+        if stage != "done":
+            self._stage = stage
+            self._started = time.perf_counter()
+        # Optional hook so callers (e.g. the job queue) can track per-stage progress
+        if self.progress is not None:
+            self.progress(stage)
+
+    def finish(self) -> None:
+        self._close()
 
 
 def generate_app(
@@ -21,18 +146,89 @@ def generate_app(
     dry_run: bool = False,
     auto_install: bool = False,
     raw_response_file: str = None,
+    progress: Optional[Callable[[str], None]] = None,
+    use_cache: bool = True,
+    profile: bool = False,
+    template_manifest: Optional[TemplateManifest] = None,
+    include_content: bool = True,
+    preview: bool = False,
+    plan: Optional[Dict[str, Any]] = None,
+    strategy: str = "single",
+    validate: bool = VALIDATE_GENERATED_FILES,
 ) -> None:
+    """Generate an app; with profile=True the response also carries a cProfile/tracemalloc summary.
+
+    With include_content=False the response lists files (name, path, type, size, sha256)
+    without their content, which is served by the file content endpoint instead.
+    With preview=True nothing is written to disk: the files are kept in an in-memory
+    overlay (see src/overlay.py) until the preview is committed.
+    A plan from src/plan_app.py is passed to the model so it builds what was previewed.
+    strategy="parallel" plans the files first and generates them concurrently (see
+    src/parallel_generate.py) instead of in one long model call.
+    With validate=True imports are checked offline before anything is written (see
+    src/validate_app.py); problems are listed under "diagnostics" in the response.
+    """
+    if strategy not in GENERATION_STRATEGIES:
+        raise SystemExit(f"Unknown generation strategy: {strategy}")
+    profiler = RequestProfiler() if profile else None
+    if profiler is not None:
+        profiler.start()
+    response = None
+    succeeded = False
+    try:
+        response = _generate_app(
+            prompt,
+            model,
+            app_dir,
+            out_root,
+            allow_public=allow_public,
+            dry_run=dry_run,
+            auto_install=auto_install,
+            raw_response_file=raw_response_file,
+            report=StageTimer(progress),
+            use_cache=use_cache,
+            template_manifest=template_manifest,
+            include_content=include_content,
+            preview=preview,
+            plan=plan,
+            strategy=strategy,
+            validate=validate,
+        )
+        succeeded = True
+    finally:
+        GENERATIONS.inc(outcome="success" if succeeded else "error")
+        if profiler is not None:
+            summary = profiler.stop(response["uid"] if response else new_uid())
+            if response is not None:
+                response["profile"] = summary
+    return response
 
+
+def _generate_app(
+    prompt: str,
+    model: str,
+    app_dir: Path,
+    out_root: Path,
+    allow_public: bool,
+    dry_run: bool,
+    auto_install: bool,
+    raw_response_file: Optional[str],
+    report: StageTimer,
+    use_cache: bool = True,
+    template_manifest: Optional[TemplateManifest] = None,
+    include_content: bool = True,
+    preview: bool = False,
+    plan: Optional[Dict[str, Any]] = None,
+    strategy: str = "single",
+    validate: bool = VALIDATE_GENERATED_FILES,
+) -> Optional[Dict[str, Any]]:
     prompt = prompt or "Create a sample page that says hello using Material UI Button."
 
     app_dir = Path(app_dir).resolve()
     if not app_dir.exists():
         raise SystemExit(f"App dir not found: {app_dir}")
 
-    # Prepare unique output dir with timestamp and short uid
-    uid_short = uuid.uuid4().hex[:8]
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    uid = f"{timestamp}-{uid_short}"
+    uid = new_uid()
     out_root = Path(out_root).resolve()
     out_root.mkdir(parents=True, exist_ok=True)
     target_dir = (out_root / uid).resolve()
@@ -40,87 +236,307 @@ def generate_app(
     logging.info(f"Template: {app_dir}")
     logging.info(f"Target: {target_dir}")
 
+    coalesced = False
     if raw_response_file:
-        logging.info(f"Using raw response file: {raw_response_file}")
-        raw = Path(raw_response_file).read_text(encoding="utf-8")
+        data, cache_hit = _model_payload(prompt, model, plan, strategy, raw_response_file, use_cache, report)
     else:
-        logging.info("Calling Gemini ...")
-        raw = call_gemini(prompt, model)
-    try:
-        json_text = extract_json_block(raw)
-        try:
-            data = json.loads(json_text)
-        except Exception:
-            # Fallback for backtick-delimited content blocks inside JSON
-            data = sanitize_backtick_json(json_text)
-    except Exception as exc:
-        logging.error(f"Model response (raw):\n{raw}")
-        raise SystemExit(f"Failed to parse JSON from model response: {exc}")
+        # Identical requests already in flight share one model call; each still gets its own uid below
+        deferred: List[BaseException] = []
 
-    # Always save the raw response for auditing
-    responses_dir = Path(__file__).resolve().parents[1] / "gemini-responses"
-    responses_dir.mkdir(parents=True, exist_ok=True)
-    response_path = responses_dir / f"{uid}.json"
-    response_path.write_text(json.dumps(data, indent=4))
-    logging.info(f"Saved raw response: {response_path}")
+        def leader_progress(stage: str) -> None:
+            # A cancelled leader keeps serving the callers waiting on it and stops once the call returns
+            try:
+                report(stage)
+            except Exception as exc:
+                deferred.append(exc)
+
+        key = flight_key(prompt, model, plan=plan, strategy=strategy, use_cache=use_cache)
+        label = {"model": model, "strategy": strategy, "prompt": " ".join(prompt.split())[:80]}
+        (data, cache_hit), coalesced = single_flight.do(
+            key,
+            lambda: _model_payload(prompt, model, plan, strategy, None, use_cache, leader_progress),
+            label=label,
+            on_wait=lambda: report("coalesced"),
+        )
+        if deferred:
+            raise deferred[0]
+        if coalesced:
+            logging.info(f"Reused the in-flight generation {key[:16]} for {uid}")
+            report("parsing")
+    save_parsed_response(uid, data)
+
+    diagnostics = _validate(data, app_dir, allow_public, template_manifest, report) if validate else []
 
     if dry_run:
         files = data.get("files", [])
         logging.info(f"Would write {len(files)} files")
         for f in files:
             logging.info(f" - {f.get('path')}")
+        report.finish()
         return
 
+    if preview:
+        report("building_overlay")
+        overlay = build_overlay(uid, app_dir, data, allow_public=allow_public)
+        overlay_store.put(overlay)
+        if include_content:
+            rows = build_file_rows(
+                [{"path": rel, "content": data.decode("utf-8")} for rel, data in overlay.upper.items()]
+            )
+        else:
+            rows = [
+                listing_row(rel, _file_type(rel.split("/")[-1]), len(data), overlay.hashes[rel])
+                for rel, data in overlay.upper.items()
+            ]
+        report("done")
+        return {
+            "uid": uid,
+            "target_dir": None,
+            "preview": True,
+            "files": rows,
+            "diagnostics": diagnostics,
+            "cache_hit": cache_hit,
+            "coalesced": coalesced,
+            "timings": report.timings,
+        }
+
     # Copy template to unique target and then write files inside it
-    copy_template_to_uid(app_dir, target_dir)
-    written = write_files(target_dir, data, allow_public=allow_public, overwrite=True)
+    report("copying_template")
+    copy_paths = [str(f.get("path", "")).strip() for f in data.get("files", []) if isinstance(f, dict)]
+    copy_template_to_uid(app_dir, target_dir, copy_paths=copy_paths, manifest=template_manifest)
+    report("writing_files")
+    write_timings: Dict[str, Any] = {}
+    written = write_files(
+        target_dir,
+        data,
+        allow_public=allow_public,
+        overwrite=True,
+        timings=write_timings,
+        blob_store=generated_files_store(),
+    )
+    logging.info(
+        f"Write stage: {write_timings.get('written', 0)} written, {write_timings.get('unchanged', 0)} unchanged "
+        f"in {write_timings.get('total', 0.0):.3f}s; transforms: "
+        + ", ".join(f"{name}={seconds:.3f}s" for name, seconds in write_timings.get("transforms", {}).items())
+    )
+    for rel, seconds in sorted(write_timings.get("files", {}).items(), key=lambda kv: -kv[1])[:5]:
+        logging.debug(f"Slowest write: {rel} {seconds * 1000:.1f}ms")
 
     if auto_install:
-        logging.info(f"Running npm install in {target_dir}")
+        report("installing")
         try:
-            subprocess.run(["npm", "install", "--no-audit", "--no-fund"], cwd=str(target_dir), check=True)
-        except subprocess.CalledProcessError as exc:
-            logging.error(f"npm install failed: {exc}")
+            install_dependencies(target_dir)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            logging.error(f"Dependency store install failed ({exc}); running npm install in {target_dir}")
+            try:
+                subprocess.run(["npm", "install", "--no-audit", "--no-fund"], cwd=str(target_dir), check=True)
+            except (OSError, subprocess.CalledProcessError) as exc:
+                logging.error(f"npm install failed: {exc}")
 
     if not written:
         logging.warning("No files were written.")
     else:
-        logging.info(f"Wrote {len(written)} files: {written}")
+        logging.info(f"Wrote {len(written)} files")
         for p in written:
             rel = p.relative_to(target_dir)
-            logging.info(f" - {rel}")
+            logging.info(f" - {rel}", extra={"verbose": True})
 
-    rows = []
-    for file in data.get("files", []):
-        file_name = file["path"].split("/")[-1]
-        file_type = "component"
-        if "pages" in file_name:
-            file_type = "page"
-        elif ".css" in file_name:
-            file_type = "style"
-        elif ".json" in file_name:
-            file_type = "config"
-        content = file.get("content", "")
-        if not content:
-            content = file.get("content_lines", [])
-            content = "\n".join(str(line) for line in content)
-
-        row = {
-            "name": file_name,
-            "path": file["path"],
-            "type": file_type,
-            "content": content,
-        }
-        rows.append(row)
+    FILES_WRITTEN.inc(write_timings.get("written", 0), result="written")
+    FILES_WRITTEN.inc(write_timings.get("unchanged", 0), result="unchanged")
+
+    if include_content:
+        rows = build_file_rows(data.get("files", []))
+    else:
+        rows = _build_file_listing(target_dir, written)
 
+    report("done")
     response = {
         "uid": uid,
         "target_dir": str(target_dir),
         "files": rows,
+        "diagnostics": diagnostics,
+        "cache_hit": cache_hit,
+        "coalesced": coalesced,
+        "timings": report.timings,
     }
     return response
 
 
+def _model_payload(
+    prompt: str,
+    model: str,
+    plan: Optional[Dict[str, Any]],
+    strategy: str,
+    raw_response_file: Optional[str],
+    use_cache: bool,
+    progress: Callable[[str], None],
+) -> Tuple[Dict[str, Any], bool]:
+    """The parsed payload for a request and whether it came from the response cache."""
+    if strategy == "parallel" and not raw_response_file:
+        # Per-file calls go through the response cache individually
+        data = generate_files_parallel(prompt, model, plan=plan, use_cache=use_cache, progress=progress)
+        progress("parsing")
+        return data, False
+    progress("calling_model")
+    if plan:
+        prompt = prompt_with_plan(prompt, plan)
+    raw = None
+    if raw_response_file:
+        logging.info(f"Using raw response file: {raw_response_file}")
+        raw = Path(raw_response_file).read_text(encoding="utf-8")
+    elif use_cache:
+        # A cache hit is replayed exactly like --raw-response-file
+        raw = response_cache.get(prompt, model)
+    cache_hit = raw is not None and not raw_response_file
+    if raw is None:
+        logging.info("Calling Gemini ...")
+        raw = call_gemini(prompt, model)
+    progress("parsing")
+    data = parse_response(raw)
+    if use_cache and not raw_response_file and not cache_hit:
+        response_cache.put(prompt, model, raw)
+    return data, cache_hit
+
+
+def _validate(
+    data: Dict[str, Any],
+    app_dir: Path,
+    allow_public: bool,
+    template_manifest: Optional[TemplateManifest],
+    report: StageTimer,
+) -> List[Dict[str, Any]]:
+    report("validating")
+    diagnostics = validate_payload(data, app_dir, allow_public, manifest=template_manifest)
+    for diagnostic in diagnostics:
+        VALIDATION_DIAGNOSTICS.inc(code=diagnostic["code"])
+        logging.warning(f"{diagnostic['path']}:{diagnostic['line']}: {diagnostic['message']}")
+    if diagnostics:
+        logging.warning(f"Validation found {len(diagnostics)} problems; see repair_prompt() in src/validate_app.py")
+    return diagnostics
+
+
+def _in_chunks(text: str, chunk_size: int = 2048) -> Iterator[str]:
+    # Replays a saved response as if it were streamed by the model
+    for i in range(0, len(text), chunk_size):
+        yield text[i : i + chunk_size]
+
+
+def generate_app_stream(
+    prompt: str,
+    model: str,
+    app_dir: Path,
+    out_root: Path,
+    allow_public: bool = True,
+    raw_response_file: str = None,
+    use_cache: bool = True,
+    plan: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Streaming variant of generate_app.
+
+    The template is copied up front, then every file is written as soon as its entry
+    in the `files` array has been fully received. Yields events:
+      {"event": "start", "uid", "target_dir"}
+      {"event": "file", ...file row}  (one per written file)
+      {"event": "done", "uid", "target_dir", "files"}
+    """
+    succeeded = False
+    try:
+        yield from _generate_app_stream(
+            prompt, model, app_dir, out_root, allow_public, raw_response_file, use_cache, plan
+        )
+        succeeded = True
+    finally:
+        # A stream that fails or is abandoned part-way counts as an error
+        GENERATIONS.inc(outcome="success" if succeeded else "error")
+
+
+def _generate_app_stream(
+    prompt: str,
+    model: str,
+    app_dir: Path,
+    out_root: Path,
+    allow_public: bool,
+    raw_response_file: Optional[str],
+    use_cache: bool,
+    plan: Optional[Dict[str, Any]],
+) -> Iterator[Dict[str, Any]]:
+    prompt = prompt or "Create a sample page that says hello using Material UI Button."
+    if plan:
+        prompt = prompt_with_plan(prompt, plan)
+
+    app_dir = Path(app_dir).resolve()
+    if not app_dir.exists():
+        raise SystemExit(f"App dir not found: {app_dir}")
+
+    uid = new_uid()
+    out_root = Path(out_root).resolve()
+    out_root.mkdir(parents=True, exist_ok=True)
+    target_dir = (out_root / uid).resolve()
+
+    logging.info(f"Template: {app_dir}")
+    logging.info(f"Target: {target_dir}")
+
+    report = StageTimer()
+    report("copying_template")
+    copy_template_to_uid(app_dir, target_dir)
+    report("streaming")
+    yield {"event": "start", "uid": uid, "target_dir": str(target_dir)}
+
+    cached = None
+    if raw_response_file:
+        logging.info(f"Streaming raw response file: {raw_response_file}")
+        cached = Path(raw_response_file).read_text(encoding="utf-8")
+    elif use_cache:
+        cached = response_cache.get(prompt, model)
+    cache_hit = cached is not None and not raw_response_file
+    if cached is not None:
+        chunks = _in_chunks(cached)
+    else:
+        logging.info("Streaming from Gemini ...")
+        chunks = call_gemini_stream(prompt, model)
+
+    parser = IncrementalFilesParser()
+    streamed_paths = set()
+    for chunk in chunks:
+        for entry in parser.feed(chunk):
+            if write_files(
+                target_dir, {"files": [entry]}, allow_public=allow_public, blob_store=generated_files_store()
+            ):
+                streamed_paths.add(entry["path"])
+                yield {"event": "file", **_file_row(entry)}
+
+    # The complete text is still parsed the regular way, both for the audit copy and to
+    # pick up anything the incremental parser could not recognise
+    report("parsing")
+    data = parse_response(parser.text)
+    if use_cache and not raw_response_file and not cache_hit:
+        response_cache.put(prompt, model, parser.text)
+    save_parsed_response(uid, data)
+    files = data.get("files", [])
+    missed = [f for f in files if isinstance(f, dict) and f.get("path") and f["path"] not in streamed_paths]
+    if missed:
+        logging.warning(f"{len(missed)} files were not recognised while streaming; writing them now")
+        for entry in missed:
+            if write_files(
+                target_dir, {"files": [entry]}, allow_public=allow_public, blob_store=generated_files_store()
+            ):
+                yield {"event": "file", **_file_row(entry)}
+
+    diagnostics = _validate(data, app_dir, allow_public, None, report) if VALIDATE_GENERATED_FILES else []
+
+    report("done")
+    logging.info(f"Streamed {len(files)} files into {target_dir}")
+    yield {
+        "event": "done",
+        "uid": uid,
+        "target_dir": str(target_dir),
+        "files": build_file_rows(files),
+        "diagnostics": diagnostics,
+        "cache_hit": cache_hit,
+        "timings": report.timings,
+    }
+
+
 def parse_args() -> argparse.Namespace:
 
     parser = argparse.ArgumentParser(description="Generate React code into a Material UI template using Google Gemini.")
@@ -141,12 +557,25 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--auto-install",
         action="store_true",
-        help="Run npm install inside the generated app directory after writing files",
+        help="Link node_modules from the shared dependency store (installing it once per lockfile)",
     )
     parser.add_argument(
         "--raw-response-file",
         help="Debug: path to a file that contains the raw model response text (skips API call)",
     )
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, bypassing the response cache")
+    parser.add_argument(
+        "--strategy",
+        choices=GENERATION_STRATEGIES,
+        default="single",
+        help="single: one model call; parallel: plan the files, then generate them concurrently",
+    )
+    parser.add_argument(
+        "--no-validate", action="store_true", help="Skip the offline import check of the generated files"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="Capture a cProfile/tracemalloc profile under logs/profiles/"
+    )
     parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
     return parser.parse_args()
 
@@ -163,6 +592,10 @@ if __name__ == "__main__":
         args.dry_run,
         args.auto_install,
         args.raw_response_file,
+        use_cache=not args.no_cache,
+        profile=args.profile,
+        strategy=args.strategy,
+        validate=not args.no_validate,
     )
     logging.info(f"App generated at {response['target_dir']}")
     print(f"uid: {response['uid']}")
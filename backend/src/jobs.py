@@ -0,0 +1,284 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .constants import (
+    DEFAULT_JOB_WORKERS,
+    DEFAULT_JOB_WORKER_TYPE,
+    DEFAULT_JOB_MAX_QUEUE,
+    DEFAULT_JOB_RETENTION_SECONDS,
+)
+from .logger import init_worker_logging, log_context, worker_logging_args
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has reached its max depth."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job at its next stage boundary once it has been cancelled."""
+
+
+def _run_generate_job(job_id: str, kwargs: Dict[str, Any], progress_store: Any, cancel_store: Any) -> Any:
+    """Worker entry point. Top-level so it can be pickled for process pools."""
+    from .generate_app import generate_app
+
+    def progress(stage: str) -> None:
+        # A stage boundary is the earliest safe point to stop; "done" means there is nothing left to save
+        if stage != "done" and cancel_store.get(job_id):
+            raise JobCancelled(f"Job {job_id} was cancelled during {stage}")
+        stages = list(progress_store.get(job_id, []))
+        stages.append({"stage": stage, "at": time.time()})
+        progress_store[job_id] = stages
+
+    progress("started")
+    try:
+        with log_context(job_id=job_id):
+            return generate_app(progress=progress, **kwargs)
+    except SystemExit as exc:
+        # generate_app reports failures via SystemExit; surface them as regular errors
+        raise RuntimeError(str(exc)) from None
+
+
+class Job:
+    def __init__(self, job_id: str, params: Dict[str, Any]) -> None:
+        self.id = job_id
+        self.params = params
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+    def to_dict(self, stages: List[Dict[str, Any]], include_result: bool = False) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": stages[-1]["stage"] if stages else self.status,
+            "stages": stages,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.status == "succeeded":
+            data["result"] = self.result
+        return data
+
+
+class JobQueue:
+    """Bounded pool that runs generate_app in the background.
+
+    At most `workers` jobs run concurrently and at most `max_queue` more may wait;
+    submit() raises QueueFullError beyond that so callers can apply backpressure.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_JOB_WORKERS,
+        worker_type: str = DEFAULT_JOB_WORKER_TYPE,
+        max_queue: int = DEFAULT_JOB_MAX_QUEUE,
+        retention_seconds: int = DEFAULT_JOB_RETENTION_SECONDS,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._executor: Optional[Executor] = None
+        self._manager: Any = None
+        self._progress: Any = None
+        self._cancelled: Any = None
+        self._draining = False
+        self.configure(workers, worker_type, max_queue, retention_seconds)
+
+    def configure(
+        self,
+        workers: int = DEFAULT_JOB_WORKERS,
+        worker_type: str = DEFAULT_JOB_WORKER_TYPE,
+        max_queue: int = DEFAULT_JOB_MAX_QUEUE,
+        retention_seconds: int = DEFAULT_JOB_RETENTION_SECONDS,
+    ) -> None:
+        if worker_type not in ("thread", "process"):
+            raise ValueError(f"Unknown worker type: {worker_type}")
+        if self._executor is not None:
+            raise RuntimeError("Job queue already started; configure it before the first submit")
+        self.workers = max(1, int(workers))
+        self.worker_type = worker_type
+        self.max_queue = max(0, int(max_queue))
+        self.retention_seconds = retention_seconds
+
+    def _ensure_started(self) -> Executor:
+        # Executors are created lazily so importing this module stays cheap
+        if self._executor is None:
+            if self.worker_type == "process":
+                import multiprocessing
+
+                self._manager = multiprocessing.Manager()
+                self._progress = self._manager.dict()
+                self._cancelled = self._manager.dict()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=init_worker_logging,
+                    initargs=worker_logging_args(self._manager),
+                )
+            else:
+                self._progress = {}
+                self._cancelled = {}
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="generate-job")
+            logging.info(f"Started job queue: {self.workers} {self.worker_type} workers, max queue {self.max_queue}")
+        return self._executor
+
+    def _counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in JOB_STATUSES}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return counts
+
+    def _refresh(self, job: Job) -> None:
+        # Process pools can't call back into this object, so derive "running" from progress
+        if job.status == "queued" and self._progress.get(job.id):
+            job.status = "running"
+            job.started_at = self._progress[job.id][0]["at"]
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        expired = [jid for jid, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for jid in expired:
+            self._jobs.pop(jid, None)
+            self._progress.pop(jid, None)
+            self._cancelled.pop(jid, None)
+
+    def submit(self, params: Dict[str, Any]) -> Job:
+        executor = self._ensure_started()
+        with self._lock:
+            self._prune()
+            for job in self._jobs.values():
+                self._refresh(job)
+            if self._draining:
+                raise QueueFullError("Server is shutting down")
+            counts = self._counts()
+            if counts["queued"] >= self.max_queue + max(0, self.workers - counts["running"]):
+                raise QueueFullError(f"Job queue is full ({counts['queued']} queued, {counts['running']} running)")
+            job = Job(uuid.uuid4().hex, params)
+            self._jobs[job.id] = job
+            self._progress[job.id] = []
+            job.future = executor.submit(_run_generate_job, job.id, params, self._progress, self._cancelled)
+        job.future.add_done_callback(lambda fut, job=job: self._on_done(job, fut))
+        logging.info(f"Queued job {job.id}")
+        return job
+
+    def _on_done(self, job: Job, fut: Future) -> None:
+        with self._lock:
+            job.finished_at = time.time()
+            if fut.cancelled():
+                job.status = "cancelled"
+                return
+            exc = fut.exception()
+            if isinstance(exc, JobCancelled):
+                job.status = "cancelled"
+                logging.info(f"Job {job.id} stopped after cancellation")
+            elif exc is not None:
+                job.status = "failed"
+                job.error = str(exc)
+                logging.error(f"Job {job.id} failed: {exc}")
+            else:
+                job.status = "succeeded"
+                job.result = fut.result()
+                logging.info(f"Job {job.id} succeeded")
+            if job.started_at is None and self._progress.get(job.id):
+                job.started_at = self._progress[job.id][0]["at"]
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if self._progress is not None:
+                self._refresh(job)
+                stages = list(self._progress.get(job_id, []))
+            else:
+                stages = []
+            return job.to_dict(stages, include_result=include_result)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job. Queued jobs never start; running ones stop at their next stage.
+
+        A model call already in flight is not interrupted, but nothing is written after it.
+        Returns False for unknown or finished jobs.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.future is None:
+            return False
+        if job.future.cancel():
+            return True
+        if job.future.done():
+            return False
+        self._cancelled[job_id] = True
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._progress is not None:
+                for job in self._jobs.values():
+                    self._refresh(job)
+            return {
+                "workers": self.workers,
+                "worker_type": self.worker_type,
+                "max_queue": self.max_queue,
+                "counts": self._counts(),
+            }
+
+    def drain(self, timeout: float) -> int:
+        """Stop accepting jobs and wait up to `timeout` seconds for queued and running ones to finish.
+
+        Jobs still unfinished after that are cancelled. Returns how many there were.
+        """
+        with self._lock:
+            self._draining = True
+        deadline = time.monotonic() + timeout
+        while True:
+            counts = self.stats()["counts"]
+            unfinished = counts["queued"] + counts["running"]
+            if not unfinished or time.monotonic() >= deadline:
+                break
+            time.sleep(0.1)
+        if unfinished:
+            logging.warning(f"Cancelling {unfinished} unfinished jobs after waiting {timeout}s")
+            with self._lock:
+                job_ids = [job.id for job in self._jobs.values() if job.status in ("queued", "running")]
+            for job_id in job_ids:
+                self.cancel(job_id)
+        self.shutdown(wait=False)
+        return unfinished
+
+    def shutdown(self, wait: bool = True) -> None:
+        executor, manager = self._executor, self._manager
+        self._executor = self._manager = None
+        if executor is not None and manager is not None and not wait:
+            # Cancelled process workers still report progress through the manager's proxies until
+            # they stop; shutting it down under them fails their writes with BrokenPipe/EOFError.
+            # The thread is not a daemon, so the process waits for it before exiting.
+            def close() -> None:
+                executor.shutdown(wait=True)
+                self._close_manager(manager)
+
+            threading.Thread(target=close, name="job-queue-shutdown").start()
+            return
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if manager is not None:
+            self._close_manager(manager)
+
+    def _close_manager(self, manager: Any) -> None:
+        # Keep the final progress readable for get()/stats() once the proxies are gone
+        with self._lock:
+            self._progress = dict(self._progress)
+            self._cancelled = dict(self._cancelled)
+        manager.shutdown()
@@ -0,0 +1,158 @@
+import re
+from json import JSONDecodeError, JSONDecoder
+from json.decoder import scanstring
+from json.scanner import make_scanner
+from typing import Any, Dict, List, Tuple
+
+from .utils import _unescape_backtick_block
+
+FENCE_PATTERN = re.compile(r"```json", re.IGNORECASE)
+# Body of a backtick string up to its closing backtick ("unrolled loop" form: linear,
+# no backtracking, and runs of plain characters are consumed in one step)
+BACKTICK_BODY_PATTERN = re.compile(r"[^`\\]*(?:\\.[^`\\]*)*", re.DOTALL)
+NUMBER_PATTERN = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+WHITESPACE = " \t\n\r"
+LITERALS = (("true", True), ("false", False), ("null", None))
+
+
+class ExtractError(ValueError):
+    def __init__(self, message: str, pos: int) -> None:
+        super().__init__(f"{message} at char {pos}")
+        self.pos = pos
+
+
+def _fence_start(text: str) -> int:
+    """Opening brace after the first ```json fence, or -1."""
+    fence = FENCE_PATTERN.search(text)
+    return text.find("{", fence.end()) if fence else -1
+
+
+class _Scanner:
+    """Recursive-descent parser over the raw response, one pass left to right.
+
+    Beyond strict JSON it accepts backtick-delimited strings (as the model sometimes
+    emits for `content`), raw control characters inside strings and trailing commas.
+    Every object or array is first handed to the C JSON scanner; only when that stops
+    at something non-standard is the container walked here. Its children go through
+    the C scanner again only if they start past the point where the last attempt
+    failed: one that starts before it would just rescan the same text up to the same
+    failure, once per nesting level. Failed attempts therefore cover disjoint ranges and
+    the scan stays linear; strict parts run at `json.loads` speed and the Python loop
+    only touches the containers around the non-standard values.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.n = len(text)
+        self._scan_once = make_scanner(JSONDecoder(strict=False))
+        # Where the last C scanner attempt stopped; containers starting before it are walked here
+        self._failed = -1
+
+    def skip_ws(self, i: int) -> int:
+        text, n = self.text, self.n
+        while i < n and text[i] in WHITESPACE:
+            i += 1
+        return i
+
+    def value(self, i: int) -> Tuple[Any, int]:
+        i = self.skip_ws(i)
+        if i >= self.n:
+            raise ExtractError("Unexpected end of response", i)
+        ch = self.text[i]
+        if ch == "{" or ch == "[":
+            if i >= self._failed:
+                try:
+                    return self._scan_once(self.text, i)
+                except StopIteration as exc:
+                    self._failed = max(self._failed, exc.value)
+                except JSONDecodeError as exc:
+                    self._failed = max(self._failed, exc.pos)
+            return self.obj(i + 1) if ch == "{" else self.array(i + 1)
+        if ch == '"':
+            return scanstring(self.text, i + 1, False)
+        if ch == "`":
+            return self.backtick(i + 1)
+        for word, val in LITERALS:
+            if self.text.startswith(word, i):
+                return val, i + len(word)
+        match = NUMBER_PATTERN.match(self.text, i)
+        if match:
+            num = match.group()
+            return (float(num) if any(c in num for c in ".eE") else int(num)), match.end()
+        raise ExtractError(f"Unexpected character {ch!r}", i)
+
+    def backtick(self, i: int) -> Tuple[str, int]:
+        j = BACKTICK_BODY_PATTERN.match(self.text, i).end()
+        if j >= self.n:
+            raise ExtractError("Unterminated backtick string", i - 1)
+        return _unescape_backtick_block(self.text[i:j]), j + 1
+
+    def obj(self, i: int) -> Tuple[Dict[str, Any], int]:
+        result: Dict[str, Any] = {}
+        text = self.text
+        while True:
+            i = self.skip_ws(i)
+            if i < self.n and text[i] == "}":
+                return result, i + 1
+            if i >= self.n or text[i] != '"':
+                raise ExtractError("Expected property name", i)
+            key, i = scanstring(text, i + 1, False)
+            i = self.skip_ws(i)
+            if i >= self.n or text[i] != ":":
+                raise ExtractError("Expected ':'", i)
+            result[key], i = self.value(i + 1)
+            i = self.skip_ws(i)
+            if i < self.n and text[i] == ",":
+                i += 1
+            elif i < self.n and text[i] == "}":
+                return result, i + 1
+            else:
+                raise ExtractError("Expected ',' or '}'", i)
+
+    def array(self, i: int) -> Tuple[List[Any], int]:
+        result: List[Any] = []
+        text = self.text
+        while True:
+            i = self.skip_ws(i)
+            if i < self.n and text[i] == "]":
+                return result, i + 1
+            item, i = self.value(i)
+            result.append(item)
+            i = self.skip_ws(i)
+            if i < self.n and text[i] == ",":
+                i += 1
+            elif i < self.n and text[i] == "]":
+                return result, i + 1
+            else:
+                raise ExtractError("Expected ',' or ']'", i)
+
+
+def extract_payload(text: str) -> Dict[str, Any]:
+    """Parse the JSON payload out of a raw model response.
+
+    Replaces the extract_json_block -> json.loads -> sanitize_backtick_json chain:
+    surrounding prose or ```json fences are skipped and trailing text is ignored.
+    The scan is linear, but a failed parse after a fence is retried from the first
+    brace, so the text may be scanned twice. Raises SystemExit like the functions it replaces.
+    """
+    # Like extract_json_block, a ```json fence wins over braces in the prose before it;
+    # the first brace of the text is only the fallback
+    first = text.find("{")
+    start = _fence_start(text)
+    if start == -1:
+        start = first
+    if start == -1:
+        raise SystemExit("Could not extract JSON from model response.")
+    scanner = _Scanner(text)
+    try:
+        try:
+            data, _ = scanner.value(start)
+        except ExtractError:
+            if first == start:
+                raise
+            data, _ = _Scanner(text).value(first)
+    except (ExtractError, ValueError, RecursionError) as exc:
+        raise SystemExit(f"Failed to parse JSON from model response: {exc}")
+    if not isinstance(data, dict):
+        raise SystemExit("Failed to parse JSON from model response: payload is not an object")
+    return data
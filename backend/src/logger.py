@@ -1,11 +1,228 @@
+"""
+Non-blocking, structured logging.
+
+Callers only enqueue records: a QueueHandler formats the message (truncating or
+hashing large payloads, tagging request/job ids) and a background QueueListener does
+the file I/O into a size-rotated log. When the queue is full, records are dropped and
+counted rather than blocking the request. DEBUG records are sampled unless verbose.
+"""
+import atexit
+import contextvars
+import hashlib
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .constants import (
+    DEFAULT_LOG_BACKUP_COUNT,
+    DEFAULT_LOG_MAX_BYTES,
+    DEFAULT_LOG_PAYLOAD_LIMIT,
+    DEFAULT_LOG_PAYLOAD_MODE,
+    DEFAULT_LOG_QUEUE_SIZE,
+    DEFAULT_LOG_SAMPLE_RATE,
+    LOG_DIR,
+)
+from .metrics import LOG_RECORDS_DROPPED
+
+TEXT_FORMAT = "%(asctime)s: %(levelname)s: %(message)s"
+CONTEXT_FIELDS = ("request_id", "job_id")
+
+_context: Dict[str, contextvars.ContextVar] = {
+    name: contextvars.ContextVar(name, default=None) for name in CONTEXT_FIELDS
+}
+_listener: Optional[logging.handlers.QueueListener] = None
+_worker_listeners: List[logging.handlers.QueueListener] = []
+_settings: Dict[str, Any] = {}
+
+
+@contextmanager
+def log_context(**ids: Any) -> Iterator[None]:
+    """Tag every record logged inside the block (in this thread/context) with the given ids."""
+    tokens = [(_context[name], _context[name].set(value)) for name, value in ids.items()]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def set_log_context(**ids: Any) -> Dict[str, contextvars.Token]:
+    """Non-scoped variant of log_context for hooks (e.g. Flask before/teardown_request)."""
+    return {name: _context[name].set(value) for name, value in ids.items()}
+
+
+def reset_log_context(tokens: Dict[str, contextvars.Token]) -> None:
+    for name, token in tokens.items():
+        _context[name].reset(token)
+
+
+def shorten_payload(text: str, limit: int = DEFAULT_LOG_PAYLOAD_LIMIT, mode: str = DEFAULT_LOG_PAYLOAD_MODE) -> str:
+    """Keep log lines bounded: large messages keep their head ("truncate") or only a digest ("hash")."""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    digest = hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()[:16]
+    marker = f"[{len(text)} chars, sha256:{digest}]"
+    if mode == "hash":
+        return marker
+    return f"{text[:limit]}... {marker}"
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` fraction of verbose records: DEBUG ones and any logged with extra={"verbose": True}."""
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG and not getattr(record, "verbose", False):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class _ContextQueueHandler(logging.handlers.QueueHandler):
+    """Prepares records in the calling thread and never blocks on a full queue."""
 
-from .constants import LOG_DIR
+    def __init__(self, log_queue: queue.Queue, payload_limit: int, payload_mode: str) -> None:
+        super().__init__(log_queue)
+        self.payload_limit = payload_limit
+        self.payload_mode = payload_mode
 
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback here, so the listener only does I/O
+        message = shorten_payload(record.getMessage(), self.payload_limit, self.payload_mode)
+        exc_text = None
+        if record.exc_info:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        elif record.exc_text:
+            exc_text = record.exc_text
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args, record.exc_info, record.exc_text = message, None, None, exc_text
+        record.message = message
+        for name in CONTEXT_FIELDS:
+            if getattr(record, name, None) is None:
+                setattr(record, name, _context[name].get())
+        return record
 
-def setup_logging(filename: str, verbose: bool = False) -> None:
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                data[name] = value
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        ids = " ".join(f"{name}={getattr(record, name)}" for name in CONTEXT_FIELDS if getattr(record, name, None))
+        return f"{line} [{ids}]" if ids else line
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the background writer."""
+    global _listener
+    while _worker_listeners:
+        _worker_listeners.pop().stop()
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def setup_logging(
+    filename: Optional[str],
+    verbose: bool = False,
+    json_format: bool = True,
+    max_bytes: int = DEFAULT_LOG_MAX_BYTES,
+    backup_count: int = DEFAULT_LOG_BACKUP_COUNT,
+    payload_limit: int = DEFAULT_LOG_PAYLOAD_LIMIT,
+    payload_mode: str = DEFAULT_LOG_PAYLOAD_MODE,
+    sample_rate: Optional[float] = None,
+) -> None:
+    """Route the root logger through a queue to a rotating file under logs/ (stderr when filename is None).
+
+    DEBUG records are only emitted when verbose. sample_rate applies to verbose
+    records and defaults to keeping all of them when verbose, DEFAULT_LOG_SAMPLE_RATE
+    otherwise. Safe to call again to reconfigure.
+    """
+    global _listener
     # Create logs directory if it doesn't exist
     LOG_DIR.mkdir(exist_ok=True)
+    stop_logging()
+
+    if filename is None:
+        # Several server worker processes can't rotate one file safely; their supervisor collects stderr
+        file_handler: logging.Handler = logging.StreamHandler(sys.stderr)
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_DIR / filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+    file_handler.setFormatter(JsonFormatter() if json_format else _TextFormatter(TEXT_FORMAT))
+    log_queue: queue.Queue = queue.Queue(maxsize=DEFAULT_LOG_QUEUE_SIZE)
+    queue_handler = _ContextQueueHandler(log_queue, payload_limit, payload_mode)
+    if sample_rate is None:
+        sample_rate = 1.0 if verbose else DEFAULT_LOG_SAMPLE_RATE
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    _settings.update(
+        verbose=verbose, payload_limit=payload_limit, payload_mode=payload_mode, sample_rate=sample_rate
+    )
+
+
+def worker_logging_args(manager: Any) -> Tuple[Any, Dict[str, Any]]:
+    """initargs for init_worker_logging: a cross-process queue drained into this process's log file."""
+    log_queue = manager.Queue(DEFAULT_LOG_QUEUE_SIZE)
+    if _listener is not None:
+        listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+        listener.start()
+        _worker_listeners.append(listener)
+    return log_queue, dict(_settings)
+
+
+def init_worker_logging(log_queue: Any, settings: Dict[str, Any]) -> None:
+    """Process pool initializer: send the worker's records to the parent instead of writing files."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if not settings:
+        return
+    handler = _ContextQueueHandler(log_queue, settings["payload_limit"], settings["payload_mode"])
+    handler.addFilter(SamplingFilter(settings["sample_rate"]))
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG if settings["verbose"] else logging.INFO)
+
 
-    level = logging.DEBUG if verbose else logging.INFO
-    logging.basicConfig(filename=LOG_DIR / filename, level=level, format="%(asctime)s: %(levelname)s: %(message)s")
+atexit.register(stop_logging)
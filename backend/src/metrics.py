@@ -0,0 +1,162 @@
+"""
+In-process counters and histograms rendered in the Prometheus text format.
+
+Metrics are process-local; with several worker processes each one exposes its own.
+"""
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKEN_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count], sum
+        self._values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', repr(float(bound))),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {counts[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total[0]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Any] = []
+        # Callables returning (name, type, help, [(labels, value), ...]) sampled at scrape time
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]] = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[Tuple[str, str, str, list]]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_DURATION = registry.histogram(
+    "lovable_generate_stage_duration_seconds", "Time spent in each generate_app stage"
+)
+GENERATIONS = registry.counter("lovable_generations_total", "Completed generate_app calls by outcome")
+SINGLE_FLIGHT = registry.counter(
+    "lovable_single_flight_total", "Generations that ran the model call (leader) or reused one in flight (coalesced)"
+)
+GEMINI_CALLS = registry.counter("lovable_gemini_calls_total", "Gemini API calls by model")
+CONTEXT_CACHE_EVENTS = registry.counter(
+    "lovable_gemini_context_cache_total", "Context cache lookups by model and event (hit/created/refreshed/fallback)"
+)
+GEMINI_TOKENS = registry.counter("lovable_gemini_tokens_total", "Tokens reported by Gemini usage metadata")
+GEMINI_PROMPT_TOKENS = registry.histogram(
+    "lovable_gemini_prompt_tokens", "Prompt tokens per Gemini call", buckets=TOKEN_BUCKETS
+)
+GEMINI_CANDIDATE_TOKENS = registry.histogram(
+    "lovable_gemini_candidate_tokens", "Candidate (output) tokens per Gemini call", buckets=TOKEN_BUCKETS
+)
+FILES_WRITTEN = registry.counter("lovable_files_written_total", "Generated files by write result")
+VALIDATION_DIAGNOSTICS = registry.counter(
+    "lovable_validation_diagnostics_total", "Problems found by offline validation of generated files, by code"
+)
+HTTP_REQUESTS = registry.counter("lovable_http_requests_total", "HTTP requests by endpoint, method and status")
+HTTP_DURATION = registry.histogram("lovable_http_request_duration_seconds", "HTTP request latency by endpoint")
+HTTP_REJECTED = registry.counter(
+    "lovable_http_rejected_total", "Generation requests turned away with a 503, by reason (busy/draining)"
+)
+LOG_RECORDS_DROPPED = registry.counter("lovable_log_records_dropped_total", "Log records dropped on a full log queue")
+
+
+def record_usage(model: str, response: Any) -> Dict[str, int]:
+    """Record token counts from a response's usage_metadata (absent on some SDKs/fakes)."""
+    usage = getattr(response, "usage_metadata", None)
+    counts = {
+        "prompt": int(getattr(usage, "prompt_token_count", 0) or 0),
+        "candidates": int(getattr(usage, "candidates_token_count", 0) or 0),
+        "cached": int(getattr(usage, "cached_content_token_count", 0) or 0),
+        "total": int(getattr(usage, "total_token_count", 0) or 0),
+    }
+    GEMINI_CALLS.inc(model=model)
+    if usage is None:
+        return counts
+    for kind, value in counts.items():
+        if value:
+            GEMINI_TOKENS.inc(value, model=model, kind=kind)
+    GEMINI_PROMPT_TOKENS.observe(counts["prompt"], model=model)
+    GEMINI_CANDIDATE_TOKENS.observe(counts["candidates"], model=model)
+    return counts
@@ -0,0 +1,149 @@
+"""
+In-memory overlays for previewed generations.
+
+An overlay is the template manifest (read-only lower layer, read from the template
+on demand) plus the post-processed generated files held in memory (upper layer).
+Previews and editor reads are served from the overlay; nothing is written under
+generated-app/ until the preview is committed. Overlays are process-local.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .constants import DEFAULT_PREVIEW_MAX_BYTES
+from .storage import generated_files_store
+from .template_manifest import TemplateManifest, get_manifest
+from .transforms import apply_transforms
+from .utils import copy_template_to_uid, plan_files
+
+# Virtual root the payload paths are validated against; nothing is created there
+OVERLAY_ROOT = Path("/overlay")
+
+
+class OverlayApp:
+    def __init__(self, uid: str, manifest: TemplateManifest, upper: Dict[str, bytes]) -> None:
+        self.uid = uid
+        self.manifest = manifest
+        self.upper = upper
+        self.hashes = {rel: hashlib.sha256(data).hexdigest() for rel, data in upper.items()}
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(len(data) for data in self.upper.values())
+
+    def generated_paths(self) -> List[str]:
+        return list(self.upper)
+
+    def exists(self, rel_path: str) -> bool:
+        return rel_path in self.upper or rel_path in self.manifest.entries
+
+    def read(self, rel_path: str) -> Optional[bytes]:
+        """Bytes of a file, generated layer first; None if neither layer has it."""
+        data = self.upper.get(rel_path)
+        if data is not None:
+            return data
+        if rel_path in self.manifest.entries:
+            return (self.manifest.root / rel_path).read_bytes()
+        return None
+
+    def sha256(self, rel_path: str) -> Optional[str]:
+        if rel_path in self.hashes:
+            return self.hashes[rel_path]
+        entry = self.manifest.entries.get(rel_path)
+        return entry.sha256 if entry else None
+
+    def commit(self, target_dir: Path) -> Path:
+        """Materialise the overlay on disk: template links plus the generated files."""
+        target_dir = Path(target_dir)
+        copy_template_to_uid(self.manifest.root, target_dir, copy_paths=self.upper, manifest=self.manifest)
+        store = generated_files_store()
+        for rel, data in self.upper.items():
+            path = target_dir / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if store is not None:
+                store.link(data, path)
+            else:
+                path.write_bytes(data)
+        logging.info(f"Committed preview {self.uid} to {target_dir} ({len(self.upper)} files)")
+        return target_dir
+
+
+def build_overlay(uid: str, template_root: Path, payload: Dict[str, Any], allow_public: bool = True) -> OverlayApp:
+    """Validate and post-process the payload's files exactly as write_files would, in memory."""
+    upper: Dict[str, bytes] = {}
+    for abs_path, rel_path, content in plan_files(OVERLAY_ROOT, payload, allow_public):
+        rel = abs_path.relative_to(OVERLAY_ROOT).as_posix()
+        upper[rel] = apply_transforms(content, rel).encode("utf-8")
+    return OverlayApp(uid, get_manifest(template_root), upper)
+
+
+class OverlayStore:
+    """LRU of preview overlays bounded by the total bytes of their generated files."""
+
+    def __init__(self, max_bytes: int = DEFAULT_PREVIEW_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._overlays: "OrderedDict[str, OverlayApp]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def put(self, overlay: OverlayApp) -> None:
+        with self._lock:
+            previous = self._overlays.pop(overlay.uid, None)
+            if previous is not None:
+                self._bytes -= previous.size_bytes
+            self._overlays[overlay.uid] = overlay
+            self._bytes += overlay.size_bytes
+            # Always keep the newest overlay, even if it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._overlays) > 1:
+                uid, evicted = self._overlays.popitem(last=False)
+                self._bytes -= evicted.size_bytes
+                self.evictions += 1
+                logging.info(f"Evicted preview {uid} ({evicted.size_bytes} bytes)")
+
+    def get(self, uid: str) -> Optional[OverlayApp]:
+        with self._lock:
+            overlay = self._overlays.get(uid)
+            if overlay is not None:
+                self._overlays.move_to_end(uid)
+            return overlay
+
+    def pop(self, uid: str) -> Optional[OverlayApp]:
+        with self._lock:
+            overlay = self._overlays.pop(uid, None)
+            if overlay is not None:
+                self._bytes -= overlay.size_bytes
+            return overlay
+
+    def commit(self, uid: str, out_root: Path) -> Optional[Path]:
+        """Persist a preview under out_root/uid and drop it from memory. None if unknown.
+
+        The overlay is taken out of the store first, so a concurrent commit of the same
+        preview (e.g. a double-click) gets None instead of rewriting the same directory.
+        """
+        overlay = self.pop(uid)
+        if overlay is None:
+            return None
+        try:
+            out_root = Path(out_root).resolve()
+            out_root.mkdir(parents=True, exist_ok=True)
+            return overlay.commit(out_root / uid)
+        except BaseException:
+            # Keep the preview so the commit can be retried
+            self.put(overlay)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "previews": len(self._overlays),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+overlay_store = OverlayStore()
@@ -0,0 +1,149 @@
+"""
+Parallel generation strategy: plan once, generate file bodies concurrently, merge.
+
+A single call for a large app takes time proportional to the whole output, and a
+truncated response loses every file. Here the model first writes a contract: the file
+list with the exact exports of each file and the shared types (src/types.ts). Files
+(or small groups of files) are then generated concurrently against that contract and
+merged into the usual {"files": [...]} payload. Only the calls that fail or come back
+incomplete are retried. Each call goes through the response cache, so a rerun after a
+failure only pays for what is still missing.
+"""
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .constants import (
+    DEFAULT_PARALLEL_FILES_PER_CALL,
+    DEFAULT_PARALLEL_MAX_FILES,
+    DEFAULT_PARALLEL_RETRIES,
+    DEFAULT_PARALLEL_WORKERS,
+    FILE_PLAN_INSTRUCTIONS,
+    SHARED_TYPES_PATH,
+    SYSTEM_INSTRUCTIONS,
+)
+from .gemini_handler import call_gemini
+from .json_extract import extract_payload
+from .plan_app import normalize_plan, prompt_with_plan
+from .response_cache import response_cache
+
+
+def _call(prompt: str, model: str, instructions: str, use_cache: bool, read_cache: bool = True) -> str:
+    cached = response_cache.get(prompt, model, instructions=instructions) if use_cache and read_cache else None
+    if cached is not None:
+        return cached
+    raw = call_gemini(prompt, model, instructions=instructions)
+    # Only cache what parses, so a truncated response is retried rather than replayed
+    extract_payload(raw)
+    if use_cache:
+        response_cache.put(prompt, model, raw, instructions=instructions)
+    return raw
+
+
+def plan_contract(
+    prompt: str, model: str, plan: Optional[Dict[str, Any]] = None, use_cache: bool = True
+) -> Dict[str, Any]:
+    """File plan with per-file export signatures and shared types.
+
+    An existing plan (e.g. the fast preview from /api/plan) is reused as-is when it already
+    carries exports for every file, and otherwise given to the model as the starting point.
+    """
+    if plan and plan.get("files") and all(f.get("exports") for f in plan["files"]):
+        return plan
+    planning_prompt = prompt_with_plan(prompt, plan) if plan else prompt
+    raw = _call(planning_prompt, model, FILE_PLAN_INSTRUCTIONS, use_cache)
+    contract = normalize_plan(extract_payload(raw), max_files=DEFAULT_PARALLEL_MAX_FILES)
+    contract["files"] = [f for f in contract["files"] if f["path"] != SHARED_TYPES_PATH]
+    if not contract["files"]:
+        raise SystemExit("The file plan does not list any files")
+    return contract
+
+
+def file_prompt(prompt: str, contract: Dict[str, Any], paths: List[str]) -> str:
+    """Prompt for one call: the whole contract as context, only `paths` to be written."""
+    return (
+        f"{prompt}\n\n"
+        f"App plan (every file with its exports; shared types live in {SHARED_TYPES_PATH}):\n"
+        f"{json.dumps(contract, separators=(',', ':'))}\n\n"
+        f"Write ONLY these files, complete, with exactly the planned exports, importing shared types with "
+        f"import type from {SHARED_TYPES_PATH}: {', '.join(paths)}"
+    )
+
+
+def _group(paths: List[str], size: int) -> List[List[str]]:
+    size = max(1, size)
+    return [paths[i : i + size] for i in range(0, len(paths), size)]
+
+
+def generate_files_parallel(
+    prompt: str,
+    model: str,
+    plan: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
+    files_per_call: int = DEFAULT_PARALLEL_FILES_PER_CALL,
+    workers: int = DEFAULT_PARALLEL_WORKERS,
+    retries: int = DEFAULT_PARALLEL_RETRIES,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Generate an app's files concurrently; returns the merged {"files", "plan", "parallel"} payload."""
+    started = time.perf_counter()
+    if progress is not None:
+        progress("planning")
+    contract = plan_contract(prompt, model, plan, use_cache)
+    paths = [f["path"] for f in contract["files"]]
+    logging.info(f"Parallel generation of {len(paths)} files, {files_per_call} per call, {workers} workers")
+    if progress is not None:
+        progress("calling_model")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = _group(paths, files_per_call)
+    attempts = 0
+    calls = 0
+
+    def run(group: List[str], retry: bool) -> Dict[str, Dict[str, Any]]:
+        # A retry must not replay a cached response that was already found incomplete
+        group_prompt = file_prompt(prompt, contract, group)
+        raw = _call(group_prompt, model, SYSTEM_INSTRUCTIONS, use_cache, read_cache=not retry)
+        found = {}
+        for entry in extract_payload(raw).get("files") or []:
+            if isinstance(entry, dict) and str(entry.get("path", "")).strip() in group:
+                found[str(entry["path"]).strip()] = entry
+        return found
+
+    while pending and attempts <= retries:
+        attempts += 1
+        calls += len(pending)
+        failed: List[List[str]] = []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending))), thread_name_prefix="gen-file") as pool:
+            futures = [(group, pool.submit(run, group, attempts > 1)) for group in pending]
+            for group, future in futures:
+                try:
+                    found = future.result()
+                except (Exception, SystemExit) as exc:
+                    # SystemExit is how parsing reports a truncated or malformed response
+                    logging.warning(f"Generating {group} failed (attempt {attempts}): {exc}")
+                    failed.append(group)
+                    continue
+                results.update(found)
+                missing = [path for path in group if path not in found]
+                if missing:
+                    logging.warning(f"Response for {group} is missing {missing} (attempt {attempts})")
+                    failed.append(missing)
+        pending = failed
+
+    if pending:
+        raise SystemExit(f"Could not generate {[p for group in pending for p in group]} after {attempts} attempts")
+
+    files: List[Dict[str, Any]] = []
+    if contract.get("shared_types"):
+        files.append({"path": SHARED_TYPES_PATH, "content": contract["shared_types"]})
+    files.extend(results[path] for path in paths)
+    elapsed = time.perf_counter() - started
+    logging.info(f"Parallel generation: {len(files)} files, {calls} file calls in {elapsed:.2f}s")
+    return {
+        "files": files,
+        "plan": contract,
+        "parallel": {"file_calls": calls, "attempts": attempts, "seconds": round(elapsed, 6)},
+    }
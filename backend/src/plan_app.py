@@ -0,0 +1,136 @@
+"""
+Fast preview tier: a compact plan of the app before any code is generated.
+
+A fast model answers with the file list, component tree, theme and a one-line summary
+per file, which the client can show within about a second. The plan is then passed to
+the full generation (generate_app(plan=...)) as context, so the expensive pass builds
+exactly what was previewed instead of designing the app again.
+
+Usage:
+  cd backend && python3 -m src.plan_app --prompt "A recipe manager" [--generate]
+"""
+import argparse
+import json
+import logging
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .constants import DEFAULT_MODEL, DEFAULT_PLAN_MAX_FILES, DEFAULT_PLAN_MODEL, PLAN_INSTRUCTIONS
+from .gemini_handler import call_gemini
+from .json_extract import extract_payload
+from .logger import setup_logging
+from .metrics import STAGE_DURATION
+from .response_cache import response_cache
+
+
+def _text(value: Any, limit: int = 200) -> str:
+    return " ".join(str(value or "").split())[:limit]
+
+
+def normalize_plan(data: Dict[str, Any], max_files: int = DEFAULT_PLAN_MAX_FILES) -> Dict[str, Any]:
+    """Keep only the documented plan fields, with bounded sizes and src/ paths.
+
+    Per-file "exports" signatures and "shared_types" (from FILE_PLAN_INSTRUCTIONS) are kept when present.
+    """
+    files: List[Dict[str, str]] = []
+    seen = set()
+    for entry in data.get("files") or []:
+        if not isinstance(entry, dict):
+            continue
+        path = str(entry.get("path", "")).strip()
+        if path.startswith("./"):
+            path = path[2:]
+        if not path.startswith("src/") or ".." in path.split("/") or path in seen:
+            logging.warning(f"Dropping planned file: {path!r}")
+            continue
+        seen.add(path)
+        row = {"path": path, "summary": _text(entry.get("summary"))}
+        if entry.get("exports"):
+            row["exports"] = _text(entry["exports"], 400)
+        files.append(row)
+    components = []
+    for entry in data.get("components") or []:
+        if isinstance(entry, dict) and entry.get("name"):
+            children = entry.get("children") if isinstance(entry.get("children"), list) else []
+            components.append({"name": _text(entry["name"], 80), "children": [_text(c, 80) for c in children]})
+    theme = data.get("theme") if isinstance(data.get("theme"), dict) else {}
+    plan = {
+        "summary": _text(data.get("summary"), 500),
+        "theme": {_text(k, 40): _text(v, 80) for k, v in theme.items()},
+        "components": components,
+        "files": files[:max_files],
+    }
+    if isinstance(data.get("shared_types"), str) and data["shared_types"].strip():
+        plan["shared_types"] = data["shared_types"]
+    return plan
+
+
+def prompt_with_plan(prompt: str, plan: Dict[str, Any]) -> str:
+    """Full-generation prompt that builds on an accepted plan."""
+    return (
+        f"{prompt}\n\n"
+        "Implement this plan exactly (same files, component tree and theme); it has already been shown to the user:\n"
+        f"{json.dumps(plan, separators=(',', ':'))}"
+    )
+
+
+def plan_app(
+    prompt: str,
+    model: str = DEFAULT_PLAN_MODEL,
+    raw_response_file: Optional[str] = None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """Ask the fast model for a plan. Returns {plan_id, model, plan, cache_hit, timings}."""
+    prompt = prompt or "Create a sample page that says hello using Material UI Button."
+    started = time.perf_counter()
+    raw = None
+    if raw_response_file:
+        raw = Path(raw_response_file).read_text(encoding="utf-8")
+    elif use_cache:
+        raw = response_cache.get(prompt, model, instructions=PLAN_INSTRUCTIONS)
+    cache_hit = raw is not None and not raw_response_file
+    if raw is None:
+        raw = call_gemini(prompt, model, instructions=PLAN_INSTRUCTIONS)
+    plan = normalize_plan(extract_payload(raw))
+    if not plan["files"]:
+        raise SystemExit("The plan does not list any files")
+    if use_cache and not raw_response_file and not cache_hit:
+        response_cache.put(prompt, model, raw, instructions=PLAN_INSTRUCTIONS)
+    elapsed = time.perf_counter() - started
+    STAGE_DURATION.observe(elapsed, stage="planning")
+    logging.info(f"Planned {len(plan['files'])} files with {model} in {elapsed:.2f}s")
+    return {
+        "plan_id": uuid.uuid4().hex,
+        "model": model,
+        "plan": plan,
+        "cache_hit": cache_hit,
+        "timings": {"planning": round(elapsed, 6)},
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Plan an app with a fast model before generating it.")
+    parser.add_argument("--prompt", required=True, help="User requirement text")
+    parser.add_argument("--plan-model", default=DEFAULT_PLAN_MODEL, help=f"Fast model (default: {DEFAULT_PLAN_MODEL})")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Model for --generate (default: {DEFAULT_MODEL})")
+    parser.add_argument("--generate", action="store_true", help="Generate the app from the plan afterwards")
+    parser.add_argument("--raw-response-file", help="Debug: use a saved plan response instead of calling the API")
+    parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(filename="plan_app.log", verbose=args.verbose)
+    result = plan_app(args.prompt, args.plan_model, raw_response_file=args.raw_response_file)
+    print(json.dumps(result["plan"], indent=2))
+    if args.generate:
+        from .constants import DEFAULT_GENERATED_APP_DIR, DEFAULT_TEMPLATE_REACT_APP_DIR
+        from .generate_app import generate_app
+
+        response = generate_app(
+            args.prompt, args.model, DEFAULT_TEMPLATE_REACT_APP_DIR, DEFAULT_GENERATED_APP_DIR, plan=result["plan"]
+        )
+        print(f"uid: {response['uid']}")
@@ -0,0 +1,118 @@
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .constants import LOG_DIR
+
+PROFILE_DIR = LOG_DIR / "profiles"
+
+# tracemalloc is process-wide: profiled requests share it, and the last one out stops it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+# Only one cProfile profiler can be active per process (enforced since Python 3.12); overlapping
+# profiled requests skip it rather than wait for each other
+_cprofile_lock = threading.Lock()
+
+
+def _acquire_tracing() -> bool:
+    """Count a user of tracemalloc, starting it for the first one; True if tracing was shared."""
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        shared = _tracing_users > 0 or tracemalloc.is_tracing()
+        if _tracing_users == 0:
+            if tracemalloc.is_tracing():
+                # Someone outside the profiler is tracing; leave it running when we are done
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                _tracing_started = True
+        _tracing_users += 1
+        return shared
+
+
+def _release_tracing() -> Tuple[Optional[int], Optional[tracemalloc.Snapshot]]:
+    """Peak and snapshot for one user (None if tracing was stopped elsewhere), stopping it after the last."""
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        peak, snapshot = None, None
+        if tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+        return peak, snapshot
+
+
+class RequestProfiler:
+    """Optional per-request cProfile + tracemalloc capture.
+
+    Usage: start() before the work, then stop(name) to save the cProfile stats to
+    logs/profiles/<name>.prof and get a small summary to attach to the response.
+    """
+
+    def __init__(self, top: int = 15) -> None:
+        self.top = top
+        self._started = False
+        self._profile: Optional[cProfile.Profile] = None
+        self._shared_tracing = False
+        self._cprofile_skipped: Optional[str] = None
+
+    def start(self) -> None:
+        self._started = True
+        self._shared_tracing = _acquire_tracing()
+        if not _cprofile_lock.acquire(blocking=False):
+            self._cprofile_skipped = "another profiled request is running"
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as exc:
+            # Another profiling tool (e.g. a debugger) holds the profiler hooks
+            _cprofile_lock.release()
+            self._cprofile_skipped = str(exc)
+            return
+        self._profile = profile
+
+    def stop(self, name: str) -> Dict[str, Any]:
+        if not self._started:
+            return {}
+        self._started = False
+        profile_path = None
+        top_functions = None
+        if self._profile is not None:
+            self._profile.disable()
+            _cprofile_lock.release()
+        peak, snapshot = _release_tracing()
+
+        if self._profile is not None:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            profile_path = PROFILE_DIR / f"{name}.prof"
+            self._profile.dump_stats(str(profile_path))
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(self.top)
+            top_functions = out.getvalue()
+            logging.info(f"Saved profile: {profile_path}")
+        else:
+            logging.info(f"Skipped cProfile for {name}: {self._cprofile_skipped}")
+        top_allocations = [
+            {"location": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in (snapshot.statistics("lineno")[: self.top] if snapshot is not None else [])
+        ]
+        return {
+            "profile_file": str(Path(profile_path)) if profile_path else None,
+            "peak_memory_kb": round(peak / 1024, 1) if peak is not None else None,
+            # With overlapping profiled requests the peak and allocations cover all of them
+            "shared_tracing": self._shared_tracing,
+            "top_functions": top_functions,
+            # Why there is no cProfile output (only one profiled request at a time gets it)
+            "cprofile_skipped": self._cprofile_skipped,
+            "top_allocations": top_allocations,
+        }
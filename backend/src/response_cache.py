@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .constants import (
+    DEFAULT_RESPONSE_CACHE_DIR,
+    DEFAULT_RESPONSE_CACHE_MAX_BYTES,
+    DEFAULT_RESPONSE_CACHE_TTL_SECONDS,
+    SYSTEM_INSTRUCTIONS,
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Whitespace differences should not defeat the cache; case is kept, since it can change the app
+    # (quoted titles, identifiers, code in the prompt)
+    return " ".join(prompt.split())
+
+
+def cache_key(prompt: str, model: str, instructions: str = SYSTEM_INSTRUCTIONS) -> str:
+    h = hashlib.sha256()
+    for part in (normalize_prompt(prompt), model, instructions):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """Content-addressed cache of raw model responses on disk.
+
+    Each entry is a `<key>.txt` file holding the raw response text; a hit returns that
+    text, which is replayed exactly like `--raw-response-file`. The file's mtime records
+    when it was stored (for TTL) and its atime when it was last used (for LRU eviction).
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_RESPONSE_CACHE_DIR,
+        max_bytes: int = DEFAULT_RESPONSE_CACHE_MAX_BYTES,
+        ttl_seconds: int = DEFAULT_RESPONSE_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.txt"
+
+    def get(self, prompt: str, model: str, instructions: str = SYSTEM_INSTRUCTIONS) -> Optional[str]:
+        """Return the cached response text for this request, or None on a miss.
+
+        The text is read under the lock, so a concurrent put() can't evict the entry
+        between the lookup and the read.
+        """
+        path = self._path(cache_key(prompt, model, instructions))
+        now = time.time()
+        with self._lock:
+            try:
+                stat = path.stat()
+                raw = path.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                self.evictions += 1
+                self.misses += 1
+                return None
+            # Record the access for LRU without touching the stored-at time
+            os.utime(path, (now, stat.st_mtime))
+            self.hits += 1
+        logging.info(f"Response cache hit: {path.name}")
+        return raw
+
+    def put(self, prompt: str, model: str, raw: str, instructions: str = SYSTEM_INSTRUCTIONS) -> Path:
+        path = self._path(cache_key(prompt, model, instructions))
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(raw, encoding="utf-8")
+            os.replace(tmp, path)
+            self._evict()
+        logging.info(f"Response cached: {path.name}")
+        return path
+
+    def _entries(self) -> list:
+        entries = []
+        for path in self.cache_dir.glob("*.txt"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _evict(self) -> None:
+        now = time.time()
+        entries = []
+        for path, stat in self._entries():
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                self.evictions += 1
+            else:
+                entries.append((path, stat))
+        total = sum(stat.st_size for _, stat in entries)
+        # Least recently used first
+        for path, stat in sorted(entries, key=lambda e: e[1].st_atime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            self.evictions += 1
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = 0
+            for path, _ in self._entries():
+                path.unlink(missing_ok=True)
+                removed += 1
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._entries() if self.cache_dir.exists() else []
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(entries),
+                "bytes": sum(stat.st_size for _, stat in entries),
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+response_cache = ResponseCache()
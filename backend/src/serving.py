@@ -0,0 +1,213 @@
+"""
+Production serving: warm-up, per-worker generation limits and graceful drain.
+
+Each server worker (see gunicorn.conf.py) warms up in the background as soon as it
+starts: the heavy modules are imported, the template manifest and package index are
+built and the model clients are created, so the first request does not pay for them.
+/readyz only reports ready once that has succeeded. Generation endpoints are capped per
+worker; a request that can't get a slot within a few seconds gets a 503 with
+Retry-After instead of piling up behind the others. On SIGTERM the worker stops
+reporting ready, lets in-flight requests and background jobs finish (up to a
+deadline) and then exits.
+"""
+import importlib
+import logging
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .constants import (
+    DEFAULT_SERVE_DRAIN_SECONDS,
+    DEFAULT_SERVE_MAX_GENERATIONS,
+    DEFAULT_SERVE_SLOT_WAIT_SECONDS,
+    DEFAULT_TEMPLATE_REACT_APP_DIR,
+)
+
+# Imported by request handlers on first use; loaded during warm-up instead
+WARM_MODULES = (
+    "src.generate_app",
+    "src.edit_app",
+    "src.plan_app",
+    "src.validate_app",
+    "src.batch",
+    "src.export_app",
+    "src.file_content",
+    "src.overlay",
+    "google.genai",
+)
+
+
+class GenerationSlots:
+    """Caps how many generation requests one worker handles at once."""
+
+    def __init__(
+        self, limit: int = DEFAULT_SERVE_MAX_GENERATIONS, wait: float = DEFAULT_SERVE_SLOT_WAIT_SECONDS
+    ) -> None:
+        self.limit = max(1, int(limit))
+        self.wait = wait
+        self._semaphore = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.rejected = 0
+
+    def acquire(self, blocking: bool = False) -> bool:
+        """Wait up to `wait` seconds for a slot; False (and counted as rejected) if none freed up.
+
+        With blocking=True wait as long as it takes (batch items queue rather than fail).
+        """
+        if not (self._semaphore.acquire() if blocking else self._semaphore.acquire(timeout=self.wait)):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.in_use += 1
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"limit": self.limit, "in_use": self.in_use, "rejected": self.rejected}
+
+
+def _warm_up_steps(template_dir: Path) -> List[Tuple[str, Callable[[], Any]]]:
+    from .gemini_client import get_client
+    from .template_manifest import get_manifest
+
+    def imports() -> None:
+        for name in WARM_MODULES:
+            importlib.import_module(name)
+
+    def package_index() -> None:
+        from .validate_app import get_package_index
+
+        get_package_index(template_dir)
+
+    return [
+        ("imports", imports),
+        ("template_manifest", lambda: get_manifest(template_dir)),
+        ("package_index", package_index),
+        ("model_clients", get_client),
+    ]
+
+
+class ServingState:
+    """Readiness, in-flight request tracking and drain for one worker process."""
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.warmed = False
+        self.draining = False
+        self._drain_deadline: Optional[float] = None
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self.slots = GenerationSlots()
+        self._requests = 0
+        self._idle = threading.Condition()
+
+    @property
+    def ready(self) -> bool:
+        return self.warmed and not self.draining
+
+    def configure(
+        self, max_generations: int = DEFAULT_SERVE_MAX_GENERATIONS, slot_wait: float = DEFAULT_SERVE_SLOT_WAIT_SECONDS
+    ) -> None:
+        self.slots = GenerationSlots(max_generations, slot_wait)
+
+    def request_started(self) -> None:
+        with self._idle:
+            self._requests += 1
+
+    def request_finished(self) -> None:
+        with self._idle:
+            self._requests -= 1
+            if not self._requests:
+                self._idle.notify_all()
+
+    def warm_up(self, template_dir: Path = DEFAULT_TEMPLATE_REACT_APP_DIR) -> bool:
+        """Run every warm-up step, recording each one's duration and error; ready only if all succeed."""
+        started = time.perf_counter()
+        ok = True
+        for name, step in _warm_up_steps(Path(template_dir)):
+            step_started = time.perf_counter()
+            try:
+                step()
+                self.checks[name] = {"ok": True}
+            except (Exception, SystemExit) as exc:
+                # SystemExit is how the model client reports a missing SDK or API key
+                logging.error(f"Warm-up step {name} failed: {exc}")
+                self.checks[name] = {"ok": False, "error": str(exc)}
+                ok = False
+            self.checks[name]["seconds"] = round(time.perf_counter() - step_started, 6)
+        self.warmed = ok
+        logging.info(f"Warm-up {'finished' if ok else 'failed'} in {time.perf_counter() - started:.2f}s")
+        return ok
+
+    def start_warm_up(self, template_dir: Path = DEFAULT_TEMPLATE_REACT_APP_DIR) -> threading.Thread:
+        # In the background so the worker answers /healthz (and reports not ready) meanwhile
+        thread = threading.Thread(target=self.warm_up, args=(template_dir,), name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def begin_drain(self, timeout: float = DEFAULT_SERVE_DRAIN_SECONDS) -> float:
+        """Stop reporting ready and fix the drain deadline (monotonic); later calls keep the first deadline."""
+        with self._idle:
+            self.draining = True
+            if self._drain_deadline is None:
+                self._drain_deadline = time.monotonic() + timeout
+            return self._drain_deadline
+
+    def drain(self, job_queue: Any, timeout: float = DEFAULT_SERVE_DRAIN_SECONDS) -> None:
+        """Wait for in-flight requests, then background jobs, all within one deadline.
+
+        The deadline starts at the first begin_drain (i.e. at SIGTERM), so jobs only get
+        whatever time the requests have left over.
+        """
+        deadline = self.begin_drain(timeout)
+        with self._idle:
+            while self._requests and deadline > time.monotonic():
+                self._idle.wait(deadline - time.monotonic())
+            requests = self._requests
+        unfinished = job_queue.drain(max(0.0, deadline - time.monotonic()))
+        logging.info(f"Drained: {requests} requests and {unfinished} jobs still unfinished")
+
+    def install_drain_handler(self, job_queue: Any, timeout: float = DEFAULT_SERVE_DRAIN_SECONDS) -> None:
+        """On SIGTERM stop reporting ready, then hand over to the server's own handler.
+
+        Without one (the development server), drain here and exit. Signal handlers can only be
+        installed from the main thread; elsewhere this does nothing.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle(signum: int, frame: Any) -> None:
+            self.begin_drain(timeout)
+            logging.info("SIGTERM received; draining")
+            if callable(previous):
+                previous(signum, frame)
+                return
+            self.drain(job_queue, timeout)
+            raise SystemExit(0)
+
+        signal.signal(signal.SIGTERM, handle)
+
+    def status(self) -> Dict[str, Any]:
+        with self._idle:
+            requests = self._requests
+        return {
+            "ready": self.ready,
+            "warmed": self.warmed,
+            "draining": self.draining,
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "in_flight_requests": requests,
+            "generation_slots": self.slots.stats(),
+            "checks": self.checks,
+        }
+
+
+serving_state = ServingState()
@@ -0,0 +1,118 @@
+"""
+Single-flight coalescing of identical in-flight generations.
+
+A double-click, several tabs or several people submitting the same prompt at once
+would each pay for the same model call. The first caller for a key runs the call;
+callers that arrive while it is in flight wait for its parsed payload instead of
+starting their own. Every caller then writes its own uid and directory from that
+payload (see generate_app). Only in-flight work is shared: once the call finishes,
+the key is released and later requests go through the response cache as usual.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import SINGLE_FLIGHT
+from .response_cache import normalize_prompt
+
+
+def flight_key(prompt: str, model: str, **options: Any) -> str:
+    """Key of a generation: the prompt, model and every option that changes the payload.
+
+    Only whitespace is normalized (see normalize_prompt): prompts that differ in case can ask
+    for different apps and must not share one.
+    """
+    h = hashlib.sha256()
+    for part in (normalize_prompt(prompt), model, json.dumps(options, sort_keys=True, default=str)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class _Flight:
+    def __init__(self, label: Dict[str, Any]) -> None:
+        self.label = label
+        self.started = time.monotonic()
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs `fn` once per key at a time; concurrent callers with the same key share its outcome."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        label: Optional[Dict[str, Any]] = None,
+        on_wait: Optional[Callable[[], None]] = None,
+    ) -> Tuple[Any, bool]:
+        """Returns (result, shared); shared is True when another caller's in-flight call was reused.
+
+        on_wait is called before a caller starts waiting on someone else's call. The leader's
+        exception (SystemExit included) is raised in every waiting caller too.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight(label or {})
+                self._flights[key] = flight
+                self.leaders += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            SINGLE_FLIGHT.inc(event="coalesced")
+            if on_wait is not None:
+                on_wait()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        SINGLE_FLIGHT.inc(event="leader")
+        try:
+            flight.result = fn()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def in_flight(self) -> List[Dict[str, Any]]:
+        """Per-key view of the calls running now and how many callers wait on each."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"key": key[:16], **f.label, "waiters": f.waiters, "seconds": round(now - f.started, 3)}
+                for key, f in self._flights.items()
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        flights = self.in_flight()
+        with self._lock:
+            leaders, coalesced = self.leaders, self.coalesced
+        return {
+            "in_flight": len(flights),
+            "waiters": sum(f["waiters"] for f in flights),
+            "leaders_total": leaders,
+            "coalesced_total": coalesced,
+            "flights": flights,
+        }
+
+
+single_flight = SingleFlight()
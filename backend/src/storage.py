@@ -0,0 +1,359 @@
+"""
+Content-addressed storage and retention for generated-app/ and gemini-responses/.
+
+Generated files are stored once under blob-store/<sha[:2]>/<sha> and reflinked into
+every app that contains them, so identical files across generations share their extents
+on filesystems that can clone (btrfs, xfs). Each app still gets its own writable inode:
+an edit in one app never reaches the blob or another app. Where cloning is not
+supported the files are written as plain copies and the store is bypassed.
+Saved model responses are written as compact JSON, compressed with zstd when the
+`zstandard` package is installed and gzip otherwise.
+
+Usage:
+  python3 -m src.storage stats
+  python3 -m src.storage dedupe                 # link existing apps into the store, compress old responses
+  python3 -m src.storage gc --max-age-days 30 --max-gb 10 [--dry-run]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .constants import (
+    DEDUPE_GENERATED_FILES,
+    DEFAULT_BLOB_GC_GRACE_SECONDS,
+    DEFAULT_BLOB_STORE_DIR,
+    DEFAULT_GENERATED_APP_DIR,
+    DEFAULT_RESPONSES_DIR,
+    DEFAULT_RETENTION_MAX_AGE_DAYS,
+    DEFAULT_RETENTION_MAX_BYTES,
+)
+from .template_manifest import link_or_copy
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+# Never walked when sizing or deduplicating apps; node_modules belongs to the dependency store
+SKIP_DIRS = {"node_modules", ".git"}
+
+
+class BlobStore:
+    """Immutable files keyed by sha256, used as clone sources for the files of each app."""
+
+    def __init__(self, root: Path = DEFAULT_BLOB_STORE_DIR) -> None:
+        self.root = Path(root)
+        # Set to False by the first failed reflink; storing blobs that can't be cloned only wastes space
+        self.reflinks: Optional[bool] = None
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, data: bytes) -> Path:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        try:
+            # Reusing a blob marks it as recently used, which keeps gc away from it (see gc)
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, path)
+        return path
+
+    def link(self, data: bytes, dst: Path) -> str:
+        """Place `data` at `dst` as a reflink of its blob. Returns the method used ("reflink"/"copy").
+
+        Never a hardlink: the app's file is its own writable inode, so editing it in
+        place can't change the blob or any other app.
+        """
+        tmp = dst.with_name(f".{dst.name}.{threading.get_ident()}.tmp")
+        tmp.unlink(missing_ok=True)
+        if self.reflinks is False:
+            tmp.write_bytes(data)
+            method = "copy"
+        else:
+            try:
+                method = link_or_copy(self.put(data), tmp, "reflink")
+            except FileNotFoundError:
+                # A gc in another process removed the blob after put(); store it again
+                method = link_or_copy(self.put(data), tmp, "reflink")
+            if self.reflinks is None:
+                self.reflinks = method == "reflink"
+                if not self.reflinks:
+                    logging.info(f"{self.root} can't reflink; generated files are written as plain copies")
+            # The clone carries the blob's read-only mode; the app's copy is a regular file
+            os.chmod(tmp, 0o644)
+        # Replacing the directory entry never writes through an existing (template) link
+        os.replace(tmp, dst)
+        return method
+
+    def gc(self, dry_run: bool = False, grace_seconds: float = DEFAULT_BLOB_GC_GRACE_SECONDS) -> Dict[str, int]:
+        """Remove blobs that are not in use (link count 1: only the store).
+
+        Reflinked files don't depend on their blob, so removing one only stops new files
+        from sharing its extents; apps hardlinked by older versions keep theirs alive.
+        Blobs written or reused by put() within grace_seconds are kept, since a writer may
+        be about to clone them; link() also re-stores a blob that disappears under it.
+        """
+        removed = reclaimed = 0
+        if not self.root.exists():
+            return {"removed_blobs": 0, "reclaimed_bytes": 0}
+        cutoff = time.time() - grace_seconds
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = Path(dirpath) / name
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime >= cutoff:
+                    continue
+                if stat.st_nlink == 1 or name.endswith(".tmp"):
+                    removed += 1
+                    reclaimed += stat.st_size
+                    if not dry_run:
+                        path.unlink(missing_ok=True)
+        return {"removed_blobs": removed, "reclaimed_bytes": reclaimed}
+
+
+blob_store = BlobStore()
+
+
+def generated_files_store() -> Optional[BlobStore]:
+    """The store generated files are written through, or None when deduplication is off."""
+    return blob_store if DEDUPE_GENERATED_FILES else None
+
+
+def response_suffix() -> str:
+    return ".json.zst" if zstandard is not None else ".json.gz"
+
+
+def save_response(responses_dir: Path, name: str, data: Dict[str, Any]) -> Path:
+    """Write a parsed model response as compact, compressed JSON."""
+    responses_dir = Path(responses_dir)
+    responses_dir.mkdir(parents=True, exist_ok=True)
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    path = responses_dir / f"{name}{response_suffix()}"
+    if zstandard is not None:
+        path.write_bytes(zstandard.ZstdCompressor(level=10).compress(raw))
+    else:
+        path.write_bytes(gzip.compress(raw, compresslevel=6))
+    return path
+
+
+def _walk_files(root: Path) -> Iterable[Tuple[Path, os.stat_result]]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for name in filenames:
+            path = Path(dirpath) / name
+            try:
+                yield path, path.lstat()
+            except FileNotFoundError:
+                continue
+
+
+def disk_usage(roots: Iterable[Path]) -> Dict[str, int]:
+    """Bytes and inodes used under the roots, counting each hardlinked inode once."""
+    seen = set()
+    total = 0
+    for root in roots:
+        if not Path(root).exists():
+            continue
+        for _, stat in _walk_files(root):
+            key = (stat.st_dev, stat.st_ino)
+            if key not in seen:
+                seen.add(key)
+                total += stat.st_size
+    return {"bytes": total, "inodes": len(seen)}
+
+
+def dedupe_app(app_root: Path, store: BlobStore = blob_store) -> int:
+    """Reflink an app's files to the store. Returns how many now share a blob's extents.
+
+    Files hardlinked by older versions (to a blob or the template) get their own inode too.
+    """
+    linked = 0
+    for path, stat in _walk_files(app_root):
+        if path.is_symlink() or (stat.st_nlink == 1 and store.reflinks is False):
+            continue
+        if store.link(path.read_bytes(), path) == "reflink":
+            linked += 1
+    return linked
+
+
+def compact_responses(responses_dir: Path) -> int:
+    """Rewrite legacy pretty-printed <name>.json responses in the compact compressed format."""
+    converted = 0
+    for path in Path(responses_dir).glob("*.json"):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logging.warning(f"Skipping unreadable response {path}: {exc}")
+            continue
+        saved = save_response(responses_dir, path.name[: -len(".json")], data)
+        os.utime(saved, (path.stat().st_atime, path.stat().st_mtime))
+        path.unlink()
+        converted += 1
+    return converted
+
+
+def _last_activity(app_root: Path) -> float:
+    # Edits rewrite files under src/, which does not touch the app directory's own mtime.
+    # Blob-linked files keep the blob's mtime, but replacing them updates their directory's.
+    latest = app_root.stat().st_mtime
+    for dirpath, dirnames, filenames in os.walk(app_root / "src"):
+        latest = max(latest, os.stat(dirpath).st_mtime)
+        for name in filenames:
+            latest = max(latest, os.lstat(os.path.join(dirpath, name)).st_mtime)
+    return latest
+
+
+def _exclusive_bytes(root: Path) -> int:
+    # Rough share of bytes freed by removing this item: files not linked elsewhere,
+    # or linked only to a blob that becomes collectable
+    total = 0
+    if root.is_file():
+        return root.stat().st_size
+    for _, stat in _walk_files(root):
+        if stat.st_nlink <= 2:
+            total += stat.st_size
+    return total
+
+
+def gc(
+    max_age_days: float = DEFAULT_RETENTION_MAX_AGE_DAYS,
+    max_bytes: Optional[int] = DEFAULT_RETENTION_MAX_BYTES,
+    dry_run: bool = False,
+    apps_dir: Path = DEFAULT_GENERATED_APP_DIR,
+    responses_dir: Path = DEFAULT_RESPONSES_DIR,
+    store: BlobStore = blob_store,
+) -> Dict[str, Any]:
+    """Apply the retention policy and report what was (or would be) reclaimed.
+
+    Generated apps and saved responses older than max_age_days are removed; if the
+    remaining total still exceeds max_bytes, the oldest go first until it fits. Blobs
+    no remaining app links to are removed last.
+    """
+    roots = [Path(apps_dir), Path(responses_dir), store.root]
+    before = disk_usage(roots)
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+
+    items: List[Tuple[float, str, Path]] = []
+    if Path(apps_dir).exists():
+        items += [(_last_activity(p), "app", p) for p in Path(apps_dir).iterdir() if p.is_dir()]
+    if Path(responses_dir).exists():
+        items += [(p.stat().st_mtime, "response", p) for p in Path(responses_dir).iterdir() if p.is_file()]
+    items.sort(key=lambda item: item[0])
+
+    remaining = before["bytes"]
+    doomed: List[Tuple[str, Path]] = []
+    for mtime, kind, path in items:
+        over_budget = max_bytes is not None and remaining > max_bytes
+        if mtime >= cutoff and not over_budget:
+            continue
+        doomed.append((kind, path))
+        remaining -= _exclusive_bytes(path)
+
+    estimated = 0
+    for kind, path in doomed:
+        if dry_run:
+            estimated += _exclusive_bytes(path)
+        elif kind == "app":
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+    blobs = store.gc(dry_run=dry_run)
+
+    after = disk_usage(roots)
+    report = {
+        "dry_run": dry_run,
+        "removed_apps": sum(1 for kind, _ in doomed if kind == "app"),
+        "removed_responses": sum(1 for kind, _ in doomed if kind == "response"),
+        "removed_blobs": blobs["removed_blobs"],
+        "before_bytes": before["bytes"],
+        "after_bytes": after["bytes"] - (estimated + blobs["reclaimed_bytes"] if dry_run else 0),
+        "reclaimed_bytes": estimated + blobs["reclaimed_bytes"] if dry_run else before["bytes"] - after["bytes"],
+        "reclaimed_inodes": before["inodes"] - after["inodes"],
+    }
+    logging.info(f"Storage GC: {report}")
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Deduplicate and garbage-collect generated apps and responses.")
+    parser.add_argument("--apps-dir", default=str(DEFAULT_GENERATED_APP_DIR), help="Generated apps directory")
+    parser.add_argument("--responses-dir", default=str(DEFAULT_RESPONSES_DIR), help="Saved responses directory")
+    parser.add_argument("--store-dir", default=str(DEFAULT_BLOB_STORE_DIR), help="Blob store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show disk usage of apps, responses and the blob store")
+    sub.add_parser("dedupe", help="Link existing app files into the blob store and compress old responses")
+    gc_parser = sub.add_parser("gc", help="Remove old apps, responses and unreferenced blobs")
+    gc_parser.add_argument(
+        "--max-age-days",
+        type=float,
+        default=DEFAULT_RETENTION_MAX_AGE_DAYS,
+        help=f"Remove items not touched for this many days (default: {DEFAULT_RETENTION_MAX_AGE_DAYS})",
+    )
+    gc_parser.add_argument(
+        "--max-gb",
+        type=float,
+        default=DEFAULT_RETENTION_MAX_BYTES / 1024**3,
+        help="Then remove the oldest items until everything fits in this many GB",
+    )
+    gc_parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    store = BlobStore(Path(args.store_dir))
+    apps_dir, responses_dir = Path(args.apps_dir), Path(args.responses_dir)
+    if args.command == "stats":
+        print(
+            json.dumps(
+                {
+                    "apps": disk_usage([apps_dir]),
+                    "responses": disk_usage([responses_dir]),
+                    "blob_store": disk_usage([store.root]),
+                    "total": disk_usage([apps_dir, responses_dir, store.root]),
+                },
+                indent=2,
+            )
+        )
+    elif args.command == "dedupe":
+        before = disk_usage([apps_dir, store.root])
+        linked = sum(dedupe_app(p, store) for p in apps_dir.iterdir() if p.is_dir()) if apps_dir.exists() else 0
+        after = disk_usage([apps_dir, store.root])
+        converted = compact_responses(responses_dir) if responses_dir.exists() else 0
+        print(
+            json.dumps(
+                {
+                    "linked_files": linked,
+                    "reclaimed_bytes": before["bytes"] - after["bytes"],
+                    "reclaimed_inodes": before["inodes"] - after["inodes"],
+                    "compressed_responses": converted,
+                },
+                indent=2,
+            )
+        )
+    elif args.command == "gc":
+        max_bytes = int(args.max_gb * 1024**3) if args.max_gb > 0 else None
+        print(
+            json.dumps(
+                gc(args.max_age_days, max_bytes, args.dry_run, apps_dir, responses_dir, store),
+                indent=2,
+            )
+        )
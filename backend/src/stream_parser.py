@@ -0,0 +1,95 @@
+import logging
+import re
+from typing import Any, Dict, List
+
+from .json_extract import extract_payload
+
+FILES_ARRAY_PATTERN = re.compile(r'"files"\s*:\s*\[')
+
+
+class IncrementalFilesParser:
+    """Incrementally extracts completed entries of the `files` array from a streamed response.
+
+    Feed it text chunks as they arrive; every call returns the `{"path", "content"}`
+    objects that were completed by that chunk. Each character is scanned once, so the
+    total cost stays linear in the response size.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = 0
+        self._in_files = False
+        self._done = False
+        self._depth = 0
+        self._obj_start = -1
+        self._quote = ""  # '"' or '`' while inside a string
+        self._escape = False
+        self.files: List[Dict[str, Any]] = []
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    @property
+    def text(self) -> str:
+        return self._buf
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buf += chunk
+        completed: List[Dict[str, Any]] = []
+        if self._done:
+            return completed
+
+        if not self._in_files:
+            # Look back a little so a key split across chunks is still found
+            match = FILES_ARRAY_PATTERN.search(self._buf, max(0, self._pos - 16))
+            if not match:
+                self._pos = len(self._buf)
+                return completed
+            self._in_files = True
+            self._pos = match.end()
+
+        buf = self._buf
+        i = self._pos
+        n = len(buf)
+        while i < n:
+            ch = buf[i]
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == self._quote:
+                    self._quote = ""
+            elif ch == '"' or (ch == "`" and self._depth > 0):
+                self._quote = ch
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    entry = self._parse_entry(buf[self._obj_start : i + 1])
+                    if entry is not None:
+                        self.files.append(entry)
+                        completed.append(entry)
+                    self._obj_start = -1
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                i += 1
+                break
+            i += 1
+        self._pos = i
+        return completed
+
+    @staticmethod
+    def _parse_entry(text: str) -> Any:
+        try:
+            entry = extract_payload(text)
+        except SystemExit as exc:
+            logging.warning(f"Skipping unparsable streamed file entry: {exc}")
+            return None
+        if not isinstance(entry, dict) or not entry.get("path"):
+            return None
+        return entry
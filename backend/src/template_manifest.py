@@ -0,0 +1,158 @@
+import errno
+import fnmatch
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from .constants import TEMPLATE_COPY_PATTERNS, TEMPLATE_IGNORE_PATTERNS, DEFAULT_TEMPLATE_LINK_MODE
+
+# Linux ioctl that clones a file's extents (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ManifestEntry:
+    __slots__ = ("path", "size", "mtime_ns", "sha256")
+
+    def __init__(self, path: str, size: int, mtime_ns: int, sha256: str) -> None:
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.sha256 = sha256
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"path": self.path, "size": self.size, "sha256": self.sha256}
+
+
+class TemplateManifest:
+    """Paths, sizes and hashes of every file in a template, minus ignored directories."""
+
+    def __init__(self, root: Path, entries: Dict[str, ManifestEntry]) -> None:
+        self.root = root
+        self.entries = entries
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(e.size for e in self.entries.values())
+
+    def dirs(self) -> Iterable[str]:
+        seen = set()
+        for rel in self.entries:
+            parent = os.path.dirname(rel)
+            while parent and parent not in seen:
+                seen.add(parent)
+                parent = os.path.dirname(parent)
+        return sorted(seen)
+
+
+def _ignored(name: str, patterns: Tuple[str, ...]) -> bool:
+    return any(fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def scan_files(root: Path, patterns: Tuple[str, ...] = TEMPLATE_IGNORE_PATTERNS) -> Dict[str, os.stat_result]:
+    """Stat of every regular file under root by relative path, skipping names matching `patterns`."""
+    # Ignored directories are pruned before descending, so node_modules is never walked
+    found: Dict[str, os.stat_result] = {}
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(root / rel_dir) as it:
+            for entry in it:
+                if _ignored(entry.name, patterns):
+                    continue
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(rel)
+                elif entry.is_file():
+                    found[rel] = entry.stat()
+    return found
+
+
+_manifests: Dict[Path, TemplateManifest] = {}
+_lock = threading.Lock()
+
+
+def get_manifest(template_root: Path, patterns: Tuple[str, ...] = TEMPLATE_IGNORE_PATTERNS) -> TemplateManifest:
+    """Return the manifest of a template, rescanning cheaply and rehashing only changed files."""
+    root = Path(template_root).resolve()
+    with _lock:
+        previous = _manifests.get(root)
+        entries: Dict[str, ManifestEntry] = {}
+        for rel, stat in scan_files(root, patterns).items():
+            old = previous.entries.get(rel) if previous else None
+            if old is not None and old.size == stat.st_size and old.mtime_ns == stat.st_mtime_ns:
+                entries[rel] = old
+            else:
+                entries[rel] = ManifestEntry(rel, stat.st_size, stat.st_mtime_ns, file_sha256(root / rel))
+        manifest = TemplateManifest(root, entries)
+        _manifests[root] = manifest
+        return manifest
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def link_or_copy(src: Path, dst: Path, mode: str) -> str:
+    """Materialise `src` at `dst`, falling back to a plain copy. Returns the method used."""
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError as exc:
+            if exc.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+    elif mode == "reflink":
+        try:
+            _reflink(src, dst)
+            return "reflink"
+        except (OSError, ImportError):
+            dst.unlink(missing_ok=True)
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def materialize_template(
+    template_root: Path,
+    target: Path,
+    copy_paths: Optional[Iterable[str]] = None,
+    mode: str = DEFAULT_TEMPLATE_LINK_MODE,
+    manifest: Optional[TemplateManifest] = None,
+) -> Dict[str, int]:
+    """Create `target` from the template manifest.
+
+    Files listed in `copy_paths` (the ones about to be overwritten) and config files
+    matching TEMPLATE_COPY_PATTERNS (package.json, lockfile, ...) get real copies; every
+    other file is reflinked (or hardlinked) to the template, so the per-generation cost
+    is roughly that of the generated files alone. Pass a `manifest` taken once up front
+    (e.g. for a batch) to skip the rescan. Returns counts per method.
+    """
+    if manifest is None:
+        manifest = get_manifest(template_root)
+    copy_set = set(copy_paths or ())
+    target.mkdir(parents=True)
+    for rel_dir in manifest.dirs():
+        (target / rel_dir).mkdir(exist_ok=True)
+    counts: Dict[str, int] = {"hardlink": 0, "reflink": 0, "copy": 0}
+    for rel in manifest.entries:
+        src = manifest.root / rel
+        copy = rel in copy_set or _ignored(os.path.basename(rel), TEMPLATE_COPY_PATTERNS)
+        method = link_or_copy(src, target / rel, "copy" if copy else mode)
+        counts[method] += 1
+    logging.debug(f"Materialised template into {target}: {counts}")
+    return counts
@@ -0,0 +1,115 @@
+"""
+Post-processing rules applied to generated files before they are written.
+
+Rules are registered once at import time with their patterns precompiled, and are
+applied in registration order to files whose extension matches.
+"""
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+CODE_LIKE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".css", ".html", ".md")
+
+# Named imports from the barrel '@mui/icons-material'
+MUI_BARREL_IMPORT_PATTERN = re.compile(
+    r"^\s*import\s*\{([^}]+)\}\s*from\s*['\"]@mui/icons-material['\"];?\s*$", re.MULTILINE
+)
+# Named import from a specific icon path e.g. { Delete } from '@mui/icons-material/Delete'
+MUI_SPECIFIC_IMPORT_PATTERN = re.compile(
+    r"^\s*import\s*\{\s*([A-Za-z0-9_]+)\s*\}\s*from\s*['\"]@mui/icons-material/([A-Za-z0-9_]+)['\"];?\s*$",
+    re.MULTILINE,
+)
+
+
+class Transform:
+    def __init__(self, name: str, fn: Callable[[str, str], str], extensions: Tuple[str, ...]) -> None:
+        self.name = name
+        self.fn = fn
+        self.extensions = extensions
+
+    def applies(self, rel_path: str) -> bool:
+        return rel_path.endswith(self.extensions)
+
+
+_transforms: List[Transform] = []
+
+
+def register_transform(name: str, extensions: Tuple[str, ...] = CODE_LIKE_EXTENSIONS):
+    """Decorator registering `fn(content, rel_path) -> content` as a post-processing rule."""
+
+    def decorator(fn: Callable[[str, str], str]) -> Callable[[str, str], str]:
+        _transforms[:] = [t for t in _transforms if t.name != name]
+        _transforms.append(Transform(name, fn, extensions))
+        return fn
+
+    return decorator
+
+
+def registered_transforms() -> List[str]:
+    return [t.name for t in _transforms]
+
+
+def apply_transforms(content: str, rel_path: str, timings: Optional[Dict[str, float]] = None) -> str:
+    """Run every matching rule over content, adding per-rule seconds to `timings` if given."""
+    for transform in _transforms:
+        if not transform.applies(rel_path):
+            continue
+        if timings is None:
+            content = transform.fn(content, rel_path)
+        else:
+            started = time.perf_counter()
+            content = transform.fn(content, rel_path)
+            timings[transform.name] = timings.get(transform.name, 0.0) + time.perf_counter() - started
+    return content
+
+
+@register_transform("unescape_quotes")
+def unescape_quotes(content: str, rel_path: str) -> str:
+    # For code/text files, remove unnecessary escape sequences
+    return content.replace('\\"', '"').replace("\\'", "'")
+
+
+def _repl_barrel(match: re.Match) -> str:
+    parts = [p.strip() for p in match.group(1).split(",") if p.strip()]
+    lines: List[str] = []
+    for part in parts:
+        # supports "Name as Alias" or just "Name"
+        if " as " in part:
+            name, alias = [x.strip() for x in part.split(" as ", 1)]
+            local = alias
+            icon = name
+        else:
+            icon = part
+            local = part
+        lines.append(f"import {local} from '@mui/icons-material/{icon}';")
+    return "\n".join(lines)
+
+
+def _repl_specific(match: re.Match) -> str:
+    return f"import {match.group(1)} from '@mui/icons-material/{match.group(2)}';"
+
+
+def rewrite_mui_icon_imports(source: str) -> str:
+    """Rewrite named MUI icon imports to per-file default imports.
+
+    Examples:
+      import { ShoppingCart } from '@mui/icons-material';
+        -> import ShoppingCart from '@mui/icons-material/ShoppingCart';
+      import { ShoppingCart as Cart } from '@mui/icons-material';
+        -> import Cart from '@mui/icons-material/ShoppingCart';
+      import { Home, Search } from '@mui/icons-material';
+        -> import Home from '@mui/icons-material/Home';\n           import Search from '@mui/icons-material/Search';
+      import { Delete } from '@mui/icons-material/Delete';
+        -> import Delete from '@mui/icons-material/Delete'; (drop braces)
+    """
+    # Cheap substring check skips both regex scans for files without icon imports
+    if "@mui/icons-material" not in source:
+        return source
+    source = MUI_BARREL_IMPORT_PATTERN.sub(_repl_barrel, source)
+    return MUI_SPECIFIC_IMPORT_PATTERN.sub(_repl_specific, source)
+
+
+@register_transform("mui_icon_imports")
+def _mui_icon_imports(content: str, rel_path: str) -> str:
+    # Fix common MUI icon import mistakes
+    return rewrite_mui_icon_imports(content)
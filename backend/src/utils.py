@@ -1,11 +1,22 @@
 import os
 import re
 import json
-from typing import Any, Dict, List
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
 import shutil
 import logging
 
+from .constants import DEFAULT_TEMPLATE_LINK_MODE, DEFAULT_WRITE_WORKERS, PARALLEL_WRITE_THRESHOLD
+from .storage import BlobStore
+from .template_manifest import TemplateManifest, materialize_template
+from .transforms import apply_transforms
+
+_timings_lock = threading.Lock()
+
 
 def load_api_key() -> str:
     # support .env (optional)
@@ -97,74 +108,75 @@ def is_within(base: Path, target: Path) -> bool:
         return False
 
 
-def _normalize_code_content(content: str, rel_path: str) -> str:
-    # For code/text files, remove unnecessary escape sequences
-    code_like = (".ts", ".tsx", ".js", ".jsx", ".css", ".html", ".md")
-    if any(rel_path.endswith(ext) for ext in code_like):
-        content = content.replace('\\"', '"').replace("\\'", "'")
-        # Fix common MUI icon import mistakes
-        content = _rewrite_mui_icon_imports(content)
-    return content
-
-
-def _rewrite_mui_icon_imports(source: str) -> str:
-    """Rewrite named MUI icon imports to per-file default imports.
-
-    Examples:
-      import { ShoppingCart } from '@mui/icons-material';
-        -> import ShoppingCart from '@mui/icons-material/ShoppingCart';
-      import { ShoppingCart as Cart } from '@mui/icons-material';
-        -> import Cart from '@mui/icons-material/ShoppingCart';
-      import { Home, Search } from '@mui/icons-material';
-        -> import Home from '@mui/icons-material/Home';\n           import Search from '@mui/icons-material/Search';
-      import { Delete } from '@mui/icons-material/Delete';
-        -> import Delete from '@mui/icons-material/Delete'; (drop braces)
-    """
-    # Case 1: named imports from the barrel '@mui/icons-material'
-    pattern_barrel = re.compile(r"^\s*import\s*\{([^}]+)\}\s*from\s*['\"]@mui/icons-material['\"];?\s*$", re.MULTILINE)
-
-    def repl_barrel(match: re.Match[str]) -> str:
-        items_raw = match.group(1)
-        parts = [p.strip() for p in items_raw.split(",") if p.strip()]
-        lines: list[str] = []
-        for part in parts:
-            # supports "Name as Alias" or just "Name"
-            if " as " in part:
-                name, alias = [x.strip() for x in part.split(" as ", 1)]
-                local = alias
-                icon = name
-            else:
-                icon = part
-                local = part
-            lines.append(f"import {local} from '@mui/icons-material/{icon}';")
-        return "\n".join(lines)
-
-    source = pattern_barrel.sub(repl_barrel, source)
-
-    # Case 2: named import from a specific icon path e.g. { Delete } from '@mui/icons-material/Delete'
-    pattern_specific = re.compile(
-        r"^\s*import\s*\{\s*([A-Za-z0-9_]+)\s*\}\s*from\s*['\"]@mui/icons-material/([A-Za-z0-9_]+)['\"];?\s*$",
-        re.MULTILINE,
-    )
-
-    def repl_specific(match: re.Match[str]) -> str:
-        local = match.group(1)
-        icon = match.group(2)
-        return f"import {local} from '@mui/icons-material/{icon}';"
-
-    source = pattern_specific.sub(repl_specific, source)
-
-    return source
+UID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
 
 
-def write_files(
-    app_dir: Path, payload: Dict[str, Any], allow_public: bool = True, overwrite: bool = True
-) -> List[Path]:
+def generated_app_dir(out_root: Path, uid: str) -> Optional[Path]:
+    """Return the directory of an existing generated app, or None for unknown/invalid uids."""
+    if not uid or not UID_PATTERN.match(uid):
+        return None
+    target = (Path(out_root) / uid).resolve()
+    return target if target.is_dir() else None
+
+
+def _content_unchanged(path: Path, data: bytes) -> bool:
+    # Size first, so the hash is only computed for plausible matches
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return hashlib.sha256(path.read_bytes()).digest() == hashlib.sha256(data).digest()
+    except FileNotFoundError:
+        return False
+
+
+def _write_one(
+    abs_path: Path,
+    rel_path: str,
+    content: str,
+    overwrite: bool,
+    timings: Optional[Dict[str, Any]],
+    blob_store: Optional[BlobStore] = None,
+) -> str:
+    """Transform and write a single file. Returns "written", "unchanged" or "exists"."""
+    started = time.perf_counter()
+    if not overwrite and abs_path.exists():
+        logging.info(f"Exists (skip): {rel_path}")
+        return "exists"
+    rule_timings: Optional[Dict[str, float]] = {} if timings is not None else None
+    content = apply_transforms(content, rel_path, rule_timings)
+    data = content.encode("utf-8")
+    if _content_unchanged(abs_path, data):
+        result = "unchanged"
+    else:
+        if blob_store is not None:
+            blob_store.link(data, abs_path)
+        else:
+            if abs_path.exists() and abs_path.stat().st_nlink > 1:
+                # Hardlinked to the template: break the link instead of writing through it
+                abs_path.unlink()
+            abs_path.write_bytes(data)
+        result = "written"
+    if timings is not None:
+        with _timings_lock:
+            timings["files"][rel_path] = time.perf_counter() - started
+            for name, seconds in rule_timings.items():
+                timings["transforms"][name] = timings["transforms"].get(name, 0.0) + seconds
+            timings[result] = timings.get(result, 0) + 1
+    return result
+
+
+def plan_files(base: Path, payload: Dict[str, Any], allow_public: bool = True) -> List[Tuple[Path, str, str]]:
+    """Validate the payload's file entries into (absolute path, relative path, content) triples.
+
+    Paths are checked lexically against `base` only; callers that write to disk still
+    have to check the resolved parent directories. When a path appears more than once,
+    the last entry wins (at the position of the first).
+    """
     files = payload.get("files")
     if not isinstance(files, list):
         raise SystemExit("Invalid JSON: 'files' must be a list")
 
-    written: List[Path] = []
+    planned: List[Tuple[Path, str, str]] = []
     for entry in files:
         if not isinstance(entry, dict):
             continue
@@ -189,24 +201,93 @@ def write_files(
             logging.warning(f"Skipping disallowed path: {rel_path}")
             continue
 
-        abs_path = (app_dir / rel_path).resolve()
-        if not is_within(app_dir, abs_path):
+        # Lexical check only; write_files catches symlinked directories once per directory
+        abs_path = Path(os.path.normpath(base / rel_path))
+        if not str(abs_path).startswith(str(base) + os.sep):
             logging.warning(f"Skipping non-contained path: {rel_path}")
             continue
+        planned.append((abs_path, rel_path, content))
+    # Duplicates would otherwise be written concurrently to the same file
+    deduped: Dict[Path, Tuple[Path, str, str]] = {}
+    for item in planned:
+        deduped[item[0]] = item
+    if len(deduped) < len(planned):
+        logging.warning(f"Ignoring {len(planned) - len(deduped)} duplicate file entries")
+    return list(deduped.values())
 
-        abs_path.parent.mkdir(parents=True, exist_ok=True)
-        if abs_path.exists() and not overwrite:
-            logging.info(f"Exists (skip): {rel_path}")
-            continue
-        content = _normalize_code_content(content, rel_path)
-        abs_path.write_text(content, encoding="utf-8")
-        written.append(abs_path)
-    return written
 
+def _nearest_existing(path: Path) -> Path:
+    while not path.exists() and path.parent != path:
+        path = path.parent
+    return path
+
+
+def write_files(
+    app_dir: Path,
+    payload: Dict[str, Any],
+    allow_public: bool = True,
+    overwrite: bool = True,
+    workers: int = DEFAULT_WRITE_WORKERS,
+    timings: Optional[Dict[str, Any]] = None,
+    blob_store: Optional[BlobStore] = None,
+) -> List[Path]:
+    """Validate, post-process and write the payload's files under app_dir.
 
-def copy_template_to_uid(template_root: Path, uid_root: Path) -> None:
+    Parent directories are created once per directory, transforms run across a thread
+    pool, and files whose content already matches what is on disk are left untouched
+    (they are still returned, since they are in place). Pass a dict as `timings` to
+    collect per-file and per-transform seconds, and a `blob_store` to store each file
+    once by content and reflink (or copy) it into place.
+    """
+    base = Path(app_dir).resolve()
+    planned = plan_files(base, payload, allow_public)
+
+    # Check and create each parent directory once. The nearest existing ancestor is resolved
+    # before anything is created, so a symlinked directory pointing outside the app never
+    # gets directories made under it
+    parents: Dict[Path, bool] = {}
+    for abs_path, rel_path, _ in planned:
+        parent = abs_path.parent
+        if parent not in parents:
+            contained = is_within(base, _nearest_existing(parent))
+            if contained:
+                parent.mkdir(parents=True, exist_ok=True)
+                contained = is_within(base, parent)
+            parents[parent] = contained
+    jobs = []
+    for abs_path, rel_path, content in planned:
+        if not parents[abs_path.parent]:
+            logging.warning(f"Skipping non-contained path: {rel_path}")
+            continue
+        jobs.append((abs_path, rel_path, content))
+
+    if timings is not None:
+        timings.setdefault("files", {})
+        timings.setdefault("transforms", {})
+    started = time.perf_counter()
+    if workers > 1 and len(jobs) >= PARALLEL_WRITE_THRESHOLD:
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs)), thread_name_prefix="write-files") as pool:
+            results = list(pool.map(lambda job: _write_one(*job, overwrite, timings, blob_store), jobs))
+    else:
+        results = [_write_one(*job, overwrite, timings, blob_store) for job in jobs]
+    if timings is not None:
+        timings["total"] = time.perf_counter() - started
+
+    return [job[0] for job, result in zip(jobs, results) if result != "exists"]
+
+
+def copy_template_to_uid(
+    template_root: Path,
+    uid_root: Path,
+    copy_paths: Optional[Iterable[str]] = None,
+    mode: str = DEFAULT_TEMPLATE_LINK_MODE,
+    manifest: Optional[TemplateManifest] = None,
+) -> None:
+    """Materialise the template into uid_root.
+
+    Unchanged files are linked to the template (see materialize_template); pass the
+    paths that will be overwritten as copy_paths so they get real copies.
+    """
     if uid_root.exists():
         shutil.rmtree(uid_root)
-    # Exclude build artifacts and package manager directories
-    ignore = shutil.ignore_patterns("node_modules", "dist", ".next", ".turbo", ".parcel-cache", ".vite", "build")
-    shutil.copytree(template_root, uid_root, ignore=ignore)
+    materialize_template(template_root, uid_root, copy_paths=copy_paths, mode=mode, manifest=manifest)
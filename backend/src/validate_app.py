@@ -0,0 +1,361 @@
+"""
+Offline validation of generated code, before npm install or a vite build.
+
+An index of what the template can import is built once per package.json/lockfile and
+cached: the declared dependencies, plus the export names of @mui/material and
+@mui/icons-material when their node_modules are available (in the template or the
+shared dependency store). Every generated file's imports and local path references are
+then checked against that index and the set of files the app will contain. Problems come
+back as structured diagnostics, and repair_prompt turns them into a targeted follow-up
+edit (see src/edit_app.py) instead of a full regeneration.
+
+Usage:
+  cd backend && python3 -m src.validate_app --uid 20250101-120000-abcd1234
+"""
+import argparse
+import difflib
+import json
+import logging
+import os
+import posixpath
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from .constants import (
+    DEFAULT_DEP_STORE_DIR,
+    DEFAULT_GENERATED_APP_DIR,
+    DEFAULT_TEMPLATE_REACT_APP_DIR,
+    DEFAULT_VALIDATE_WORKERS,
+    DEFAULT_VALIDATION_INDEX_DIR,
+    PARALLEL_VALIDATE_THRESHOLD,
+)
+from .dep_store import lockfile_key
+from .logger import setup_logging
+from .template_manifest import TemplateManifest, get_manifest
+from .transforms import apply_transforms
+from .utils import generated_app_dir, plan_files
+
+CHECKED_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".css")
+RESOLVE_SUFFIXES = ("", ".ts", ".tsx", ".js", ".jsx", ".json", "/index.ts", "/index.tsx", "/index.js", "/index.jsx")
+# Packages whose export names are indexed from node_modules
+INDEXED_PACKAGES = ("@mui/material", "@mui/icons-material")
+
+# import x from 'a'; import { a, b as c } from 'a'; import type { T } from 'a'; import 'a'; export * from 'a'
+IMPORT_PATTERN = re.compile(
+    r"""^[ \t]*(?:import|export)\s+(?:type\s+)?(?:(?P<clause>[\w$*{}\s,]+?)\s+from\s+)?['"](?P<spec>[^'"]+)['"]""",
+    re.MULTILINE,
+)
+DYNAMIC_IMPORT_PATTERN = re.compile(r"""\bimport\(\s*['"](?P<spec>[^'"]+)['"]\s*\)""")
+CSS_REFERENCE_PATTERN = re.compile(r"""@import\s+(?:url\()?['"]?(?P<spec>[^'")\s;]+)|url\(\s*['"]?(?P<url>[^'")]+)""")
+DTS_EXPORT_PATTERN = re.compile(
+    r"export\s+(?:declare\s+)?(?:default\s+)?(?:const|function|class|interface|type|enum|let|var)\s+([A-Za-z_$][\w$]*)"
+)
+DTS_EXPORT_LIST_PATTERN = re.compile(r"export\s+(?:type\s+)?\{([^}]*)\}")
+DTS_EXPORT_STAR_PATTERN = re.compile(r"""export\s+\*\s+from\s+['"](\.[^'"]+)['"]""")
+
+
+def package_name(spec: str) -> str:
+    parts = spec.split("/")
+    return "/".join(parts[:2]) if spec.startswith("@") else parts[0]
+
+
+class PackageIndex:
+    """What a template can import: package names and, where indexed, their export names."""
+
+    def __init__(self, packages: Iterable[str], exports: Dict[str, Dict[str, List[str]]]) -> None:
+        self.packages: FrozenSet[str] = frozenset(packages)
+        # package -> {"subpaths": [...], "names": [...]}; absent when node_modules was not available
+        self.exports = exports
+        self._subpaths = {pkg: frozenset(data["subpaths"]) for pkg, data in exports.items()}
+        self._names = {pkg: frozenset(data["names"]) for pkg, data in exports.items()}
+
+    def subpaths(self, package: str) -> Optional[FrozenSet[str]]:
+        return self._subpaths.get(package)
+
+    def names(self, package: str) -> Optional[FrozenSet[str]]:
+        return self._names.get(package)
+
+
+def _dts_exports(path: Path, seen: Set[Path], depth: int = 3) -> Set[str]:
+    """Names exported by a .d.ts file, following `export * from './x'` a few levels deep."""
+    if depth < 0 or path in seen or not path.is_file():
+        return set()
+    seen.add(path)
+    text = path.read_text(encoding="utf-8", errors="replace")
+    names = set(DTS_EXPORT_PATTERN.findall(text))
+    for group in DTS_EXPORT_LIST_PATTERN.findall(text):
+        for part in group.split(","):
+            name = part.split(" as ")[-1].strip()
+            if name.startswith("type "):
+                name = name[len("type ") :].strip()
+            if name and name != "default":
+                names.add(name)
+    for target in DTS_EXPORT_STAR_PATTERN.findall(text):
+        base = path.parent / target
+        for candidate in (base.with_name(base.name + ".d.ts"), base / "index.d.ts"):
+            if candidate.is_file():
+                names |= _dts_exports(candidate, seen, depth - 1)
+                break
+    return names
+
+
+def _index_package(package_dir: Path) -> Dict[str, List[str]]:
+    subpaths = set()
+    for entry in os.scandir(package_dir):
+        name = entry.name
+        if entry.is_dir() and name not in ("esm", "modern", "node", "legacy", "utils", "internal"):
+            if (Path(entry.path) / "index.d.ts").is_file() or (Path(entry.path) / "package.json").is_file():
+                subpaths.add(name)
+        elif name.endswith(".d.ts") and name != "index.d.ts":
+            # Per-file modules, e.g. @mui/icons-material/Delete.d.ts
+            subpaths.add(name[: -len(".d.ts")])
+    names = _dts_exports(package_dir / "index.d.ts", set())
+    return {"subpaths": sorted(subpaths), "names": sorted(names | subpaths)}
+
+
+def _node_modules(app_dir: Path) -> Optional[Path]:
+    for candidate in (app_dir / "node_modules", DEFAULT_DEP_STORE_DIR / lockfile_key(app_dir) / "node_modules"):
+        if all((candidate / pkg / "index.d.ts").is_file() for pkg in INDEXED_PACKAGES):
+            return candidate
+    return None
+
+
+_indexes: Dict[str, PackageIndex] = {}
+_lock = threading.Lock()
+
+
+def get_package_index(app_dir: Path = DEFAULT_TEMPLATE_REACT_APP_DIR) -> PackageIndex:
+    """The PackageIndex of a template, cached in memory and under validation-index/ per lockfile."""
+    app_dir = Path(app_dir).resolve()
+    key = lockfile_key(app_dir)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None and (index.exports or _node_modules(app_dir) is None):
+            return index
+        started = time.perf_counter()
+        package_json = json.loads((app_dir / "package.json").read_text(encoding="utf-8"))
+        packages = set(package_json.get("dependencies", {})) | set(package_json.get("devDependencies", {}))
+        exports: Dict[str, Dict[str, List[str]]] = {}
+        cache_path = DEFAULT_VALIDATION_INDEX_DIR / f"{key}.json"
+        if cache_path.is_file():
+            exports = json.loads(cache_path.read_text(encoding="utf-8"))
+        else:
+            node_modules = _node_modules(app_dir)
+            if node_modules is not None:
+                exports = {pkg: _index_package(node_modules / pkg) for pkg in INDEXED_PACKAGES}
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = cache_path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(exports), encoding="utf-8")
+                os.replace(tmp, cache_path)
+            else:
+                logging.info("No node_modules for the template yet; MUI export names will not be checked")
+        index = PackageIndex(packages, exports)
+        _indexes[key] = index
+        logging.info(
+            f"Package index {key[:8]}: {len(packages)} packages, "
+            + ", ".join(f"{pkg} {len(data['names'])} names" for pkg, data in exports.items())
+            + f" in {time.perf_counter() - started:.3f}s"
+        )
+        return index
+
+
+def _diagnostic(
+    path: str, line: int, code: str, message: str, spec: str, needle: str, choices: Iterable[str]
+) -> Dict[str, Any]:
+    row = {"path": path, "line": line, "code": code, "severity": "error", "message": message, "specifier": spec}
+    suggestions = difflib.get_close_matches(needle, list(choices), n=3, cutoff=0.6)
+    if suggestions:
+        row["suggestions"] = suggestions
+    return row
+
+
+def _resolve_local(rel_path: str, spec: str, app_files: Set[str]) -> Optional[str]:
+    if spec.startswith("/"):
+        # Vite serves public/ at the root
+        base = posixpath.normpath("public" + spec)
+    else:
+        base = posixpath.normpath(posixpath.join(posixpath.dirname(rel_path), spec))
+    for suffix in RESOLVE_SUFFIXES:
+        if base + suffix in app_files:
+            return base + suffix
+    return None
+
+
+def _imported_names(clause: Optional[str]) -> List[str]:
+    if not clause or "{" not in clause:
+        return []
+    inner = clause[clause.index("{") + 1 : clause.rindex("}")] if "}" in clause else ""
+    names = []
+    for part in inner.split(","):
+        part = part.strip()
+        if part.startswith("type "):
+            part = part[len("type ") :].strip()
+        name = part.split(" as ")[0].strip()
+        if name:
+            names.append(name)
+    return names
+
+
+def check_file(rel_path: str, content: str, index: PackageIndex, app_files: Set[str]) -> List[Dict[str, Any]]:
+    """Diagnostics for one file's imports and local references."""
+    diagnostics: List[Dict[str, Any]] = []
+
+    def line_of(pos: int) -> int:
+        return content.count("\n", 0, pos) + 1
+
+    references = []
+    if rel_path.endswith(".css"):
+        for match in CSS_REFERENCE_PATTERN.finditer(content):
+            spec = match.group("spec") or match.group("url")
+            # Only local files; remote URLs, data: URIs and fragments are not ours to check
+            if spec and not re.match(r"^(?:[a-z]+:|//|#)", spec):
+                references.append((match.start(), spec, None, True))
+    else:
+        for match in IMPORT_PATTERN.finditer(content):
+            references.append((match.start(), match.group("spec"), match.group("clause"), False))
+        for match in DYNAMIC_IMPORT_PATTERN.finditer(content):
+            references.append((match.start(), match.group("spec"), None, False))
+
+    for pos, spec, clause, css in references:
+        if css or spec.startswith((".", "/")):
+            if css and not spec.startswith((".", "/")):
+                spec = "./" + spec
+            if _resolve_local(rel_path, spec, app_files) is None:
+                wanted = posixpath.normpath(posixpath.join(posixpath.dirname(rel_path), spec))
+                diagnostics.append(
+                    _diagnostic(
+                        rel_path,
+                        line_of(pos),
+                        "missing-file",
+                        f"'{spec}' does not resolve to a file",
+                        spec,
+                        wanted,
+                        {posixpath.splitext(f)[0] for f in app_files},
+                    )
+                )
+            continue
+        package = package_name(spec)
+        if package not in index.packages:
+            diagnostics.append(
+                _diagnostic(
+                    rel_path,
+                    line_of(pos),
+                    "unknown-package",
+                    f"'{package}' is not a dependency of the template",
+                    spec,
+                    package,
+                    index.packages,
+                )
+            )
+            continue
+        subpaths = index.subpaths(package)
+        if subpaths is None:
+            continue
+        if spec != package:
+            subpath = spec[len(package) + 1 :].split("/")[0]
+            if subpath not in subpaths:
+                diagnostics.append(
+                    _diagnostic(
+                        rel_path,
+                        line_of(pos),
+                        "unknown-export",
+                        f"'{spec}' does not exist in {package}",
+                        spec,
+                        subpath,
+                        subpaths,
+                    )
+                )
+            continue
+        names = index.names(package) or frozenset()
+        for name in _imported_names(clause):
+            if name not in names:
+                diagnostics.append(
+                    _diagnostic(
+                        rel_path, line_of(pos), "unknown-export", f"{package} has no export '{name}'", spec, name, names
+                    )
+                )
+    return diagnostics
+
+
+def validate_files(
+    files: Dict[str, str],
+    app_files: Set[str],
+    index: PackageIndex,
+    workers: int = DEFAULT_VALIDATE_WORKERS,
+) -> List[Dict[str, Any]]:
+    """Check `files` ({rel path: content}) against the index and the app's full file set."""
+    jobs = [(rel, content) for rel, content in files.items() if rel.endswith(CHECKED_EXTENSIONS)]
+    if workers > 1 and len(jobs) >= PARALLEL_VALIDATE_THRESHOLD:
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs)), thread_name_prefix="validate") as pool:
+            results = list(pool.map(lambda job: check_file(job[0], job[1], index, app_files), jobs))
+    else:
+        results = [check_file(rel, content, index, app_files) for rel, content in jobs]
+    return [diagnostic for result in results for diagnostic in result]
+
+
+def validate_payload(
+    payload: Dict[str, Any],
+    app_dir: Path = DEFAULT_TEMPLATE_REACT_APP_DIR,
+    allow_public: bool = True,
+    manifest: Optional[TemplateManifest] = None,
+) -> List[Dict[str, Any]]:
+    """Diagnostics for a model payload, checked as it will be written (after transforms) over the template."""
+    app_dir = Path(app_dir).resolve()
+    files = {}
+    for abs_path, _, content in plan_files(app_dir, payload, allow_public):
+        rel = abs_path.relative_to(app_dir).as_posix()
+        files[rel] = apply_transforms(content, rel)
+    app_files = set((manifest or get_manifest(app_dir)).entries) | set(files)
+    return validate_files(files, app_files, get_package_index(app_dir))
+
+
+def validate_app_dir(target_dir: Path, template_dir: Path = DEFAULT_TEMPLATE_REACT_APP_DIR) -> List[Dict[str, Any]]:
+    """Diagnostics for an app already on disk (every file under src/)."""
+    target_dir = Path(target_dir)
+    app_files = set()
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(target_dir):
+        dirnames[:] = [d for d in dirnames if d != "node_modules" and not d.startswith(".")]
+        for name in filenames:
+            rel = (Path(dirpath) / name).relative_to(target_dir).as_posix()
+            app_files.add(rel)
+            if rel.startswith("src/") and rel.endswith(CHECKED_EXTENSIONS):
+                files[rel] = (target_dir / rel).read_text(encoding="utf-8", errors="replace")
+    return validate_files(files, app_files, get_package_index(template_dir))
+
+
+def repair_prompt(diagnostics: List[Dict[str, Any]]) -> str:
+    """A follow-up edit prompt that asks for exactly these problems to be fixed."""
+    lines = ["Fix these problems found by static checks, changing only the files listed:"]
+    for d in diagnostics:
+        hint = f" (did you mean {', '.join(d['suggestions'])}?)" if d.get("suggestions") else ""
+        lines.append(f"- {d['path']}:{d['line']}: {d['message']}{hint}")
+    lines.append("Only use packages that are already dependencies and files that exist in the manifest.")
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check a generated app's imports without npm or vite.")
+    parser.add_argument("--uid", required=True, help="uid of the generated app")
+    parser.add_argument(
+        "--out-root", default=str(DEFAULT_GENERATED_APP_DIR), help="Base dir the app was generated under"
+    )
+    parser.add_argument("--app-dir", default=str(DEFAULT_TEMPLATE_REACT_APP_DIR), help="Template the app came from")
+    parser.add_argument("--verbose", action="store_true", help="Enable debug logging")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    setup_logging(filename="validate_app.log", verbose=args.verbose)
+    target = generated_app_dir(Path(args.out_root), args.uid)
+    if target is None:
+        raise SystemExit(f"Generated app not found: {args.uid}")
+    found = validate_app_dir(target, Path(args.app_dir))
+    print(json.dumps(found, indent=2))
+    if found:
+        print(repair_prompt(found))